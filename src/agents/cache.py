@@ -0,0 +1,177 @@
+"""
+Persistent cache of email classifications.
+
+Results are stored under two keys: the Message-ID, which catches reruns over
+overlapping date ranges, and a content fingerprint, which also catches the
+same application forwarded or sent again under a new Message-ID. The
+Message-ID entry records the fingerprint it was stored with, so that it is
+ignored once the content of the email changes.
+"""
+
+import os
+import re
+import hashlib
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .classify import EmailType
+
+logger = logging.getLogger(__name__)
+
+CACHE_PATH = os.getenv("CLASSIFY_CACHE_PATH", "data/classify_cache.sqlite")
+
+SUBJECT_PREFIX = re.compile(r"^\s*((re|fw|fwd|aw|wg)\s*(\[\d+\])?\s*:\s*)+", re.IGNORECASE)
+ADDRESS_PATTERN = re.compile(r"[\w.+-]+@[\w-]+(\.[\w-]+)+")
+
+
+def normalize_subject(subject: str) -> str:
+    """Lower-case subject without reply/forward prefixes and repeated whitespace."""
+    return " ".join(SUBJECT_PREFIX.sub("", subject or "").lower().split())
+
+
+def normalize_message_id(message_id: str) -> str:
+    return (message_id or "").strip().strip("<>").lower()
+
+
+def fingerprint(email) -> str:
+    """
+    Content fingerprint of an `Email`.
+
+    Emails with attachments are identified by their normalized subject and
+    attachment hashes, so a forwarded copy of an application matches the
+    original; emails without attachments by their subject and sender.
+    """
+    metadata = email._metadata or {}
+    parts = [normalize_subject(metadata.get("subject") or "")]
+    if email._attachments:
+        parts += sorted(attachment.digest for attachment in email._attachments)
+    else:
+        sender = ADDRESS_PATTERN.search(metadata.get("from") or "")
+        parts.append(sender.group(0).lower() if sender else "")
+    return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+
+class CacheStats:
+    """Lookups and hits of a ClassificationCache."""
+
+    def __init__(self):
+        self.lookups = 0
+        self.message_id_hits = 0
+        self.fingerprint_hits = 0
+        # Message-ID entries ignored because the content of the email changed
+        self.stale = 0
+
+    @property
+    def hits(self) -> int:
+        return self.message_id_hits + self.fingerprint_hits
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "lookups": self.lookups,
+            "message_id_hits": self.message_id_hits,
+            "fingerprint_hits": self.fingerprint_hits,
+            "stale": self.stale,
+            "hit_rate": round(self.hit_rate, 4),
+        }
+
+
+class ClassificationCache:
+    """
+    SQLite table mapping Message-IDs and fingerprints to EmailTypes.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path: Database file, defaults to the `CLASSIFY_CACHE_PATH` environment variable
+        """
+        self.path = Path(path or CACHE_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS classifications ("
+            "key TEXT PRIMARY KEY, type TEXT NOT NULL, fingerprint TEXT, created_at TEXT DEFAULT CURRENT_TIMESTAMP)"
+        )
+        columns = [row[1] for row in self._connection.execute("PRAGMA table_info(classifications)")]
+        if "fingerprint" not in columns:
+            # Caches created before the fingerprint column; their entries are trusted as they are
+            self._connection.execute("ALTER TABLE classifications ADD COLUMN fingerprint TEXT")
+        self._connection.commit()
+        self._lock = threading.Lock()
+        self.stats = CacheStats()
+
+    @staticmethod
+    def keys(email) -> List[str]:
+        keys = []
+        message_id = normalize_message_id((email._metadata or {}).get("message_id"))
+        if message_id:
+            keys.append(f"mid:{message_id}")
+        keys.append(f"fp:{fingerprint(email)}")
+        return keys
+
+    def get_many(self, emails: list) -> List[Optional[EmailType]]:
+        """
+        Cached label of every email, None for misses.
+
+        A Message-ID entry stored with another fingerprint than the email's
+        current one is stale: the email is looked up by its fingerprint only.
+        """
+        keys = [self.keys(email) for email in emails]
+        flat = [key for email_keys in keys for key in email_keys]
+        found: Dict[str, Tuple[str, Optional[str]]] = {}
+        with self._lock:
+            for start in range(0, len(flat), 500):
+                chunk = flat[start:start + 500]
+                rows = self._connection.execute(
+                    f"SELECT key, type, fingerprint FROM classifications WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                found.update((key, (type, stored)) for key, type, stored in rows)
+
+        results: List[Optional[EmailType]] = []
+        for email_keys in keys:
+            self.stats.lookups += 1
+            current = email_keys[-1][len("fp:"):]
+            hit = None
+            for key in email_keys:
+                if key not in found:
+                    continue
+                stored = found[key][1]
+                if stored is not None and stored != current:
+                    self.stats.stale += 1
+                    continue
+                hit = key
+                break
+            if hit is None:
+                results.append(None)
+                continue
+            if hit.startswith("mid:"):
+                self.stats.message_id_hits += 1
+            else:
+                self.stats.fingerprint_hits += 1
+            results.append(EmailType(type=found[hit][0]))
+        return results
+
+    def set_many(self, emails: list, labels: List[EmailType]):
+        """Store the labels of the emails under all their keys, with their fingerprint."""
+        rows = []
+        for email, label in zip(emails, labels):
+            if label is None:
+                continue
+            keys = self.keys(email)
+            current = keys[-1][len("fp:"):]
+            rows += [(key, label.type, current) for key in keys]
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO classifications (key, type, fingerprint) VALUES (?, ?, ?)", rows
+            )
+            self._connection.commit()
+
+    def close(self):
+        self._connection.close()
@@ -1,12 +1,15 @@
+import logging
 import operator
-from typing import Annotated, List, Literal
+from typing import Annotated, List, Literal, Optional
 from pydantic import BaseModel, Field, ConfigDict
 
 from langchain_core.messages import AnyMessage, AIMessage
 from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph
 
-from prompts.classify_prompts import CLASSIFY_PROMPT
+from prompts.classify_prompts import CLASSIFY_PROMPT, BATCH_CLASSIFY_PROMPT
+
+logger = logging.getLogger(__name__)
 
 class EmailType(BaseModel):
     """
@@ -14,10 +17,83 @@ class EmailType(BaseModel):
     """
     type: Literal["candidate", "non candidate"] = Field(description="This field classifies the email as being a candidate and their resume or not")
 
+class LabelledEmailType(EmailType):
+    """
+    EmailType of one email in a batch
+    """
+    id: str = Field(description="The id the email was introduced with")
+
+
+class EmailTypeBatch(BaseModel):
+    """
+    EmailTypes of a batch of emails
+    """
+    labels: List[LabelledEmailType] = Field(description="One label for every email in the batch")
+
+
 llm = ChatOpenAI(model="gpt-4o-mini")
 
 model = CLASSIFY_PROMPT | llm.with_structured_output(EmailType)
 
+batch_model = BATCH_CLASSIFY_PROMPT | llm.with_structured_output(EmailTypeBatch)
+
+# Characters of the body included in a batch summary
+SUMMARY_BODY_CHARS = 500
+
+
+def summarize_email(email, number: int, body_chars: int = SUMMARY_BODY_CHARS) -> str:
+    """Short summary of an `Email` for batched classification, as item `number` of the list."""
+    metadata = email._metadata or {}
+    attachments = ", ".join(attachment.filename for attachment in email._attachments) or "none"
+    body = " ".join((email._body or "").split())[:body_chars]
+    return (
+        f"{number}. Id: {email.id}\n"
+        f"Subject: {metadata.get('subject', '')}\n"
+        f"From: {metadata.get('from', '')}\n"
+        f"Attachments: {attachments}\n"
+        f"Body: {body}"
+    )
+
+
+def classify_batch(emails: list, batch_size: int = 20) -> List[Optional[EmailType]]:
+    """
+    Classify emails with one LLM request per `batch_size` emails.
+
+    Every batch is sent as a list of summaries and answered with labels keyed
+    by email id. If a batch can't be parsed, its emails are classified one
+    request each; emails missing from an otherwise valid answer are too.
+    Emails whose own request fails as well are left unlabelled, so that they
+    are classified again on a later run.
+
+    Args:
+        emails: `Email`s to classify, with unique ids
+        batch_size: Number of emails per request
+
+    Returns:
+        The label of every email in order, None for the emails that could not be classified
+    """
+    labels: List[Optional[EmailType]] = [None] * len(emails)
+    for start in range(0, len(emails), batch_size):
+        batch = emails[start:start + batch_size]
+        try:
+            output = batch_model.invoke({"emails": "\n\n".join(summarize_email(e, n) for n, e in enumerate(batch, start=1))})
+            by_id = {label.id: EmailType(type=label.type) for label in output.labels}
+        except Exception as e:
+            logger.warning(f"Batch classification failed, falling back to one request per email: {e}")
+            by_id = {}
+
+        missing = [i for i, e in enumerate(batch) if str(e.id) not in by_id]
+        if missing:
+            outputs = model.batch([{"email": str(batch[i])} for i in missing], return_exceptions=True)
+            for i, output in zip(missing, outputs):
+                if isinstance(output, Exception):
+                    logger.error(f"Failed to classify email {batch[i].id}: {output}")
+                else:
+                    by_id[str(batch[i].id)] = output
+        for i, e in enumerate(batch):
+            labels[start + i] = by_id.get(str(e.id))
+    return labels
+
 class EmailClassifierState(BaseModel):
     id: str 
     messages: Annotated[List[AnyMessage], operator.add] = Field(
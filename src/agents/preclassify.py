@@ -0,0 +1,328 @@
+"""
+Local pre-classifier for incoming emails.
+
+Most emails are easy to classify: a PDF named like a resume with
+"application" in the subject is a candidate, a newsletter without
+attachments is not. The pre-classifier decides those cases locally, with
+keyword rules and a TF-IDF/logistic regression model trained on past LLM
+labels, and leaves only the ambiguous emails to the LLM classifier.
+"""
+
+import os
+import re
+import json
+import random
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import joblib
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+from .cache import ClassificationCache
+from .classify import EmailType, classify_batch
+
+logger = logging.getLogger(__name__)
+
+MODEL_PATH = os.getenv("PRECLASSIFIER_MODEL_PATH", "data/preclassifier.joblib")
+LABELS_PATH = os.getenv("PRECLASSIFIER_LABELS_PATH", "data/email_labels.jsonl")
+
+RECRUITMENT_INDICATORS = [
+    "resume", "cv", "application", "job", "position",
+    "candidate", "apply", "hiring", "recruitment",
+]
+BULK_INDICATORS = [
+    "unsubscribe", "newsletter", "webinar", "no-reply", "noreply",
+    "do not reply", "promotion", "offer ends", "view in browser",
+]
+RESUME_FILENAME = re.compile(r"resume|r[ée]sum[ée]|\bcv\b|curriculum|bio[\s_-]?data", re.IGNORECASE)
+RESUME_EXTENSIONS = (".pdf", ".doc", ".docx")
+
+# Characters of the body used for features
+BODY_CHARS = 2000
+
+
+def email_text(email) -> str:
+    """Subject, sender, attachment names and the start of the body of an email, as one string."""
+    metadata = email._metadata or {}
+    filenames = " ".join(attachment.filename for attachment in email._attachments)
+    return "\n".join([
+        metadata.get("subject") or "",
+        metadata.get("from") or "",
+        filenames,
+        (email._body or "")[:BODY_CHARS],
+    ])
+
+
+def email_features(email) -> Dict[str, float]:
+    """
+    Keyword features of an email.
+
+    Args:
+        email: `Email` whose metadata, body and attachments are read
+
+    Returns:
+        Mapping of feature name to value
+    """
+    metadata = email._metadata or {}
+    subject = (metadata.get("subject") or "").lower()
+    sender = (metadata.get("from") or "").lower()
+    body = (email._body or "")[:BODY_CHARS].lower()
+    documents = [a for a in email._attachments if a.filename.lower().endswith(RESUME_EXTENSIONS)]
+
+    return {
+        "attachments": float(len(email._attachments)),
+        "documents": float(len(documents)),
+        "resume_named_document": float(any(RESUME_FILENAME.search(a.filename) for a in documents)),
+        "subject_indicators": float(sum(indicator in subject for indicator in RECRUITMENT_INDICATORS)),
+        "body_indicators": float(sum(indicator in body for indicator in RECRUITMENT_INDICATORS)),
+        "bulk_indicators": float(sum(indicator in body or indicator in sender for indicator in BULK_INDICATORS)),
+    }
+
+
+FEATURE_NAMES = [
+    "attachments", "documents", "resume_named_document",
+    "subject_indicators", "body_indicators", "bulk_indicators",
+]
+
+
+def rule_label(features: Dict[str, float]) -> Optional[str]:
+    """Label of the emails the keyword rules are sure about, None otherwise."""
+    if features["resume_named_document"] and (features["subject_indicators"] or features["body_indicators"]):
+        return "candidate"
+    if not features["attachments"] and features["bulk_indicators"] and not features["subject_indicators"]:
+        return "non candidate"
+    return None
+
+
+class PreClassifierStats:
+    """
+    Counts of local and LLM decisions, and of the agreement between the two
+    on the emails both have classified.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.rules = 0
+        self.model = 0
+        self.llm = 0
+        self.compared = 0
+        self.agreed = 0
+
+    @property
+    def llm_calls_avoided(self) -> float:
+        """Fraction of emails classified without calling the LLM."""
+        return (self.rules + self.model) / self.total if self.total else 0.0
+
+    @property
+    def agreement(self) -> Optional[float]:
+        """Fraction of compared emails on which the local and LLM labels agree."""
+        return self.agreed / self.compared if self.compared else None
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "total": self.total,
+            "rules": self.rules,
+            "model": self.model,
+            "llm": self.llm,
+            "llm_calls_avoided": round(self.llm_calls_avoided, 4),
+            "compared": self.compared,
+            "agreement": None if self.agreement is None else round(self.agreement, 4),
+        }
+
+
+class PreClassifier:
+    """
+    Keyword rules plus a TF-IDF/logistic regression model over the email
+    text and keyword features. Only predictions at least `threshold` sure
+    are used; everything else is left to the LLM.
+    """
+
+    def __init__(self, threshold: float = 0.95, model_path: Optional[str] = None):
+        """
+        Args:
+            threshold: Minimum probability of the predicted label for a local decision
+            model_path: Where the trained model is stored, defaults to the
+                `PRECLASSIFIER_MODEL_PATH` environment variable
+        """
+        self.threshold = threshold
+        self.model_path = Path(model_path or MODEL_PATH)
+        self.vectorizer: Optional[TfidfVectorizer] = None
+        self.classifier: Optional[LogisticRegression] = None
+        self.stats = PreClassifierStats()
+        if self.model_path.exists():
+            self.vectorizer, self.classifier = joblib.load(self.model_path)
+            logger.info(f"Loaded pre-classifier model from {self.model_path}")
+
+    @property
+    def is_trained(self) -> bool:
+        return self.classifier is not None
+
+    def _matrix(self, texts: List[str], features: List[Dict[str, float]]) -> sparse.csr_matrix:
+        keywords = np.log1p(np.array([[f[name] for name in FEATURE_NAMES] for f in features], dtype=np.float64))
+        return sparse.hstack([self.vectorizer.transform(texts), sparse.csr_matrix(keywords)]).tocsr()
+
+    def fit(self, texts: List[str], features: List[Dict[str, float]], labels: List[str]):
+        """
+        Train the model on emails labelled by the LLM.
+
+        Args:
+            texts: Outputs of `email_text`
+            features: Outputs of `email_features`
+            labels: "candidate" or "non candidate" for every email
+        """
+        self.vectorizer = TfidfVectorizer(sublinear_tf=True, min_df=2, max_features=20000, ngram_range=(1, 2))
+        self.vectorizer.fit(texts)
+        self.classifier = LogisticRegression(max_iter=1000, class_weight="balanced")
+        self.classifier.fit(self._matrix(texts, features), labels)
+        logger.info(f"Trained pre-classifier on {len(labels)} labelled emails")
+
+    def fit_labels(self, path: Optional[str] = None):
+        """Train on the labels recorded by `record_labels`."""
+        records = load_labels(path)
+        if len({record["label"] for record in records}) < 2:
+            raise ValueError("Need labelled emails of both classes to train the pre-classifier")
+        self.fit(
+            [record["text"] for record in records],
+            [record["features"] for record in records],
+            [record["label"] for record in records],
+        )
+
+    def save(self):
+        self.model_path.parent.mkdir(parents=True, exist_ok=True)
+        joblib.dump((self.vectorizer, self.classifier), self.model_path)
+
+    def predict(self, texts: List[str], features: List[Dict[str, float]]) -> List[tuple[str, float]]:
+        """Most likely label of every email and its probability; requires a trained model."""
+        probabilities = self.classifier.predict_proba(self._matrix(texts, features))
+        best = probabilities.argmax(axis=1)
+        return [(str(self.classifier.classes_[i]), float(p[i])) for i, p in zip(best, probabilities)]
+
+    def decide(self, emails: list) -> List[Optional[EmailType]]:
+        """
+        Local decision for every email, None when it should go to the LLM.
+        """
+        texts = [email_text(e) for e in emails]
+        features = [email_features(e) for e in emails]
+        decisions: List[Optional[EmailType]] = [None] * len(emails)
+        pending = []
+        for i, f in enumerate(features):
+            label = rule_label(f)
+            if label:
+                decisions[i] = EmailType(type=label)
+                self.stats.rules += 1
+            else:
+                pending.append(i)
+
+        if pending and self.is_trained:
+            predictions = self.predict([texts[i] for i in pending], [features[i] for i in pending])
+            for i, (label, probability) in zip(pending, predictions):
+                if probability >= self.threshold:
+                    decisions[i] = EmailType(type=label)
+                    self.stats.model += 1
+        self.stats.total += len(emails)
+        return decisions
+
+
+def record_labels(emails: list, labels: List[EmailType], path: Optional[str] = None):
+    """Append LLM labels to the training set of the pre-classifier, skipping unlabelled emails."""
+    path = Path(path or LABELS_PATH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as f:
+        for email, label in zip(emails, labels):
+            if label is None:
+                continue
+            f.write(json.dumps({
+                "message_id": (email._metadata or {}).get("message_id"),
+                "text": email_text(email),
+                "features": email_features(email),
+                "label": label.type,
+            }) + "\n")
+
+
+def load_labels(path: Optional[str] = None) -> List[Dict[str, Any]]:
+    path = Path(path or LABELS_PATH)
+    if not path.exists():
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def classify_emails(
+    emails: list,
+    preclassifier: Optional[PreClassifier] = None,
+    audit_rate: float = 0.05,
+    record: bool = True,
+    cache: Optional[ClassificationCache] = None,
+    labels_path: Optional[str] = None,
+) -> List[Optional[EmailType]]:
+    """
+    Classify emails from the cache, locally where possible and with the LLM otherwise.
+
+    Args:
+        emails: Emails to classify; their `type` is set as well
+        preclassifier: Pre-classifier to use, a new one loading the saved model by default
+        audit_rate: Fraction of the local decisions also sent to the LLM to
+            measure the agreement between the two
+        record: Append the LLM labels to the pre-classifier's training set
+        cache: Classification cache, a new one on the default path by default
+        labels_path: Training set the LLM labels are appended to, defaults to
+            the `PRECLASSIFIER_LABELS_PATH` environment variable
+
+    Returns:
+        The label of every email, None for the emails the LLM failed to classify
+    """
+    preclassifier = preclassifier or PreClassifier()
+    cache = cache or ClassificationCache()
+    cached = cache.get_many(emails)
+    misses = [i for i, label in enumerate(cached) if label is None]
+    if misses:
+        labels = _classify([emails[i] for i in misses], preclassifier, audit_rate, record, labels_path)
+        cache.set_many([emails[i] for i in misses], labels)
+        for i, label in zip(misses, labels):
+            cached[i] = label
+
+    for email, label in zip(emails, cached):
+        email.type = label
+    logger.info(f"Classification cache stats: {cache.stats.summary()}")
+    return cached
+
+
+def _classify(
+    emails: list,
+    preclassifier: PreClassifier,
+    audit_rate: float,
+    record: bool,
+    labels_path: Optional[str] = None,
+) -> List[Optional[EmailType]]:
+    decisions = preclassifier.decide(emails)
+
+    audited = [i for i, d in enumerate(decisions) if d is not None and random.random() < audit_rate]
+    to_llm = [i for i, d in enumerate(decisions) if d is None] + audited
+    if to_llm:
+        outputs = classify_batch([emails[i] for i in to_llm])
+        for i, output in zip(to_llm, outputs):
+            if output is None:
+                # Left unlabelled (and out of the cache) to be classified again later
+                continue
+            if decisions[i] is None:
+                decisions[i] = output
+                preclassifier.stats.llm += 1
+            else:
+                preclassifier.stats.compared += 1
+                preclassifier.stats.agreed += decisions[i].type == output.type
+        if record:
+            record_labels([emails[i] for i in to_llm], outputs, labels_path)
+
+    logger.info(f"Pre-classifier stats: {preclassifier.stats.summary()}")
+    return decisions
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    classifier = PreClassifier()
+    classifier.fit_labels()
+    classifier.save()
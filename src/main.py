@@ -1,4 +1,5 @@
 import os
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 import logging
 
@@ -9,6 +10,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
 from src.routes import resume_router
+from src.utils.scheduler import get_email_scheduler
 
 # Configure root logger with different settings for production and development
 load_dotenv()
@@ -34,7 +36,16 @@ else:  # development mode
 # Get logger for this module
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Periodic email ingestion, off unless explicitly enabled
+    scheduler = get_email_scheduler()
+    if os.getenv("EMAIL_CRON_ENABLED", "false").lower() == "true":
+        scheduler.start()
+    yield
+    await scheduler.stop()
+
+app = FastAPI(lifespan=lifespan)
 app.include_router(resume_router, prefix="/v1")
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -17,3 +17,14 @@ CLASSIFY_PROMPT = ChatPromptTemplate([
     ("user","{email}"),
     ("placeholder","{messages}")
 ])
+
+BATCH_CLASSIFY_TEMPLATE = """
+You are a classifier. You will be given a numbered list of emails, each introduced by its number and id, with its subject, sender, attachment names and the beginning of its body.
+Classify every email as a candidate or not. An email is a candidate email if it is related to a job application, e.g. it contains a resume or cover letter. General inquiries, newsletters, invoices and spam are not candidate emails.
+Return exactly one label per email, using the id given for the email.
+"""
+
+BATCH_CLASSIFY_PROMPT = ChatPromptTemplate([
+    ("system", BATCH_CLASSIFY_TEMPLATE),
+    ("user","{emails}"),
+])
@@ -18,23 +18,130 @@ from langchain_core.documents import Document
 from fastapi import APIRouter
 from fastapi import HTTPException
 from fastapi.responses import StreamingResponse
-from fastapi import File, UploadFile
+from fastapi import File, UploadFile, Query
 
 from src.utils.loader import pdf_to_img64, create_message
 from src.outputs import TeachingCandidate 
-from src.schemas import ResumeUploadResponse
+from src.outputs.candidates import skillEnum, roleEnum, levelEnum, stateEnum
+from src.schemas import ResumeUploadResponse, ResumeSearchResponse, FacetCountResponse, JobSpec, MatchResponse, CronRunResponse
 from src.agents import CandidateAgent
+from src.search import get_candidate_index
+from src.utils.scheduler import RunInProgress, get_email_scheduler
 
 router = APIRouter(prefix="/resume", tags=["Resumes"])
 
 logger = logging.getLogger(__name__)
 load_dotenv()
 
+# Master values reported with a zero count by the facet endpoint when no candidate has them
+FACET_ENUMS = {
+    "primary_skill": skillEnum,
+    "secondary_skill": skillEnum,
+    "tertiary_skill": skillEnum,
+    "role": roleEnum,
+    "level": levelEnum,
+    "state": stateEnum,
+}
 
 #FIXME: Clean the database wrong state name data
 @router.post("/search")
-async def search_resume(query:str, filters:dict = None, confidence: float = 0.3)-> List[ResumeUploadResponse]:
-    pass
+async def search_resume(query:str, filters:dict = None, confidence: float = 0.3, top_k: int = 10, keyword_weight: float = 0.5, nprobe: Optional[int] = None)-> List[ResumeSearchResponse]:
+    """
+    Search the extracted candidates with a free-text query.
+
+    Candidates are ranked by a mix of BM25 keyword relevance over their designation,
+    organisation, specialization, skills and location, and embedding similarity.
+
+    Args:
+        query (str): Free-text query, e.g. "PGT Physics Noida"
+        filters (dict): Structured filters on the candidate fields, e.g. {"level": "PGT", "skill": ["Physics", "Chemistry"]}.
+            Fields are ANDed, lists of values are ORed, and "$and"/"$or" take lists of nested filters.
+        confidence (float): Minimum combined score (0-1) of the returned candidates
+        top_k (int): Maximum number of candidates to return
+        keyword_weight (float): Weight (0-1) of the keyword score against the embedding similarity
+        nprobe (Optional[int]): Number of approximate-index lists probed on large pools; higher is slower but more accurate
+
+    Returns:
+        List[ResumeSearchResponse]: Matching candidates sorted by descending confidence
+    """
+    try:
+        hits = get_candidate_index().search(query, top_k=top_k, confidence=confidence, keyword_weight=keyword_weight, filters=filters, nprobe=nprobe)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to search candidates: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to search candidates.")
+
+    return [
+        ResumeSearchResponse(
+            id=hit["id"],
+            confidence=hit["confidence"],
+            candidate=hit["candidate"],
+            resume_url=f"/static/resume/{hit['id']}.pdf",
+        )
+        for hit in hits
+    ]
+
+@router.post("/match")
+async def match_candidates(job: JobSpec, filters: Optional[dict] = None, top_k: int = 10) -> List[MatchResponse]:
+    """
+    Rank the whole candidate pool against a job spec.
+
+    Every candidate is scored on skill, role, level, location and years of experience,
+    and the weighted total is used for the ranking.
+
+    Args:
+        job (JobSpec): The requirements of the job
+        filters (dict): Structured filters restricting the candidate pool, same format as `/search`
+        top_k (int): Maximum number of candidates to return
+
+    Returns:
+        List[MatchResponse]: Best matching candidates with their per-criterion scores
+    """
+    try:
+        hits = get_candidate_index().match(job.model_dump(), top_k=top_k, filters=filters)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to match candidates: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to match candidates.")
+
+    return [
+        MatchResponse(
+            id=hit["id"],
+            score=hit["score"],
+            breakdown=hit["breakdown"],
+            candidate=hit["candidate"],
+            resume_url=f"/static/resume/{hit['id']}.pdf",
+        )
+        for hit in hits
+    ]
+
+@router.post("/facets")
+async def facet_counts(filters: dict = None, fields: Optional[List[str]] = Query(None)) -> FacetCountResponse:
+    """
+    Count the extracted candidates per skill, role, level, state and city.
+
+    Args:
+        filters (dict): Structured filters restricting the counted candidates, same format as `/search`
+        fields (Optional[List[str]]): Facet fields to count, defaults to all of them
+
+    Returns:
+        FacetCountResponse: Number of matching candidates and the count of each value per field
+    """
+    try:
+        counts = get_candidate_index().facet_counts(fields, filters)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to count facets: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to count facets.")
+
+    for field, values in counts["facets"].items():
+        if field in FACET_ENUMS:
+            for member in FACET_ENUMS[field]:
+                values.setdefault(member.value, 0)
+    return FacetCountResponse(**counts)
 
 @router.post("/zip")
 async def get_resumes(ids: list[str]):
@@ -160,18 +267,13 @@ async def batch_load(ids: Optional[List[str]] = None, zip_file: UploadFile = Fil
         logger.error(f"Failed to batch process PDFs to Form: {e}")
         raise HTTPException(status_code=500, detail="Failed to batch parse PDFs.")
     
-    logger.info("Batch processing complete, upserting to vectorstor.")
-    # try:
-    #     docs = await vectorstore.aadd_documents([
-    #         Document(
-    #             page_content=json.dumps(output["candidate"][-1]), 
-    #             metadata=output["candidate"][-1]
-    #         )
-    #         for output in outputs
-    #     ])
-    # except Exception as e:
-    #     logger.error(f"Failed to add document to vectorstore: {e}")
-    # logger.info("Added batch to vectorstore, returning the list of candidates.")
+    logger.info("Batch processing complete, adding candidates to the search index.")
+    try:
+        candidates = {output["id"]: output["candidate"][-1] for output in outputs if output.get("candidate")}
+        await asyncio.to_thread(get_candidate_index().add_many, candidates)
+    except Exception as e:
+        logger.error(f"Failed to add candidates to the search index: {e}")
+    logger.info("Added batch to the search index, returning the list of candidates.")
     
     output_map = {output["id"]: output for output in outputs}
     
@@ -205,8 +307,10 @@ async def delete_resumes(ids: list[str]):
         dict: Contains status for each resume ID and summary statistics
     """
     response = []
+    index = get_candidate_index()
     
     for id in ids:
+        await asyncio.to_thread(index.remove, id)
         try:
             if os.path.exists(f"./static/resume/{id}.pdf"):
                 os.remove(f"./static/resume/{id}.pdf")
@@ -229,7 +333,6 @@ async def delete_resumes(ids: list[str]):
                 "status": "failure",
                 "message": f"Error deleting file: {str(e)}"
             })
-    
     return response
 
 @router.get("/{resume_id}", )
@@ -242,6 +345,7 @@ async def update_resume(resume_id:int) :
 
 @router.delete("/{resume_id}", )
 async def delete_resume(resume_id:str):
+    await asyncio.to_thread(get_candidate_index().remove, resume_id)
     try:
         if os.path.exists(f"./static/resume/{resume_id}.pdf"):
             os.remove(f"./static/resume/{resume_id}.pdf")
@@ -311,17 +415,12 @@ async def load_resume(id: Optional[str] = None, pdf_file: UploadFile = File(...)
             error="Failed to extract candidate information."
         )
     
-    # try:
-    #     await vectorstore.aadd_documents([(
-    #         Document(
-    #             page_content=json.dumps(output["candidate"][-1]), 
-    #             metadata=output["candidate"][-1]
-    #         )
-    #     )])
-    #     logger.info("Successfully inserted candidate record")
-
-    # except Exception as e:
-    #     logger.warning(f"Failed to add document to vectorstore: {e}")
+    try:
+        await asyncio.to_thread(get_candidate_index().add, output["id"], output["candidate"][-1])
+        logger.info("Successfully inserted candidate record")
+
+    except Exception as e:
+        logger.warning(f"Failed to add candidate to the search index: {e}")
     
     return ResumeUploadResponse(
         status="success",
@@ -331,7 +430,38 @@ async def load_resume(id: Optional[str] = None, pdf_file: UploadFile = File(...)
     ) 
 
 @router.post("/cron/email")
-async def cron_job() -> List[TeachingCandidate]:
+async def cron_job(wait: bool = False) -> CronRunResponse:
+    """
+    Trigger an email ingestion run: new emails are classified and the resumes
+    of the candidates extracted and added to the search index.
+
+    Args:
+        wait (bool): Wait for the run to finish instead of returning as soon as it has started
+
+    Returns:
+        CronRunResponse: The id of the run, its status and, once finished, its stats
+    Raises:
+        HTTPException: 409 if a run is already in progress
+    """
+    scheduler = get_email_scheduler()
+    try:
+        run = await scheduler.trigger()
+    except RunInProgress as e:
+        raise HTTPException(status_code=409, detail=f"Run {e.run['run_id']} is already in progress")
+    except Exception as e:
+        logger.error(f"Failed to start email ingestion: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to start email ingestion.")
+
+    if wait:
+        await scheduler.wait()
+    return CronRunResponse(**run)
+
+@router.get("/cron/email/{run_id}")
+async def cron_job_status(run_id: str) -> CronRunResponse:
     """
+    Status and stats of an email ingestion run.
     """
-    pass
+    run = get_email_scheduler().get(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail=f"Run {run_id} not found")
+    return CronRunResponse(**run)
@@ -1,6 +1,6 @@
 from src.outputs import TeachingCandidate
-from typing import Literal, Optional
-from pydantic import BaseModel
+from typing import Any, Dict, Literal, Optional
+from pydantic import BaseModel, Field
 
 class ResumeUploadResponse(BaseModel):
     status: Literal["pending", "success", "failure", "cancelled", "processing"]
@@ -14,6 +14,41 @@ class ResumeUploadResponse(BaseModel):
 class ResumeSearchResponse(BaseModel):
     id : str
     confidence : float
+    resume_url: Optional[str] = None
+    candidate: Optional[TeachingCandidate] = None
+
+
+class JobSpec(BaseModel):
+    skill: str = Field(description="The skill required for the job")
+    role: Optional[str] = Field(None, description="The role of the job")
+    level: Optional[str] = Field(None, description="The level of the job, adjacent levels get partial credit")
+    city: Optional[str] = Field(None, description="The city of the job")
+    state: Optional[str] = Field(None, description="The state of the job, used when the candidate's city doesn't match")
+    min_experience: float = Field(0.0, ge=0, description="Minimum years of experience, counted from the candidate's career start")
+    weights: Optional[Dict[str, float]] = Field(None, description="Weight of each criterion: skill, role, level, location, experience")
+
+
+class MatchResponse(BaseModel):
+    id: str
+    score: float
+    breakdown: Dict[str, float]
+    resume_url: Optional[str] = None
+    candidate: Optional[TeachingCandidate] = None
+
+
+class FacetCountResponse(BaseModel):
+    total: int
+    facets: Dict[str, Dict[str, int]]
+
+
+class CronRunResponse(BaseModel):
+    run_id: str
+    trigger: Literal["manual", "scheduled"]
+    status: Literal["running", "success", "failure"]
+    started_at: str
+    finished_at: Optional[str] = None
+    error: Optional[str] = None
+    stats: Optional[Dict[str, Any]] = Field(None, description="Emails scanned and classified, resumes extracted and time per stage")
 
 DEMO_RESPONSE = {
   "id": "ed48649d-cd8c-4cba-b276-f03c0cef19b4",
@@ -0,0 +1,3 @@
+from .index import CandidateIndex, IndexWriter, get_candidate_index
+
+__all__ = ["CandidateIndex", "IndexWriter", "get_candidate_index"]
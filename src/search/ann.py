@@ -0,0 +1,203 @@
+"""
+Approximate nearest-neighbour index.
+
+An inverted-file (IVF) index on top of the VectorIndex storage: vectors are
+clustered with spherical k-means and each slot is filed under its nearest
+centroid. A query only scores the slots filed under its `nprobe` nearest
+centroids, so `nprobe` trades recall for latency. The IVF index stores slot
+lists only; the (quantized, memory-mapped) vectors stay in the VectorIndex.
+"""
+
+import json
+import logging
+from contextlib import nullcontext
+from pathlib import Path
+from typing import ContextManager, List, Optional
+
+import numpy as np
+from scipy import sparse
+
+from .vector_index import VectorIndex
+
+logger = logging.getLogger(__name__)
+
+
+def kmeans(vectors: np.ndarray, n_clusters: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """
+    Spherical k-means on L2-normalised vectors.
+
+    Args:
+        vectors: Array of shape (n, dim)
+        n_clusters: Number of centroids
+        iterations: Number of Lloyd iterations
+        seed: Random seed for the initial centroids
+
+    Returns:
+        L2-normalised centroids of shape (n_clusters, dim)
+    """
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = assign(vectors, centroids)
+        # Sum the members of each cluster with a sparse one-hot product
+        one_hot = sparse.csr_matrix(
+            (np.ones(len(vectors), dtype=np.float32), (assignment, np.arange(len(vectors)))),
+            shape=(n_clusters, len(vectors)),
+        )
+        sums = np.asarray(one_hot @ vectors)
+        empty = np.bincount(assignment, minlength=n_clusters) == 0
+        # Re-seed empty clusters with random points so every list stays useful
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids = sums / norms
+    return centroids.astype(np.float32)
+
+
+def assign(vectors: np.ndarray, centroids: np.ndarray, chunk: int = 16384) -> np.ndarray:
+    """Index of the nearest centroid of every vector, computed in chunks."""
+    vectors = np.atleast_2d(vectors)
+    return np.concatenate([
+        np.argmax(vectors[start:start + chunk] @ centroids.T, axis=1)
+        for start in range(0, len(vectors), chunk)
+    ]) if len(vectors) else np.empty(0, dtype=np.int64)
+
+
+class IVFIndex:
+    """
+    Inverted-file index mapping centroids to the slots closest to them.
+    """
+
+    def __init__(self, nprobe: int = 8):
+        """
+        Args:
+            nprobe: Default number of lists probed per query; higher is slower
+                but has better recall
+        """
+        self.nprobe = nprobe
+        self.centroids: Optional[np.ndarray] = None
+        self.trained_size = 0
+        self._lists: List[List[int]] = []
+        self._arrays: List[Optional[np.ndarray]] = []
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    @property
+    def n_lists(self) -> int:
+        return 0 if self.centroids is None else len(self.centroids)
+
+    def train(
+        self,
+        vectors: VectorIndex,
+        n_lists: Optional[int] = None,
+        sample_size: int = 65536,
+        iterations: int = 10,
+        lock: Optional[ContextManager] = None,
+    ) -> int:
+        """
+        Cluster the live vectors and file every live slot under its nearest centroid.
+
+        Args:
+            vectors: Vector storage to index
+            n_lists: Number of centroids, defaults to sqrt of the number of vectors
+            sample_size: Number of vectors the centroids are trained on
+            iterations: Number of k-means iterations
+            lock: Lock guarding `vectors`, only held while vectors are read so
+                that the storage can keep being written to during the training
+
+        Returns:
+            The number of slots of `vectors` when training started; slots added
+            after that are not filed
+        """
+        lock = lock or nullcontext()
+        with lock:
+            size = vectors.size
+            live = np.flatnonzero(vectors.live)
+        n_lists = n_lists or max(1, int(np.sqrt(len(live))))
+        if len(live) < n_lists:
+            raise ValueError(f"Need at least {n_lists} vectors to train {n_lists} lists, got {len(live)}")
+
+        rng = np.random.default_rng(0)
+        sample = live if len(live) <= sample_size else np.sort(rng.choice(live, sample_size, replace=False))
+        with lock:
+            sample_vectors = vectors.get(sample)
+        self.centroids = kmeans(sample_vectors, n_lists, iterations)
+        self._lists = [[] for _ in range(n_lists)]
+        self._arrays = [None] * n_lists
+        for start in range(0, len(live), 65536):
+            chunk = live[start:start + 65536]
+            with lock:
+                chunk_vectors = vectors.get(chunk)
+            self.add(chunk, chunk_vectors)
+        self.trained_size = len(live)
+        logger.info(f"Trained IVF index with {n_lists} lists on {len(sample)} of {len(live)} vectors")
+        return size
+
+    def add(self, slots: np.ndarray, vectors: np.ndarray):
+        """File new slots under their nearest centroid."""
+        if not self.is_trained:
+            return
+        assignment = assign(vectors, self.centroids)
+        for slot, list_id in zip(np.asarray(slots).tolist(), assignment.tolist()):
+            self._lists[list_id].append(slot)
+            self._arrays[list_id] = None
+
+    def _list(self, list_id: int) -> np.ndarray:
+        if self._arrays[list_id] is None:
+            self._arrays[list_id] = np.asarray(self._lists[list_id], dtype=np.int64)
+        return self._arrays[list_id]
+
+    def candidates(self, query: np.ndarray, nprobe: Optional[int] = None) -> np.ndarray:
+        """
+        Slots filed under the `nprobe` centroids nearest to the query.
+
+        Removed slots are not purged from the lists; callers filter them out
+        with the live mask of the vector storage.
+        """
+        nprobe = min(nprobe or self.nprobe, self.n_lists)
+        similarity = self.centroids @ np.asarray(query, dtype=np.float32).reshape(-1)
+        probes = np.argpartition(-similarity, nprobe - 1)[:nprobe]
+        return np.concatenate([self._list(list_id) for list_id in probes])
+
+    def search(
+        self,
+        vectors: VectorIndex,
+        query: np.ndarray,
+        top_k: int = 10,
+        threshold: float = 0.0,
+        nprobe: Optional[int] = None,
+    ):
+        """
+        Approximate top-k search; see `VectorIndex.search` for the arguments.
+        """
+        mask = np.zeros(vectors.size, dtype=bool)
+        mask[self.candidates(query, nprobe)] = True
+        return vectors.search(query, top_k=top_k, threshold=threshold, mask=mask)
+
+    def save(self, directory: Path):
+        """Persist the centroids and lists to `directory`."""
+        if not self.is_trained:
+            return
+        directory = Path(directory)
+        lengths = np.array([len(slots) for slots in self._lists], dtype=np.int64)
+        slots = np.concatenate([self._list(list_id) for list_id in range(self.n_lists)])
+        np.savez(directory / "ann.npz", centroids=self.centroids, lengths=lengths, slots=slots)
+        with open(directory / "ann.json", "w") as f:
+            json.dump({"nprobe": self.nprobe, "trained_size": self.trained_size}, f)
+
+    @classmethod
+    def load(cls, directory: Path) -> "IVFIndex":
+        """Load an index previously written with `save`."""
+        directory = Path(directory)
+        with open(directory / "ann.json") as f:
+            meta = json.load(f)
+        arrays = np.load(directory / "ann.npz")
+        index = cls(nprobe=meta["nprobe"])
+        index.trained_size = meta["trained_size"]
+        index.centroids = arrays["centroids"]
+        offsets = np.concatenate([[0], np.cumsum(arrays["lengths"])])
+        index._lists = [arrays["slots"][offsets[i]:offsets[i + 1]].tolist() for i in range(len(index.centroids))]
+        index._arrays = [None] * len(index.centroids)
+        return index
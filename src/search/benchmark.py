@@ -0,0 +1,218 @@
+"""
+Recall and latency benchmark for the approximate nearest-neighbour index.
+
+Builds a VectorIndex and an IVFIndex over synthetic clustered embeddings and
+reports, for every `nprobe`, the recall@k against exact brute-force search on
+float32 vectors and the mean query latency.
+
+With `--hybrid`, it instead times hybrid queries of a CandidateIndex with a
+trained IVF index, for query terms found in a growing fraction of the pool,
+against the same queries without keywords, to check that common terms don't
+turn the IVF shortlist back into a scan of the whole pool.
+
+Usage:
+    python -m src.search.benchmark --size 1000000 --dtype int8 --nprobe 1 4 8 16 32
+    python -m src.search.benchmark --hybrid --size 200000
+"""
+
+import time
+import logging
+import argparse
+import tempfile
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .ann import IVFIndex
+from .index import CandidateIndex
+from .vector_index import VectorIndex
+
+logger = logging.getLogger(__name__)
+
+
+def synthetic_embeddings(size: int, dim: int, n_clusters: int = 500, seed: int = 0) -> np.ndarray:
+    """Clustered, L2-normalised random vectors that behave more like real embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(n_clusters, size=size)] + 0.5 * rng.standard_normal((size, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class QueryEmbedder:
+    """Embedder handing out preset query vectors in turn, so that queries skip the embedding model."""
+
+    name = "benchmark"
+
+    def __init__(self, queries: np.ndarray):
+        self.dim = queries.shape[1]
+        self.queries = queries
+        self.calls = 0
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = self.queries[np.arange(self.calls, self.calls + len(texts)) % len(self.queries)]
+        self.calls += len(texts)
+        return vectors
+
+
+def run_benchmark(
+    size: int = 200000,
+    dim: int = 256,
+    dtype: str = "float32",
+    n_queries: int = 200,
+    k: int = 10,
+    nprobes: List[int] = (1, 4, 8, 16, 32),
+    n_lists: int = None,
+) -> List[Dict[str, float]]:
+    """
+    Measure recall@k and latency of the IVF index against brute force.
+
+    Args:
+        size: Number of indexed vectors
+        dim: Dimension of the vectors
+        dtype: Storage dtype of the vector index
+        n_queries: Number of queries
+        k: Number of neighbours compared
+        nprobes: Values of nprobe to measure
+        n_lists: Number of IVF lists, defaults to sqrt(size)
+
+    Returns:
+        One dict per measured configuration with its recall and latency
+    """
+    vectors = synthetic_embeddings(size + n_queries, dim)
+    data, queries = vectors[:size], vectors[size:]
+
+    # Ground truth on exact float32 vectors
+    exact = VectorIndex(dim, dtype="float32")
+    exact.add(data)
+    start = time.perf_counter()
+    truth = [{slot for slot, _ in exact.search(query, top_k=k, threshold=-1.0)} for query in queries]
+    brute_ms = (time.perf_counter() - start) / n_queries * 1000
+    results = [{"method": "brute force float32", "nprobe": 0, "recall": 1.0, "latency_ms": brute_ms}]
+    logger.info(f"Brute force float32: {brute_ms:.2f} ms/query")
+
+    with tempfile.TemporaryDirectory() as directory:
+        index = VectorIndex(dim, dtype=dtype)
+        index.add(data)
+        index.save(directory)
+        index = VectorIndex.load(directory)
+
+        start = time.perf_counter()
+        ivf = IVFIndex()
+        ivf.train(index, n_lists=n_lists)
+        logger.info(f"Trained {ivf.n_lists} lists in {time.perf_counter() - start:.1f} s")
+
+        for nprobe in nprobes:
+            found, start = 0, time.perf_counter()
+            for query, expected in zip(queries, truth):
+                hits = ivf.search(index, query, top_k=k, threshold=-1.0, nprobe=nprobe)
+                found += len(expected & {slot for slot, _ in hits})
+            latency = (time.perf_counter() - start) / n_queries * 1000
+            recall = found / (k * n_queries)
+            results.append({"method": f"ivf {dtype}", "nprobe": nprobe, "recall": recall, "latency_ms": latency})
+            logger.info(f"IVF {dtype} nprobe={nprobe}: recall@{k}={recall:.3f}, {latency:.2f} ms/query")
+
+    return results
+
+
+def run_hybrid_benchmark(
+    size: int = 200000,
+    dim: int = 256,
+    n_queries: int = 200,
+    k: int = 10,
+    fractions: List[float] = (0.01, 0.1, 0.5, 1.0),
+    nprobe: int = 8,
+    max_overhead: float = 2.0,
+) -> List[Dict[str, float]]:
+    """
+    Measure the latency of hybrid queries against the IVF index as the
+    fraction of the pool matching the query keyword grows.
+
+    Every synthetic candidate has the term `tier<p>` for each percentage `p`
+    of `fractions` it falls under, so the query `tier<p>` hits p% of the pool.
+    The overhead of a hybrid query is its latency beyond that of the same
+    query without keywords plus the BM25 scoring of the keyword, i.e. the
+    cost of scoring the keyword hits added to the IVF shortlist.
+
+    Args:
+        size: Number of indexed candidates
+        dim: Dimension of the vectors
+        n_queries: Number of queries per configuration
+        k: Number of results per query
+        fractions: Fractions of the pool matching the query keyword
+        nprobe: Number of IVF lists probed
+        max_overhead: Overhead, as a multiple of the latency without keywords,
+            above which a configuration is reported as too slow
+
+    Returns:
+        One dict per measured configuration with its latency and overhead
+    """
+    vectors = synthetic_embeddings(size + n_queries, dim)
+    data, queries = vectors[:size], vectors[size:]
+    tiers = {fraction: f"tier{round(fraction * 100)}" for fraction in fractions}
+    draws = np.random.default_rng(1).random(size)
+
+    index = CandidateIndex(tempfile.mkdtemp(), QueryEmbedder(queries))
+    start = time.perf_counter()
+    ids = [f"cand-{slot}" for slot in range(size)]
+    candidates = [
+        {"primary_skill": " ".join(tier for fraction, tier in tiers.items() if draw < fraction)}
+        for draw in draws
+    ]
+    with index._lock:
+        index._apply_add(ids, candidates, data)
+    logger.info(f"Indexed {size} candidates in {time.perf_counter() - start:.1f} s")
+    # Training starts in the background once the pool reaches ANN_MIN_SIZE
+    while index._training:
+        time.sleep(0.1)
+    if not index.ann.is_trained:
+        index._train()
+
+    def timed(query: str, keyword_weight: float) -> Tuple[float, float]:
+        """Mean latency of the query and of its BM25 scoring alone, interleaved so that both see the same load."""
+        search_time = keyword_time = 0.0
+        for _ in range(n_queries):
+            start = time.perf_counter()
+            index.keywords.scores(query, index.vectors.size)
+            middle = time.perf_counter()
+            index.search(query, top_k=k, confidence=0.0, keyword_weight=keyword_weight, nprobe=nprobe)
+            keyword_time += middle - start
+            search_time += time.perf_counter() - middle
+        return search_time / n_queries * 1000, keyword_time / n_queries * 1000
+
+    baseline, _ = timed("", keyword_weight=0.0)
+    results = [{"method": "vector only", "fraction": 0.0, "latency_ms": baseline, "overhead_ms": 0.0}]
+    logger.info(f"Vector only nprobe={nprobe}: {baseline:.2f} ms/query")
+    for fraction, tier in tiers.items():
+        hybrid, keyword_ms = timed(tier, keyword_weight=0.5)
+        overhead = hybrid - baseline - keyword_ms
+        results.append({"method": "hybrid", "fraction": fraction, "latency_ms": hybrid, "overhead_ms": overhead})
+        message = (
+            f"Hybrid, keyword in {fraction:.0%} of the pool: {hybrid:.2f} ms/query "
+            f"({keyword_ms:.2f} ms BM25, {overhead:.2f} ms shortlist overhead)"
+        )
+        if overhead > max_overhead * baseline:
+            logger.warning(f"{message}, more than {max_overhead:.1f}x the latency without keywords")
+        else:
+            logger.info(message)
+
+    return results
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Benchmark the IVF index against brute force")
+    parser.add_argument("--size", type=int, default=200000, help="Number of indexed vectors")
+    parser.add_argument("--dim", type=int, default=256, help="Dimension of the vectors")
+    parser.add_argument("--dtype", type=str, default="float32", choices=["float32", "float16", "int8"],
+                        help="Storage dtype of the vector index")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries")
+    parser.add_argument("--k", type=int, default=10, help="Number of neighbours compared")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32], help="Values of nprobe to measure")
+    parser.add_argument("--lists", type=int, help="Number of IVF lists (default sqrt(size))")
+    parser.add_argument("--hybrid", action="store_true", help="Time hybrid queries with common keywords instead")
+    args = parser.parse_args()
+
+    if args.hybrid:
+        run_hybrid_benchmark(args.size, args.dim, args.queries, args.k, nprobe=args.nprobe[0])
+    else:
+        run_benchmark(args.size, args.dim, args.dtype, args.queries, args.k, args.nprobe, args.lists)
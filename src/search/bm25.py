@@ -0,0 +1,172 @@
+"""
+BM25 keyword index.
+
+An inverted index over the fields recruiters search for literally
+(designation, organisation, specialization, skills, level and location).
+Documents are identified by the same slots as the vector index and can be
+added or removed one at a time without rebuilding the postings.
+"""
+
+import re
+import json
+import math
+import logging
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens of a string."""
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+
+def candidate_terms(candidate: Dict[str, Any]) -> List[str]:
+    """
+    Tokens of the keyword-searchable fields of a candidate record.
+
+    Args:
+        candidate: Candidate dictionary, as dumped from `TeachingCandidate`
+
+    Returns:
+        List of tokens, with repeats, used as the BM25 document
+    """
+    fields = [
+        candidate.get("role"),
+        candidate.get("level"),
+        candidate.get("primary_skill"),
+        candidate.get("secondary_skill"),
+        candidate.get("tertiary_skill"),
+        candidate.get("city"),
+        candidate.get("state"),
+    ]
+    for experience in candidate.get("experiences") or []:
+        fields.append(experience.get("designation"))
+        fields.append(experience.get("organisation"))
+    for education in candidate.get("education") or []:
+        fields.append(education.get("specialization"))
+
+    return [token for field in fields if field for token in tokenize(str(field))]
+
+
+class BM25Index:
+    """
+    Incrementally maintained Okapi BM25 inverted index.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self._doc_terms: Dict[int, List[str]] = {}
+        self._doc_len = np.zeros(1024, dtype=np.float32)
+        self._total_len = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def add(self, slot: int, terms: List[str]):
+        """
+        Index a document under `slot`, replacing any document already there.
+
+        Args:
+            slot: Slot of the document, shared with the vector index
+            terms: Tokens of the document
+        """
+        if slot in self._doc_terms:
+            self.remove(slot)
+        if slot >= len(self._doc_len):
+            doc_len = np.zeros(max(slot + 1, 2 * len(self._doc_len)), dtype=np.float32)
+            doc_len[:len(self._doc_len)] = self._doc_len
+            self._doc_len = doc_len
+
+        counts = Counter(terms)
+        for term, tf in counts.items():
+            self.postings.setdefault(term, {})[slot] = tf
+        self._doc_terms[slot] = list(counts)
+        self._doc_len[slot] = len(terms)
+        self._total_len += len(terms)
+
+    def remove(self, slot: int):
+        """Remove the document stored under `slot`, if any."""
+        terms = self._doc_terms.pop(slot, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self.postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(slot, None)
+            if not postings:
+                del self.postings[term]
+        self._total_len -= int(self._doc_len[slot])
+        self._doc_len[slot] = 0
+
+    def scores(self, query: str, size: int, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        BM25 score of every slot for a free-text query.
+
+        Args:
+            query: Free-text query
+            size: Number of slots to score (length of the returned array)
+            mask: Optional boolean array over slots; masked-out slots score 0
+
+        Returns:
+            Array of shape (size,) with the BM25 score of each slot
+        """
+        scores = np.zeros(size, dtype=np.float32)
+        n_docs = len(self._doc_terms)
+        if n_docs == 0:
+            return scores
+        avg_len = self._total_len / n_docs
+
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            slots = np.fromiter(postings.keys(), dtype=np.int64, count=len(postings))
+            tf = np.fromiter(postings.values(), dtype=np.float32, count=len(postings))
+            keep = slots < size
+            slots, tf = slots[keep], tf[keep]
+            if mask is not None:
+                keep = mask[slots]
+                slots, tf = slots[keep], tf[keep]
+
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self._doc_len[slots] / avg_len)
+            scores[slots] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+    def save(self, directory: Path):
+        """Persist the index to `directory`."""
+        with open(Path(directory) / "bm25.json", "w") as f:
+            json.dump({
+                "k1": self.k1,
+                "b": self.b,
+                "docs": {slot: terms for slot, terms in self._doc_terms.items()},
+                "postings": self.postings,
+                "doc_len": self._doc_len[:max(self._doc_terms, default=-1) + 1].tolist(),
+            }, f)
+
+    @classmethod
+    def load(cls, directory: Path) -> "BM25Index":
+        """Load an index previously written with `save`."""
+        with open(Path(directory) / "bm25.json") as f:
+            data = json.load(f)
+        index = cls(data["k1"], data["b"])
+        index._doc_terms = {int(slot): terms for slot, terms in data["docs"].items()}
+        index.postings = {
+            term: {int(slot): tf for slot, tf in postings.items()}
+            for term, postings in data["postings"].items()
+        }
+        doc_len = np.asarray(data["doc_len"], dtype=np.float32)
+        index._doc_len = np.zeros(max(len(doc_len), 1024), dtype=np.float32)
+        index._doc_len[:len(doc_len)] = doc_len
+        index._total_len = int(doc_len.sum())
+        return index
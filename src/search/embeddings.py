@@ -0,0 +1,127 @@
+"""
+Candidate embedding utilities.
+
+This module turns extracted `TeachingCandidate` records into text and dense
+vectors that can be stored in the search index. Two embedders are provided:
+- HashingEmbedder: a local, stateless embedder that works offline
+- OpenAIEmbedder: a thin wrapper around the OpenAI embedding API
+"""
+
+import os
+import logging
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+
+logger = logging.getLogger(__name__)
+
+
+def candidate_to_text(candidate: Dict[str, Any]) -> str:
+    """
+    Flatten the searchable parts of a candidate record into a single string.
+
+    Args:
+        candidate: Candidate dictionary, as dumped from `TeachingCandidate`
+
+    Returns:
+        Space separated text of the candidate's role, skills, location and history
+    """
+    parts = [
+        candidate.get("role"),
+        candidate.get("level"),
+        candidate.get("primary_skill"),
+        candidate.get("secondary_skill"),
+        candidate.get("tertiary_skill"),
+        candidate.get("city"),
+        candidate.get("state"),
+    ]
+    for experience in candidate.get("experiences") or []:
+        parts.append(experience.get("designation"))
+        parts.append(experience.get("organisation"))
+    for education in candidate.get("education") or []:
+        parts.append(education.get("degree"))
+        parts.append(education.get("specialization"))
+
+    return " ".join(str(part) for part in parts if part)
+
+
+class HashingEmbedder:
+    """
+    Local embedder based on the hashing trick. It needs no fitting and no
+    network access, so vectors stay stable as candidates are added.
+    """
+
+    name = "hashing"
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+        self._vectorizer = HashingVectorizer(
+            n_features=dim,
+            ngram_range=(1, 2),
+            alternate_sign=True,
+            norm="l2",
+        )
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed a list of texts into L2-normalised float32 vectors.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            Array of shape (len(texts), dim)
+        """
+        matrix = self._vectorizer.transform(texts).toarray().astype(np.float32)
+        return _normalize(matrix)
+
+
+class OpenAIEmbedder:
+    """
+    Embedder backed by the OpenAI embeddings API.
+    """
+
+    name = "openai"
+
+    def __init__(self, dim: int = 256, model: str = "text-embedding-3-small"):
+        from langchain_openai import OpenAIEmbeddings
+
+        self.dim = dim
+        self._embeddings = OpenAIEmbeddings(model=model, dimensions=dim)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        matrix = np.asarray(self._embeddings.embed_documents(texts), dtype=np.float32)
+        return _normalize(matrix)
+
+
+EMBEDDERS = {
+    HashingEmbedder.name: HashingEmbedder,
+    OpenAIEmbedder.name: OpenAIEmbedder,
+}
+
+
+def get_embedder(name: Optional[str] = None, dim: Optional[int] = None):
+    """
+    Create an embedder by name. Defaults are read from the `SEARCH_EMBEDDER`
+    and `SEARCH_EMBEDDING_DIM` environment variables.
+
+    Args:
+        name: One of "hashing" or "openai"
+        dim: Dimension of the produced vectors
+
+    Returns:
+        Embedder instance exposing `name`, `dim` and `embed(texts)`
+    """
+    name = name or os.getenv("SEARCH_EMBEDDER", HashingEmbedder.name)
+    dim = dim or int(os.getenv("SEARCH_EMBEDDING_DIM", 256))
+    if name not in EMBEDDERS:
+        raise ValueError(f"Unknown embedder: {name}. Use one of {list(EMBEDDERS)}")
+    logger.info(f"Using {name} embedder with {dim} dimensions")
+    return EMBEDDERS[name](dim=dim)
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
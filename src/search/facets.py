@@ -0,0 +1,287 @@
+"""
+Bitmap facet index.
+
+For every facet field (skills, role, level, state and city) the index keeps
+one bitmap per value holding the slots of the candidates with that value.
+Structured filters are evaluated as bitmap AND/OR operations and turned into
+a slot mask before any vector or keyword scoring happens, and the same
+bitmaps answer facet-count queries.
+"""
+
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FACET_FIELDS = ("primary_skill", "secondary_skill", "tertiary_skill", "role", "level", "state", "city")
+
+# Pseudo fields that match a candidate if any of the underlying fields match
+FACET_ALIASES = {
+    "skill": ("primary_skill", "secondary_skill", "tertiary_skill"),
+}
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+class Bitmap:
+    """
+    Compressed set of slots.
+
+    While sparse, a bitmap is stored as a sorted array of slots (4 bytes per
+    member); once that becomes larger than a packed bitset over all slots
+    (1 bit per slot) it switches to the bitset, as in roaring bitmaps.
+    """
+
+    def __init__(self):
+        self._array = np.empty(0, dtype=np.uint32)
+        self._bits: Optional[np.ndarray] = None
+        self._pending: List[int] = []
+        self._removed: List[int] = []
+
+    @property
+    def is_dense(self) -> bool:
+        return self._bits is not None
+
+    def add(self, slot: int):
+        if self._bits is not None:
+            if (slot >> 3) >= len(self._bits):
+                bits = np.zeros(max((slot >> 3) + 1, 2 * len(self._bits)), dtype=np.uint8)
+                bits[:len(self._bits)] = self._bits
+                self._bits = bits
+            self._bits[slot >> 3] |= np.uint8(1 << (slot & 7))
+        else:
+            if self._removed:
+                self._flush()
+            self._pending.append(slot)
+
+    def remove(self, slot: int):
+        if self._bits is not None:
+            if (slot >> 3) < len(self._bits):
+                self._bits[slot >> 3] &= np.uint8(~(1 << (slot & 7)) & 0xFF)
+        else:
+            if self._pending:
+                self._flush()
+            self._removed.append(slot)
+
+    def _flush(self):
+        if self._pending:
+            pending = np.asarray(self._pending, dtype=np.uint32)
+            self._array = np.union1d(self._array, pending).astype(np.uint32)
+            self._pending = []
+        if self._removed:
+            removed = np.asarray(self._removed, dtype=np.uint32)
+            self._array = np.setdiff1d(self._array, removed).astype(np.uint32)
+            self._removed = []
+
+    def optimize(self, size: int):
+        """
+        Pick the smaller representation for a bitmap over `size` slots.
+        """
+        nbytes = (size + 7) // 8
+        if self._bits is None:
+            self._flush()
+            if 4 * len(self._array) > nbytes:
+                self._bits = self.to_bits(size)
+                self._array = np.empty(0, dtype=np.uint32)
+        elif 4 * self.count() < nbytes // 2:
+            self._array = self.to_array()
+            self._bits = None
+
+    def to_bits(self, size: int) -> np.ndarray:
+        """Packed little-endian bitset over `size` slots."""
+        nbytes = (size + 7) // 8
+        if self._bits is not None:
+            bits = np.zeros(nbytes, dtype=np.uint8)
+            n = min(nbytes, len(self._bits))
+            bits[:n] = self._bits[:n]
+            return bits
+        self._flush()
+        members = np.zeros(nbytes * 8, dtype=bool)
+        members[self._array[self._array < size]] = True
+        return np.packbits(members, bitorder="little")
+
+    def to_array(self) -> np.ndarray:
+        """Sorted array of the slots in the bitmap."""
+        if self._bits is not None:
+            return np.flatnonzero(np.unpackbits(self._bits, bitorder="little")).astype(np.uint32)
+        self._flush()
+        return self._array
+
+    def count(self, within: Optional[np.ndarray] = None) -> int:
+        """
+        Number of slots in the bitmap.
+
+        Args:
+            within: Optional boolean mask over slots; only slots set in it are counted
+        """
+        if self._bits is not None:
+            if within is None:
+                return int(_POPCOUNT[self._bits].sum(dtype=np.int64))
+            bits = self.to_bits(len(within)) & np.packbits(within, bitorder="little")
+            return int(_POPCOUNT[bits].sum(dtype=np.int64))
+        self._flush()
+        if within is None:
+            return len(self._array)
+        return int(within[self._array[self._array < len(within)]].sum())
+
+
+class FacetIndex:
+    """
+    Bitmap index over the categorical fields of candidate records.
+    """
+
+    def __init__(self, values: Optional[Dict[str, Iterable[str]]] = None):
+        """
+        Args:
+            values: Optional known values per field (e.g. from the master enums),
+                for which empty bitmaps are created up front
+        """
+        self.bitmaps: Dict[str, Dict[str, Bitmap]] = {field: {} for field in FACET_FIELDS}
+        self._lookup: Dict[str, Dict[str, str]] = {field: {} for field in FACET_FIELDS}
+        self.size = 0
+        for field, field_values in (values or {}).items():
+            for value in field_values:
+                self._bitmap(field, value)
+
+    def _bitmap(self, field: str, value: str) -> Bitmap:
+        key = value.lower()
+        if key not in self._lookup[field]:
+            self._lookup[field][key] = value
+            self.bitmaps[field][value] = Bitmap()
+        return self.bitmaps[field][self._lookup[field][key]]
+
+    def add(self, slot: int, candidate: Dict[str, Any]):
+        """Record the facet values of the candidate stored under `slot`."""
+        self.size = max(self.size, slot + 1)
+        for field in FACET_FIELDS:
+            value = candidate.get(field)
+            if value:
+                self._bitmap(field, str(value)).add(slot)
+
+    def remove(self, slot: int, candidate: Dict[str, Any]):
+        """Forget the facet values of the candidate stored under `slot`."""
+        for field in FACET_FIELDS:
+            value = candidate.get(field)
+            if value:
+                self._bitmap(field, str(value)).remove(slot)
+
+    def optimize(self):
+        """Re-pick the representation of every bitmap."""
+        for field_bitmaps in self.bitmaps.values():
+            for bitmap in field_bitmaps.values():
+                bitmap.optimize(self.size)
+
+    def evaluate(self, filters: Dict[str, Any], size: Optional[int] = None) -> np.ndarray:
+        """
+        Evaluate a filter expression into a packed bitset over slots.
+
+        Fields are combined with AND and lists of values with OR, e.g.
+        `{"level": "PGT", "primary_skill": ["Physics", "Chemistry"]}`.
+        `"$and"` and `"$or"` take lists of nested expressions, and `"skill"`
+        matches any of the primary, secondary or tertiary skill.
+
+        Args:
+            filters: Filter expression
+            size: Number of slots covered by the result (defaults to all slots)
+
+        Returns:
+            Packed little-endian bitset of the matching slots
+
+        Raises:
+            ValueError: If the expression references an unknown field or operator
+        """
+        size = self.size if size is None else size
+        result = np.full((size + 7) // 8, 0xFF, dtype=np.uint8)
+        for key, value in filters.items():
+            if key == "$and":
+                for expression in value:
+                    result &= self.evaluate(expression, size)
+            elif key == "$or":
+                union = np.zeros_like(result)
+                for expression in value:
+                    union |= self.evaluate(expression, size)
+                result &= union
+            else:
+                result &= self._field_bits(key, value, size)
+        return result
+
+    def _field_bits(self, field: str, value: Any, size: int) -> np.ndarray:
+        fields = FACET_ALIASES.get(field, (field,))
+        for name in fields:
+            if name not in self.bitmaps:
+                raise ValueError(f"Unknown filter field: {field}. Use one of {list(FACET_FIELDS) + list(FACET_ALIASES)}")
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+
+        bits = np.zeros((size + 7) // 8, dtype=np.uint8)
+        for name in fields:
+            for v in values:
+                key = self._lookup[name].get(str(v).lower())
+                if key is not None:
+                    bits |= self.bitmaps[name][key].to_bits(size)
+        return bits
+
+    def mask(self, filters: Dict[str, Any], size: Optional[int] = None) -> np.ndarray:
+        """Evaluate a filter expression into a boolean mask over slots."""
+        size = self.size if size is None else size
+        bits = self.evaluate(filters, size)
+        return np.unpackbits(bits, count=size, bitorder="little").astype(bool)
+
+    def counts(
+        self,
+        fields: Optional[Iterable[str]] = None,
+        within: Optional[np.ndarray] = None,
+    ) -> Dict[str, Dict[str, int]]:
+        """
+        Number of candidates per value of each facet field.
+
+        Args:
+            fields: Fields to count, defaults to all facet fields
+            within: Optional boolean mask over slots restricting the count
+
+        Returns:
+            Mapping of field to a mapping of value to count, sorted by descending count
+        """
+        result = {}
+        for field in fields or FACET_FIELDS:
+            if field not in self.bitmaps:
+                raise ValueError(f"Unknown facet field: {field}. Use one of {list(FACET_FIELDS)}")
+            counts = {value: bitmap.count(within) for value, bitmap in self.bitmaps[field].items()}
+            result[field] = dict(sorted(counts.items(), key=lambda item: -item[1]))
+        return result
+
+    def save(self, directory: Path):
+        """Persist the bitmaps to `directory`."""
+        directory = Path(directory)
+        self.optimize()
+        manifest, arrays = {}, {}
+        for field, field_bitmaps in self.bitmaps.items():
+            manifest[field] = []
+            for value, bitmap in field_bitmaps.items():
+                key = f"b{len(arrays)}"
+                arrays[key] = bitmap._bits if bitmap.is_dense else bitmap.to_array()
+                manifest[field].append([value, key, bitmap.is_dense])
+        np.savez_compressed(directory / "facets.npz", **arrays)
+        with open(directory / "facets.json", "w") as f:
+            json.dump({"size": self.size, "bitmaps": manifest}, f)
+
+    @classmethod
+    def load(cls, directory: Path) -> "FacetIndex":
+        """Load an index previously written with `save`."""
+        directory = Path(directory)
+        with open(directory / "facets.json") as f:
+            manifest = json.load(f)
+        arrays = np.load(directory / "facets.npz")
+        index = cls()
+        index.size = manifest["size"]
+        for field, entries in manifest["bitmaps"].items():
+            for value, key, dense in entries:
+                bitmap = index._bitmap(field, value)
+                if dense:
+                    bitmap._bits = arrays[key]
+                else:
+                    bitmap._array = arrays[key].astype(np.uint32)
+        return index
@@ -0,0 +1,526 @@
+"""
+Candidate search index.
+
+The CandidateIndex keeps every extracted candidate record together with its
+embedding, BM25 postings, facet bitmaps and matching feature columns so that
+the API can serve filtered hybrid queries and job matching in-process.
+Everything is persisted under a single directory: changes are appended to a
+journal as they are made, and folded into a full snapshot once the journal
+has grown long enough.
+
+One process (the API) serves the index of a directory and writes its
+snapshots. Other processes adding candidates (the IDLE listener, scripts)
+use an IndexWriter, which only appends to the journal; the serving index
+applies their entries before its next query or change.
+
+Once the pool is large enough, an IVF index is trained over the embeddings
+and vector scoring is limited to the candidates it shortlists.
+"""
+
+import os
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from .ann import IVFIndex
+from .bm25 import BM25Index, candidate_terms
+from .facets import FacetIndex
+from .matching import FeatureColumns
+from .embeddings import candidate_to_text, get_embedder
+from .journal import IndexJournal, decode_vector, encode_vector
+from .vector_index import VectorIndex
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_DIR = "data/index"
+
+# Number of candidates from which the IVF index is trained, and the
+# growth factor after which it is retrained
+ANN_MIN_SIZE = int(os.getenv("SEARCH_ANN_MIN_SIZE", 50000))
+ANN_RETRAIN_FACTOR = 4
+
+# Maximum number of keyword hits, best BM25 scores first, added to the IVF
+# shortlist; a common query term would otherwise shortlist most of the pool
+KEYWORD_SHORTLIST = int(os.getenv("SEARCH_KEYWORD_SHORTLIST", 1000))
+
+# Journal entries after which the index is compacted into a new snapshot
+JOURNAL_COMPACT_SIZE = int(os.getenv("SEARCH_JOURNAL_COMPACT_SIZE", 1000))
+
+
+def _add_entries(ids: List[str], candidates: List[Dict[str, Any]], vectors: np.ndarray) -> List[Dict[str, Any]]:
+    return [
+        {"op": "add", "id": id, "candidate": candidate, "vector": encode_vector(vector)}
+        for id, candidate, vector in zip(ids, candidates, vectors)
+    ]
+
+
+def _keyword_shortlist(keyword_scores: np.ndarray, limit: int) -> np.ndarray:
+    """Slots of the `limit` best keyword hits."""
+    slots = np.flatnonzero(keyword_scores > 0)
+    if len(slots) > limit:
+        slots = slots[np.argpartition(-keyword_scores[slots], limit - 1)[:limit]]
+    return slots
+
+
+class CandidateIndex:
+    """
+    Searchable collection of candidate records keyed by candidate id.
+    """
+
+    def __init__(self, directory: Optional[str] = None, embedder=None):
+        self.directory = Path(directory or os.getenv("SEARCH_INDEX_DIR", DEFAULT_INDEX_DIR))
+        self.embedder = embedder or get_embedder()
+        self.vectors = VectorIndex(self.embedder.dim, dtype=os.getenv("SEARCH_VECTOR_DTYPE", "float32"))
+        self.ann = IVFIndex(nprobe=int(os.getenv("SEARCH_ANN_NPROBE", 8)))
+        self.keywords = BM25Index()
+        self.facets = FacetIndex()
+        self.features = FeatureColumns()
+        self.records: Dict[str, Dict[str, Any]] = {}
+        self._slot_ids: List[Optional[str]] = []
+        self._slots: Dict[str, int] = {}
+        self._lock = threading.RLock()
+        # Set by `load`; indexes built in memory are only persisted by `save`
+        self.journal: Optional[IndexJournal] = None
+        self._compacting = False
+        self._training = False
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, id: str) -> bool:
+        return id in self._slots
+
+    def add(self, id: str, candidate: Dict[str, Any]):
+        """
+        Add a candidate to the index, replacing any previous record with the same id.
+
+        Args:
+            id: Candidate id
+            candidate: Candidate dictionary, as dumped from `TeachingCandidate`
+        """
+        self.add_many({id: candidate})
+
+    def add_many(self, candidates: Dict[str, Dict[str, Any]]):
+        """
+        Add several candidates at once, embedding them in a single batch.
+
+        Args:
+            candidates: Mapping of candidate id to candidate dictionary
+        """
+        if not candidates:
+            return
+        ids = list(candidates)
+        vectors = self.embedder.embed([candidate_to_text(candidates[id]) for id in ids])
+
+        with self._locked():
+            self._apply_add(ids, [candidates[id] for id in ids], vectors)
+            if self.journal is not None:
+                self.journal.append(_add_entries(ids, [candidates[id] for id in ids], vectors))
+        logger.debug(f"Indexed {len(ids)} candidates")
+        self._maybe_compact()
+
+    def _apply_add(self, ids: List[str], candidates: List[Dict[str, Any]], vectors: np.ndarray):
+        for id in ids:
+            self._remove_slot(id)
+        slots = self.vectors.add(vectors)
+        for id, candidate, slot in zip(ids, candidates, slots):
+            self._slot_ids.append(id)
+            self._slots[id] = slot
+            self.records[id] = candidate
+            self.keywords.add(slot, candidate_terms(candidate))
+            self.facets.add(slot, candidate)
+            self.features.add(slot, candidate)
+        self.ann.add(slots, vectors)
+        self._maybe_train()
+
+    def _maybe_train(self):
+        """Train a new IVF index in the background once the pool has outgrown the current one."""
+        live = len(self.vectors)
+        if live < ANN_MIN_SIZE or self._training:
+            return
+        if not self.ann.is_trained or live >= ANN_RETRAIN_FACTOR * self.ann.trained_size:
+            self._training = True
+            threading.Thread(target=self._train, name="ivf-training", daemon=True).start()
+
+    def _train(self):
+        """
+        Train an IVF index on the vectors, only holding the lock while they
+        are read, and swap it in once the slots added meanwhile are filed.
+        """
+        try:
+            logger.info(f"Training the IVF index over {len(self.vectors)} candidates")
+            ann = IVFIndex(nprobe=self.ann.nprobe)
+            trained_slots = ann.train(self.vectors, lock=self._lock)
+            with self._lock:
+                added = np.flatnonzero(self.vectors.live[trained_slots:]) + trained_slots
+                if len(added):
+                    ann.add(added, self.vectors.get(added))
+                self.ann = ann
+        except Exception as e:
+            logger.error(f"Failed to train the IVF index: {e}", exc_info=True)
+        finally:
+            self._training = False
+
+    def remove(self, id: str) -> bool:
+        """
+        Remove a candidate from the index.
+
+        Returns:
+            True if the candidate was indexed, False otherwise
+        """
+        with self._locked():
+            if not self._remove_record(id):
+                return False
+            if self.journal is not None:
+                self.journal.append([{"op": "remove", "id": id}])
+        self._maybe_compact()
+        return True
+
+    def _remove_record(self, id: str) -> bool:
+        if id not in self._slots:
+            return False
+        self._remove_slot(id)
+        self.records.pop(id, None)
+        return True
+
+    def _remove_slot(self, id: str):
+        slot = self._slots.pop(id, None)
+        if slot is not None:
+            self.vectors.remove(slot)
+            self.keywords.remove(slot)
+            self.facets.remove(slot, self.records[id])
+            self._slot_ids[slot] = None
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 10,
+        confidence: float = 0.3,
+        keyword_weight: float = 0.5,
+        filters: Optional[Dict[str, Any]] = None,
+        nprobe: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Find the candidates best matching a free-text query.
+
+        The confidence of a candidate is a weighted sum of the cosine similarity
+        of its embedding and its BM25 score, normalised by the best BM25 score
+        of the query. Filters are resolved against the facet bitmaps first, so
+        only matching candidates are scored. When the IVF index is trained, the
+        embedding similarity is only computed for the candidates it shortlists
+        and for the `KEYWORD_SHORTLIST` best keyword hits; other keyword hits
+        are ranked on their BM25 score alone.
+
+        Args:
+            query: Free-text query
+            top_k: Maximum number of results
+            confidence: Minimum combined score (0-1) for a result
+            keyword_weight: Weight (0-1) of the BM25 score in the combined score
+            filters: Optional filter expression, see `FacetIndex.evaluate`
+            nprobe: Number of IVF lists probed; higher trades latency for recall
+
+        Returns:
+            List of dicts with the candidate `id`, `confidence` and `candidate` record
+
+        Raises:
+            ValueError: If the filter expression is invalid
+        """
+        query_vector = self.embedder.embed([query])[0]
+        self.refresh()
+        with self._lock:
+            mask = self.facets.mask(filters, self.vectors.size) if filters else None
+            if mask is not None and not mask.any():
+                return []
+            keyword_scores = None
+            if keyword_weight > 0:
+                keyword_scores = self.keywords.scores(query, self.vectors.size, mask)
+                best = keyword_scores.max(initial=0.0)
+                if best > 0:
+                    keyword_scores /= best
+
+            vector_mask = mask
+            if self.ann.is_trained:
+                vector_mask = np.zeros(self.vectors.size, dtype=bool)
+                vector_mask[self.ann.candidates(query_vector, nprobe)] = True
+                if keyword_scores is not None:
+                    vector_mask[_keyword_shortlist(keyword_scores, KEYWORD_SHORTLIST)] = True
+                if mask is not None:
+                    vector_mask &= mask
+            scores = self.vectors.scores(query_vector, vector_mask)
+            if keyword_scores is not None:
+                scores = (1 - keyword_weight) * scores + keyword_weight * keyword_scores
+
+            hits = self.vectors.top_k(scores, top_k=top_k, threshold=confidence, mask=mask)
+            return [
+                {
+                    "id": self._slot_ids[slot],
+                    "confidence": score,
+                    "candidate": self.records[self._slot_ids[slot]],
+                }
+                for slot, score in hits
+            ]
+
+    def match(
+        self,
+        job: Dict[str, Any],
+        top_k: int = 10,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Score the whole candidate pool against a job spec.
+
+        Args:
+            job: Keyword arguments of `FeatureColumns.score` (skill, role, level,
+                city, state, min_experience, weights)
+            top_k: Maximum number of results
+            filters: Optional filter expression, see `FacetIndex.evaluate`
+
+        Returns:
+            List of dicts with the candidate `id`, total `score`, per-criterion
+            `breakdown` and `candidate` record, sorted by descending score
+
+        Raises:
+            ValueError: If the filter expression or the weights are invalid
+        """
+        self.refresh()
+        with self._lock:
+            mask = self.facets.mask(filters, self.vectors.size) if filters else None
+            columns = self.features.score(**job)
+            total = np.zeros(self.vectors.size, dtype=np.float32)
+            total[:len(columns["total"])] = columns["total"]
+            hits = self.vectors.top_k(total, top_k=top_k, threshold=0.0, mask=mask)
+            return [
+                {
+                    "id": self._slot_ids[slot],
+                    "score": score,
+                    "breakdown": {
+                        criterion: float(column[slot])
+                        for criterion, column in columns.items() if criterion != "total"
+                    },
+                    "candidate": self.records[self._slot_ids[slot]],
+                }
+                for slot, score in hits
+            ]
+
+    def facet_counts(
+        self,
+        fields: Optional[List[str]] = None,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Count candidates per facet value, optionally restricted by a filter expression.
+
+        Args:
+            fields: Facet fields to count, defaults to all of them
+            filters: Optional filter expression, see `FacetIndex.evaluate`
+
+        Returns:
+            Dict with the `total` number of matching candidates and the `facets` counts
+
+        Raises:
+            ValueError: If a field or the filter expression is invalid
+        """
+        self.refresh()
+        with self._lock:
+            if filters:
+                mask = self.facets.mask(filters, self.vectors.size) & self.vectors.live
+                return {"total": int(mask.sum()), "facets": self.facets.counts(fields, within=mask)}
+            return {"total": len(self), "facets": self.facets.counts(fields)}
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """
+        Hold the index lock and, for a journaled index, the journal lock,
+        applying the entries other processes journaled since the last read.
+        """
+        with self._lock:
+            if self.journal is None:
+                yield
+                return
+            with self.journal.lock():
+                entries = self.journal.read()
+                if entries:
+                    logger.info(f"Applying {len(entries)} journal entries to the candidate index")
+                    self._replay(entries)
+                yield
+
+    def refresh(self):
+        """Apply the changes other processes journaled since the last read, if any."""
+        if self.journal is None or not self.journal.changed():
+            return
+        with self._locked():
+            pass
+        self._maybe_compact()
+
+    def _replay(self, entries: List[Dict[str, Any]]):
+        """Apply journal entries, adding runs of consecutive candidates in one batch."""
+        batch: Dict[str, Dict[str, Any]] = {}
+
+        def flush():
+            if batch:
+                vectors = np.stack([decode_vector(entry["vector"]) for entry in batch.values()])
+                self._apply_add(list(batch), [entry["candidate"] for entry in batch.values()], vectors)
+                batch.clear()
+
+        with self._lock:
+            for entry in entries:
+                if entry["op"] == "add" and entry["id"] not in batch:
+                    batch[entry["id"]] = entry
+                    continue
+                flush()
+                if entry["op"] == "add":
+                    batch[entry["id"]] = entry
+                else:
+                    self._remove_record(entry["id"])
+            flush()
+
+    def _maybe_compact(self):
+        """Snapshot the index in the background once its journal is long enough."""
+        if self.journal is None or self.journal.entries < JOURNAL_COMPACT_SIZE:
+            return
+        with self._lock:
+            if self._compacting:
+                return
+            self._compacting = True
+        # Not a daemon thread, so that exiting waits for the snapshot to be complete
+        threading.Thread(target=self._compact, name="index-compaction").start()
+
+    def _compact(self):
+        try:
+            self.save()
+        except Exception as e:
+            logger.error(f"Failed to compact the candidate index: {e}", exc_info=True)
+        finally:
+            self._compacting = False
+
+    def save(self):
+        """
+        Persist the records, vectors, postings and facets to the index
+        directory, and truncate the journal they now include. Journal
+        writers wait for the snapshot to be written.
+        """
+        with self._locked():
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self.vectors.save(self.directory)
+            self.ann.save(self.directory)
+            self.keywords.save(self.directory)
+            self.facets.save(self.directory)
+            self.features.save(self.directory)
+            with open(self.directory / "records.json", "w") as f:
+                json.dump({
+                    "embedder": self.embedder.name,
+                    "slots": self._slot_ids,
+                    "records": self.records,
+                    "journal_seq": self.journal.seq if self.journal is not None else 0,
+                }, f)
+            if self.journal is not None:
+                self.journal.truncate()
+        logger.info(f"Saved candidate index with {len(self)} records to {self.directory}")
+
+    @classmethod
+    def load(cls, directory: Optional[str] = None, embedder=None) -> "CandidateIndex":
+        """
+        Load an index from its snapshot and journal, or create an empty one
+        if none exists. Changes made to the loaded index are journaled.
+        """
+        index = cls(directory, embedder)
+        index.journal = IndexJournal(index.directory)
+        with index.journal.lock():
+            records_path = index.directory / "records.json"
+            if records_path.exists():
+                index._load_snapshot(records_path)
+            else:
+                logger.info(f"No candidate index snapshot found at {index.directory}")
+            entries = index.journal.read()
+            if entries:
+                logger.info(f"Replaying {len(entries)} journal entries over the candidate index")
+                index._replay(entries)
+        return index
+
+    def _load_snapshot(self, records_path: Path):
+        with open(records_path) as f:
+            data = json.load(f)
+        vectors = VectorIndex.load(self.directory)
+        if data["embedder"] != self.embedder.name or vectors.dim != self.embedder.dim:
+            raise ValueError(
+                f"Index at {self.directory} was built with the {data['embedder']} embedder "
+                f"({vectors.dim} dimensions), not {self.embedder.name} ({self.embedder.dim} dimensions)"
+            )
+        self.vectors = vectors
+        if (self.directory / "ann.json").exists():
+            self.ann = IVFIndex.load(self.directory)
+        if (self.directory / "bm25.json").exists():
+            self.keywords = BM25Index.load(self.directory)
+        self.records = data["records"]
+        self._slot_ids = data["slots"]
+        self._slots = {id: slot for slot, id in enumerate(self._slot_ids) if id is not None}
+        if self.journal is not None:
+            self.journal.seq = data.get("journal_seq", 0)
+        if len(self.keywords) != len(self._slots):
+            logger.info("Rebuilding the keyword index from the stored records")
+            self.keywords = BM25Index()
+            for id, slot in self._slots.items():
+                self.keywords.add(slot, candidate_terms(self.records[id]))
+        if (self.directory / "facets.json").exists():
+            self.facets = FacetIndex.load(self.directory)
+        else:
+            logger.info("Rebuilding the facet index from the stored records")
+            for id, slot in self._slots.items():
+                self.facets.add(slot, self.records[id])
+        if (self.directory / "features.json").exists():
+            self.features = FeatureColumns.load(self.directory)
+        else:
+            logger.info("Rebuilding the matching features from the stored records")
+            for id, slot in self._slots.items():
+                self.features.add(slot, self.records[id])
+
+
+class IndexWriter:
+    """
+    Adds and removes candidates of an index served by another process.
+
+    Changes are embedded here and appended to the journal of the index
+    directory, which the serving CandidateIndex applies before its next query
+    or change. The writer keeps no index in memory and never writes a
+    snapshot, so any number of writers can run next to the serving process.
+
+    Usage:
+        writer = IndexWriter()
+        writer.add("cand-1", candidate)
+    """
+
+    def __init__(self, directory: Optional[str] = None, embedder=None):
+        self.directory = Path(directory or os.getenv("SEARCH_INDEX_DIR", DEFAULT_INDEX_DIR))
+        self.embedder = embedder or get_embedder()
+        self.journal = IndexJournal(self.directory)
+
+    def add(self, id: str, candidate: Dict[str, Any]):
+        """See `CandidateIndex.add`."""
+        self.add_many({id: candidate})
+
+    def add_many(self, candidates: Dict[str, Dict[str, Any]]):
+        """See `CandidateIndex.add_many`."""
+        if not candidates:
+            return
+        ids = list(candidates)
+        vectors = self.embedder.embed([candidate_to_text(candidates[id]) for id in ids])
+        with self.journal.lock():
+            self.journal.append(_add_entries(ids, [candidates[id] for id in ids], vectors))
+        logger.debug(f"Journaled {len(ids)} candidates for {self.directory}")
+
+    def remove(self, id: str):
+        """Remove a candidate, if the serving index has it."""
+        with self.journal.lock():
+            self.journal.append([{"op": "remove", "id": id}])
+
+
+@lru_cache(maxsize=1)
+def get_candidate_index() -> CandidateIndex:
+    """Return the process-wide candidate index, loading it on first use."""
+    return CandidateIndex.load()
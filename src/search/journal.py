@@ -0,0 +1,188 @@
+"""
+Append-only journal of the changes made to a candidate index.
+
+Instead of rewriting the whole index on every upload, each added or removed
+candidate is appended as one JSON line to `journal.jsonl` in the index
+directory, added candidates together with their embedding so that replaying
+the journal never re-embeds them. Once the journal is long enough, the index
+is written out as a full snapshot (compaction) and the journal truncated.
+
+Entries carry increasing sequence numbers and the snapshot records the last
+one it includes, so a journal left behind by an interrupted compaction is not
+applied twice. A truncated journal keeps a marker entry with the last number,
+so numbering carries on after a compaction.
+
+Several processes may write to the journal of the same directory (the API
+and ingestion running on their own), so it is read and written under an
+exclusive lock on `journal.lock`, see `IndexJournal.lock`.
+"""
+
+import os
+import json
+import fcntl
+import base64
+import logging
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_FILE = "journal.jsonl"
+LOCK_FILE = "journal.lock"
+
+# Bytes read at a time when looking for the last entry of the journal
+TAIL_BLOCK_SIZE = 8192
+
+
+def encode_vector(vector: np.ndarray) -> str:
+    return base64.b64encode(np.asarray(vector, dtype=np.float32).tobytes()).decode("ascii")
+
+
+def decode_vector(data: str) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(data), dtype=np.float32)
+
+
+class IndexJournal:
+    """
+    Journal file of an index directory.
+
+    Usage:
+        journal = IndexJournal("data/index")
+        with journal.lock():
+            journal.append([{"op": "remove", "id": "cand-1"}])
+            entries = journal.read()
+    """
+
+    def __init__(self, directory: str):
+        self.path = Path(directory) / JOURNAL_FILE
+        self.lock_path = Path(directory) / LOCK_FILE
+        # Sequence number of the last entry written or applied
+        self.seq = 0
+        # Entries in the journal file, i.e. written since the last compaction
+        self.entries = 0
+        # Bytes of the journal file read so far
+        self.offset = 0
+
+    @contextmanager
+    def lock(self) -> Iterator[None]:
+        """Hold the journal lock shared by every process using the directory."""
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def changed(self) -> bool:
+        """Whether the journal file was written since it was last read; doesn't need the lock."""
+        try:
+            return self.path.stat().st_size != self.offset
+        except FileNotFoundError:
+            return self.offset != 0
+
+    def append(self, entries: List[Dict[str, Any]]):
+        """
+        Write entries at the end of the journal, numbering them after the
+        last entry in the file, and sync the file so that they survive a
+        crash. Must be called with the lock held.
+        """
+        if not entries:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a+b") as f:
+            size = self._repair(f)
+            caught_up = self.offset == size
+            self.seq = max(self.seq, self._last_seq(f, size))
+            lines = []
+            for entry in entries:
+                self.seq += 1
+                lines.append(json.dumps({"seq": self.seq, **entry}).encode() + b"\n")
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+            if caught_up:
+                # This process' own entries don't need to be read back
+                self.offset = f.tell()
+        self.entries += len(entries)
+
+    def read(self) -> List[Dict[str, Any]]:
+        """
+        Entries written since the last read and numbered after `seq`, in
+        order. Must be called with the lock held.
+        """
+        if not self.path.exists():
+            self.offset = 0
+            return []
+        with open(self.path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() < self.offset:
+                # Compacted by another process: everything before the marker is in its snapshot
+                self.offset, self.entries = 0, 0
+            f.seek(self.offset)
+            data = f.read()
+        # A torn last line, left by a crash in the middle of a write, is dropped by the next append
+        data = data[:data.rfind(b"\n") + 1]
+        self.offset += len(data)
+        entries = []
+        for line in data.splitlines():
+            entry = json.loads(line)
+            if entry["op"] == "snapshot":
+                if entry["seq"] > self.seq:
+                    logger.warning(
+                        f"{self.path} was compacted up to entry {entry['seq']} by another process, "
+                        f"entries after {self.seq} are only in its snapshot; reload the index"
+                    )
+                    self.seq = entry["seq"]
+                continue
+            self.entries += 1
+            if entry["seq"] > self.seq:
+                entries.append(entry)
+                self.seq = entry["seq"]
+        return entries
+
+    def truncate(self):
+        """
+        Empty the journal once its entries are in a snapshot, keeping the
+        number of the last one. Must be called with the lock held.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "wb") as f:
+            f.write(json.dumps({"seq": self.seq, "op": "snapshot"}).encode() + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+            self.offset = f.tell()
+        self.entries = 0
+
+    def _repair(self, f) -> int:
+        """Cut a torn last line off the journal, returning its size."""
+        size = f.seek(0, os.SEEK_END)
+        position = size
+        while position > 0:
+            start = max(0, position - TAIL_BLOCK_SIZE)
+            f.seek(start)
+            newline = f.read(position - start).rfind(b"\n")
+            if newline >= 0:
+                end = start + newline + 1
+                break
+            position = start
+        else:
+            end = 0
+        if end != size:
+            logger.warning(f"Dropping the incomplete last entry of {self.path}")
+            f.truncate(end)
+            self.offset = min(self.offset, end)
+        f.seek(end)
+        return end
+
+    def _last_seq(self, f, size: int) -> int:
+        """Number of the last entry of a journal ending with a complete line."""
+        # The final newline is left out, so the last line is whatever follows the previous one
+        position, tail = size - 1, b""
+        while position > 0 and b"\n" not in tail:
+            start = max(0, position - TAIL_BLOCK_SIZE)
+            f.seek(start)
+            tail = f.read(position - start) + tail
+            position = start
+        f.seek(size)
+        return json.loads(tail[tail.rfind(b"\n") + 1:])["seq"] if size else 0
@@ -0,0 +1,233 @@
+"""
+Candidate-to-job matching.
+
+Each categorical field of the candidate pool is kept as an integer code
+column aligned with the index slots, and the career start as a month
+ordinal. A job spec is scored against the whole pool at once with NumPy
+array operations, giving one score column per criterion.
+"""
+
+import re
+import json
+import logging
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Code column of each field and the vocabulary its codes come from
+CODE_FIELDS = {
+    "primary_skill": "skill",
+    "secondary_skill": "skill",
+    "tertiary_skill": "skill",
+    "role": "role",
+    "level": "level",
+    "city": "city",
+    "state": "state",
+}
+
+# Levels in increasing order of seniority, adjacent levels get partial credit
+LEVEL_ORDER = ["day care", "pre-primary", "prt", "tgt", "pgt"]
+
+DEFAULT_WEIGHTS = {
+    "skill": 0.4,
+    "role": 0.15,
+    "level": 0.15,
+    "location": 0.15,
+    "experience": 0.15,
+}
+
+DATE_PATTERN = re.compile(r"^(\d{2})-(\d{4})$")
+
+
+def month_ordinal(value: Optional[str]) -> Optional[int]:
+    """Convert an MM-YYYY date into a count of months, or None if it can't be parsed."""
+    match = DATE_PATTERN.match(value or "")
+    if not match:
+        return None
+    return int(match.group(2)) * 12 + int(match.group(1)) - 1
+
+
+def career_start(candidate: Dict[str, Any]) -> Optional[int]:
+    """
+    Month ordinal of the start of a candidate's career, taken from
+    `career_start_date` or else from the earliest experience.
+    """
+    start = month_ordinal(candidate.get("career_start_date"))
+    if start is not None:
+        return start
+    starts = [month_ordinal(e.get("start_date")) for e in candidate.get("experiences") or []]
+    starts = [s for s in starts if s is not None]
+    return min(starts) if starts else None
+
+
+class FeatureColumns:
+    """
+    Columnar features of the candidate pool, aligned with the index slots.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.vocab: Dict[str, Dict[str, int]] = {name: {} for name in set(CODE_FIELDS.values())}
+        self.codes = {field: np.full(capacity, -1, dtype=np.int32) for field in CODE_FIELDS}
+        self.level_rank = np.full(capacity, -1, dtype=np.int8)
+        self.career_start = np.full(capacity, np.nan, dtype=np.float32)
+        self.size = 0
+
+    def _grow(self, min_capacity: int):
+        capacity = max(min_capacity, 2 * len(self.career_start))
+        for field, column in self.codes.items():
+            self.codes[field] = np.concatenate([column, np.full(capacity - len(column), -1, dtype=np.int32)])
+        self.level_rank = np.concatenate([self.level_rank, np.full(capacity - len(self.level_rank), -1, dtype=np.int8)])
+        self.career_start = np.concatenate([self.career_start, np.full(capacity - len(self.career_start), np.nan, dtype=np.float32)])
+
+    def code(self, vocab: str, value: Optional[str], create: bool = False) -> int:
+        """Integer code of a value in a vocabulary, -1 if the value is unknown."""
+        if not value:
+            return -1
+        key = str(value).lower()
+        vocab = self.vocab[vocab]
+        if key not in vocab:
+            if not create:
+                return -1
+            vocab[key] = len(vocab)
+        return vocab[key]
+
+    def add(self, slot: int, candidate: Dict[str, Any]):
+        """Record the features of the candidate stored under `slot`."""
+        if slot >= len(self.career_start):
+            self._grow(slot + 1)
+        for field, vocab in CODE_FIELDS.items():
+            self.codes[field][slot] = self.code(vocab, candidate.get(field), create=True)
+        level = str(candidate.get("level") or "").lower()
+        self.level_rank[slot] = LEVEL_ORDER.index(level) if level in LEVEL_ORDER else -1
+        start = career_start(candidate)
+        self.career_start[slot] = np.nan if start is None else start
+        self.size = max(self.size, slot + 1)
+
+    def score(
+        self,
+        skill: str,
+        role: Optional[str] = None,
+        level: Optional[str] = None,
+        city: Optional[str] = None,
+        state: Optional[str] = None,
+        min_experience: float = 0.0,
+        weights: Optional[Dict[str, float]] = None,
+        today: Optional[date] = None,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Score every slot against a job spec.
+
+        Criteria that the job spec leaves empty are left out of the total.
+
+        Args:
+            skill: Required skill; primary skill scores 1, secondary 0.6, tertiary 0.3
+            role: Required role
+            level: Required level; adjacent levels score 0.5
+            city: Preferred city; a match scores 1
+            state: Preferred state; a match scores 0.5 when the city doesn't match
+            min_experience: Minimum years of experience; fewer years score proportionally
+            weights: Weight of each criterion, defaults to `DEFAULT_WEIGHTS`
+            today: Reference date for the years of experience, defaults to today
+
+        Returns:
+            Mapping of criterion to its score column, plus the weighted `total`
+
+        Raises:
+            ValueError: If a weight is for an unknown criterion or negative, or the
+                weights of the scored criteria sum to 0
+        """
+        n = self.size
+        codes = {field: column[:n] for field, column in self.codes.items()}
+        unknown = [criterion for criterion in weights or {} if criterion not in DEFAULT_WEIGHTS]
+        if unknown:
+            raise ValueError(
+                f"Unknown weights: {', '.join(unknown)}; expected some of {', '.join(DEFAULT_WEIGHTS)}"
+            )
+        weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        negative = [criterion for criterion, weight in weights.items() if weight < 0]
+        if negative:
+            raise ValueError(f"Weights must not be negative: {', '.join(negative)}")
+        columns: Dict[str, np.ndarray] = {}
+
+        skill_code = self.code("skill", skill)
+        columns["skill"] = np.select(
+            [
+                _equals(codes["primary_skill"], skill_code),
+                _equals(codes["secondary_skill"], skill_code),
+                _equals(codes["tertiary_skill"], skill_code),
+            ],
+            [1.0, 0.6, 0.3],
+            0.0,
+        ).astype(np.float32)
+
+        if role:
+            columns["role"] = _equals(codes["role"], self.code("role", role)).astype(np.float32)
+
+        if level:
+            level_key = level.lower()
+            if level_key in LEVEL_ORDER:
+                rank = self.level_rank[:n].astype(np.int16)
+                distance = np.where(rank >= 0, np.abs(rank - LEVEL_ORDER.index(level_key)), -1)
+                columns["level"] = np.select([distance == 0, distance == 1], [1.0, 0.5], 0.0).astype(np.float32)
+            else:
+                columns["level"] = _equals(codes["level"], self.code("level", level)).astype(np.float32)
+
+        if city or state:
+            city_match = _equals(codes["city"], self.code("city", city))
+            state_match = _equals(codes["state"], self.code("state", state))
+            columns["location"] = np.select([city_match, state_match], [1.0, 0.5], 0.0).astype(np.float32)
+
+        if min_experience > 0:
+            today = today or date.today()
+            years = (today.year * 12 + today.month - 1 - self.career_start[:n]) / 12
+            columns["experience"] = np.clip(np.nan_to_num(years, nan=0.0) / min_experience, 0.0, 1.0).astype(np.float32)
+
+        total_weight = sum(weights[criterion] for criterion in columns)
+        if total_weight <= 0:
+            raise ValueError(f"The weights of the scored criteria ({', '.join(columns)}) must sum to more than 0")
+        total = np.zeros(n, dtype=np.float32)
+        for criterion, column in columns.items():
+            total += (weights[criterion] / total_weight) * column
+        columns["total"] = total
+        return columns
+
+    def save(self, directory: Path):
+        """Persist the feature columns to `directory`."""
+        directory = Path(directory)
+        n = self.size
+        np.savez(
+            directory / "features.npz",
+            level_rank=self.level_rank[:n],
+            career_start=self.career_start[:n],
+            **{field: column[:n] for field, column in self.codes.items()},
+        )
+        with open(directory / "features.json", "w") as f:
+            json.dump({"size": n, "vocab": self.vocab}, f)
+
+    @classmethod
+    def load(cls, directory: Path) -> "FeatureColumns":
+        """Load feature columns previously written with `save`."""
+        directory = Path(directory)
+        with open(directory / "features.json") as f:
+            meta = json.load(f)
+        arrays = np.load(directory / "features.npz")
+        n = meta["size"]
+        features = cls(capacity=max(n, 1024))
+        features.vocab = meta["vocab"]
+        for field in CODE_FIELDS:
+            features.codes[field][:n] = arrays[field]
+        features.level_rank[:n] = arrays["level_rank"]
+        features.career_start[:n] = arrays["career_start"]
+        features.size = n
+        return features
+
+
+def _equals(column: np.ndarray, code: int) -> np.ndarray:
+    """Boolean mask of a code column equal to `code`; all False for unknown (-1) codes."""
+    if code < 0:
+        return np.zeros(len(column), dtype=bool)
+    return column == code
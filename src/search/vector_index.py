@@ -0,0 +1,236 @@
+"""
+In-process vector index.
+
+Vectors are stored row-wise in a preallocated NumPy matrix. Each candidate
+occupies a slot (row); removed slots are tombstoned rather than shifted so
+that slot numbers stay stable for the other indexes built on top of them.
+
+Rows can be stored as float32, float16 or int8 (with a per-row scale), and
+once the index has been saved the matrix is memory-mapped from disk so only
+the pages touched by a query need to be resident.
+"""
+
+import json
+import logging
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+STORAGE_DTYPES = ("float32", "float16", "int8")
+
+# Rows dequantized per step when scoring, bounds the float32 scratch memory
+SCORE_CHUNK = 65536
+# Fraction of the slots above which a mask is applied after scoring every
+# slot: one dense product beats gathering that many scattered rows
+DENSE_MASK_FRACTION = 0.1
+
+
+class VectorIndex:
+    """
+    Brute-force cosine similarity index over L2-normalised vectors.
+    """
+
+    def __init__(self, dim: int, capacity: int = 1024, dtype: str = "float32"):
+        if dtype not in STORAGE_DTYPES:
+            raise ValueError(f"Unsupported vector dtype: {dtype}. Use one of {STORAGE_DTYPES}")
+        self.dim = dim
+        self.dtype = dtype
+        self._vectors = np.zeros((capacity, dim), dtype=dtype)
+        self._scales = np.ones(capacity, dtype=np.float32)
+        self._live = np.zeros(capacity, dtype=bool)
+        self._size = 0
+        self._path: Optional[Path] = None
+
+    def __len__(self) -> int:
+        return int(self._live[:self._size].sum())
+
+    @property
+    def size(self) -> int:
+        """Number of slots handed out so far, including removed ones."""
+        return self._size
+
+    @property
+    def live(self) -> np.ndarray:
+        """Boolean array over slots, False for removed slots."""
+        return self._live[:self._size]
+
+    def _grow(self, min_capacity: int):
+        capacity = max(min_capacity, 2 * len(self._vectors))
+        if self._path is not None:
+            self._vectors.flush()
+            del self._vectors
+            with open(self._path, "r+b") as f:
+                f.truncate(capacity * self.dim * np.dtype(self.dtype).itemsize)
+            self._vectors = np.memmap(self._path, dtype=self.dtype, mode="r+", shape=(capacity, self.dim))
+        else:
+            vectors = np.zeros((capacity, self.dim), dtype=self.dtype)
+            vectors[:self._size] = self._vectors[:self._size]
+            self._vectors = vectors
+        scales = np.ones(capacity, dtype=np.float32)
+        scales[:self._size] = self._scales[:self._size]
+        live = np.zeros(capacity, dtype=bool)
+        live[:self._size] = self._live[:self._size]
+        self._scales, self._live = scales, live
+
+    def _quantize(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        if self.dtype != "int8":
+            return vectors.astype(self.dtype), np.ones(len(vectors), dtype=np.float32)
+        scales = np.abs(vectors).max(axis=1) / 127
+        scales[scales == 0] = 1.0
+        quantized = np.round(vectors / scales[:, None]).astype(np.int8)
+        return quantized, scales.astype(np.float32)
+
+    def add(self, vectors: np.ndarray) -> List[int]:
+        """
+        Append vectors to the index.
+
+        Args:
+            vectors: Array of shape (n, dim), expected to be L2-normalised
+
+        Returns:
+            The slots assigned to the vectors, in order
+        """
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected vectors of dimension {self.dim}, got {vectors.shape[1]}")
+
+        start, end = self._size, self._size + len(vectors)
+        if end > len(self._vectors):
+            self._grow(end)
+        self._vectors[start:end], self._scales[start:end] = self._quantize(vectors)
+        self._live[start:end] = True
+        self._size = end
+        return list(range(start, end))
+
+    def remove(self, slot: int):
+        """Tombstone a slot so it is never returned by `search`."""
+        if 0 <= slot < self._size:
+            self._live[slot] = False
+
+    def get(self, slots: np.ndarray) -> np.ndarray:
+        """Dequantized float32 vectors of the given slots."""
+        slots = np.asarray(slots, dtype=np.int64)
+        return self._vectors[slots].astype(np.float32) * self._scales[slots, None]
+
+    def search(
+        self,
+        query: np.ndarray,
+        top_k: int = 10,
+        threshold: float = 0.0,
+        mask: Optional[np.ndarray] = None,
+    ) -> List[Tuple[int, float]]:
+        """
+        Find the slots most similar to the query vector.
+
+        Args:
+            query: Query vector of shape (dim,), expected to be L2-normalised
+            top_k: Maximum number of results
+            threshold: Minimum cosine similarity for a result
+            mask: Optional boolean array over slots restricting the search
+
+        Returns:
+            List of (slot, score) tuples sorted by descending score
+        """
+        return self.top_k(self.scores(query, mask), top_k, threshold, mask)
+
+    def scores(self, query: np.ndarray, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Cosine similarity of the query against every slot.
+
+        Args:
+            query: Query vector of shape (dim,)
+            mask: Optional boolean array over slots; only these slots are scored
+                and the others are left at 0. Sparse masks are scored slot by
+                slot, dense ones with the same product as no mask
+        """
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        if mask is not None:
+            keep = np.zeros(self._size, dtype=bool)
+            keep[:len(mask)] = mask[:self._size]
+            slots = np.flatnonzero(keep)
+            if len(slots) > DENSE_MASK_FRACTION * self._size:
+                scores = self.scores(query)
+                scores[~keep] = 0.0
+                return scores
+        if mask is None and self.dtype == "float32":
+            return self._vectors[:self._size] @ query
+
+        scores = np.zeros(self._size, dtype=np.float32)
+        if mask is None:
+            for start in range(0, self._size, SCORE_CHUNK):
+                end = min(start + SCORE_CHUNK, self._size)
+                block = self._vectors[start:end].astype(np.float32)
+                scores[start:end] = (block @ query) * self._scales[start:end]
+            return scores
+
+        for start in range(0, len(slots), SCORE_CHUNK):
+            chunk = slots[start:start + SCORE_CHUNK]
+            scores[chunk] = self.get(chunk) @ query
+        return scores
+
+    def top_k(
+        self,
+        scores: np.ndarray,
+        top_k: int = 10,
+        threshold: float = 0.0,
+        mask: Optional[np.ndarray] = None,
+    ) -> List[Tuple[int, float]]:
+        """
+        Select the best live slots from a score array aligned with the slots.
+        """
+        valid = self._live[:self._size] & (scores >= threshold)
+        if mask is not None:
+            valid &= mask[:self._size]
+        candidates = np.flatnonzero(valid)
+        if len(candidates) == 0 or top_k <= 0:
+            return []
+
+        candidate_scores = scores[candidates]
+        if len(candidates) > top_k:
+            best = np.argpartition(-candidate_scores, top_k - 1)[:top_k]
+            candidates, candidate_scores = candidates[best], candidate_scores[best]
+        order = np.argsort(-candidate_scores, kind="stable")
+        return [(int(candidates[i]), float(candidate_scores[i])) for i in order]
+
+    def save(self, directory: Path):
+        """
+        Persist the index to `directory`. The vectors are written to
+        `vectors.bin`, which the index memory-maps from then on.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / "vectors.bin"
+        if self._path == path:
+            self._vectors.flush()
+        else:
+            self._vectors[:self._size].tofile(path)
+            if self._size:
+                self._path = path
+                self._vectors = np.memmap(path, dtype=self.dtype, mode="r+", shape=(self._size, self.dim))
+        np.save(directory / "live.npy", self._live[:self._size])
+        np.save(directory / "scales.npy", self._scales[:self._size])
+        with open(directory / "vectors.json", "w") as f:
+            json.dump({"dim": self.dim, "size": self._size, "dtype": self.dtype}, f)
+
+    @classmethod
+    def load(cls, directory: Path) -> "VectorIndex":
+        """Load an index previously written with `save`, memory-mapping its vectors."""
+        directory = Path(directory)
+        with open(directory / "vectors.json") as f:
+            meta = json.load(f)
+        size = meta["size"]
+        index = cls(meta["dim"], capacity=max(size, 1024), dtype=meta.get("dtype", "float32"))
+        index._live[:size] = np.load(directory / "live.npy")
+
+        if (directory / "vectors.bin").exists() and size:
+            index._path = directory / "vectors.bin"
+            index._vectors = np.memmap(index._path, dtype=index.dtype, mode="r+", shape=(size, index.dim))
+            index._scales[:size] = np.load(directory / "scales.npy")
+        elif (directory / "vectors.npy").exists():
+            index._vectors[:size] = np.load(directory / "vectors.npy")
+        index._size = size
+        logger.info(f"Loaded {index.dtype} vector index with {len(index)} vectors from {directory}")
+        return index
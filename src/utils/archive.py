@@ -0,0 +1,254 @@
+"""
+Local archive of raw emails, for offline replay of the ingestion.
+
+Raw RFC822 messages are stored in a Maildir, with a SQLite index keyed by
+mailbox, UIDVALIDITY and UID, and by Message-ID. Replaying the archive
+through the ingestion pipeline runs at disk speed and always on the same
+corpus, so prompt, cache and pipeline changes can be benchmarked without
+touching the live mailbox. A replay keeps its index, cache, resumes and logs
+in a scratch directory, apart from those of the live ingestion.
+
+Usage:
+    python -m src.utils.archive fetch --since 01-Jan-2025
+    python -m src.utils.archive replay --limit 200
+"""
+
+import os
+import time
+import asyncio
+import shutil
+import hashlib
+import logging
+import argparse
+import mailbox
+import sqlite3
+import threading
+from email import message_from_bytes
+from email.parser import BytesHeaderParser
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.utils.imap_sync import ConcurrentFetcher, IMAPSync, SyncStore
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_PATH = os.getenv("MAIL_ARCHIVE_PATH", "data/mail_archive")
+
+
+class MailArchive:
+    """
+    Maildir of raw messages indexed by UID and Message-ID.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path: Archive directory, defaults to the `MAIL_ARCHIVE_PATH` environment variable
+        """
+        self.path = Path(path or ARCHIVE_PATH)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.maildir = mailbox.Maildir(self.path / "maildir", factory=None, create=True)
+        # Watermarks of `archive_mailbox`, kept apart from the ingestion's so archiving doesn't skip emails for it
+        self.store = SyncStore(str(self.path / "sync_state.json"))
+        self._connection = sqlite3.connect(self.path / "index.sqlite", check_same_thread=False)
+        self._connection.executescript(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            "key TEXT PRIMARY KEY, mailbox TEXT NOT NULL, uidvalidity INTEGER NOT NULL, uid INTEGER NOT NULL, "
+            "message_id TEXT, subject TEXT, date TEXT, size INTEGER, archived_at TEXT DEFAULT CURRENT_TIMESTAMP, "
+            "UNIQUE (mailbox, uidvalidity, uid));"
+            "CREATE INDEX IF NOT EXISTS messages_message_id ON messages (message_id);"
+        )
+        self._connection.commit()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+
+    def add(self, mailbox_key: str, uidvalidity: int, uid: int, raw: bytes) -> str:
+        """
+        Archive a raw message, unless it is already archived.
+
+        Args:
+            mailbox_key: Mailbox the message comes from, see `SyncStore.key`
+            uidvalidity: UIDVALIDITY of the folder
+            uid: IMAP UID of the message
+            raw: RFC822 message
+
+        Returns:
+            Maildir key of the message
+        """
+        headers = BytesHeaderParser().parsebytes(raw)
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT key FROM messages WHERE mailbox = ? AND uidvalidity = ? AND uid = ?",
+                (mailbox_key, uidvalidity, uid),
+            ).fetchone()
+            if row is not None:
+                return row[0]
+            key = self.maildir.add(raw)
+            self._connection.execute(
+                "INSERT INTO messages (key, mailbox, uidvalidity, uid, message_id, subject, date, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key, mailbox_key, uidvalidity, uid,
+                    (headers.get("Message-ID") or "").strip().strip("<>").lower() or None,
+                    str(headers.get("Subject") or ""),
+                    str(headers.get("Date") or ""),
+                    len(raw),
+                ),
+            )
+            self._connection.commit()
+        return key
+
+    def get(self, key: str) -> bytes:
+        return self.maildir.get_bytes(key)
+
+    def get_by_uid(self, mailbox_key: str, uid: int, uidvalidity: Optional[int] = None) -> Optional[bytes]:
+        """Raw message with the given UID, from the latest UIDVALIDITY unless one is given."""
+        query = "SELECT key FROM messages WHERE mailbox = ? AND uid = ?"
+        params: List[Any] = [mailbox_key, uid]
+        if uidvalidity is not None:
+            query += " AND uidvalidity = ?"
+            params.append(uidvalidity)
+        with self._lock:
+            row = self._connection.execute(query + " ORDER BY uidvalidity DESC LIMIT 1", params).fetchone()
+        return self.get(row[0]) if row else None
+
+    def get_by_message_id(self, message_id: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT key FROM messages WHERE message_id = ? LIMIT 1",
+                ((message_id or "").strip().strip("<>").lower(),),
+            ).fetchone()
+        return self.get(row[0]) if row else None
+
+    def entries(self, mailbox_key: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Index rows of the archived messages, oldest UID first."""
+        query = "SELECT key, mailbox, uidvalidity, uid, message_id, subject, date, size FROM messages"
+        params: List[Any] = []
+        if mailbox_key:
+            query += " WHERE mailbox = ?"
+            params.append(mailbox_key)
+        query += " ORDER BY mailbox, uidvalidity, uid"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            cursor = self._connection.execute(query, params)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def emails(self, mailbox_key: Optional[str] = None, limit: Optional[int] = None, temp_dir: Optional[Path] = None) -> Iterator:
+        """
+        Replay archived messages as `Email`s, with their attachments loaded.
+        Suitable as the source of `IngestionPipeline.run`.
+        """
+        # Imported here so that archiving doesn't depend on the email module's credentials
+        from src.utils.emailer import Email
+
+        temp_dir = temp_dir or Path("data/tmp/replay")
+        temp_dir.mkdir(parents=True, exist_ok=True)
+        for entry in self.entries(mailbox_key, limit):
+            email_hash = hashlib.md5(f"{entry['uidvalidity']}_{entry['uid']}".encode()).hexdigest()
+            yield Email(id=str(entry["uid"]), hash=email_hash, msg=message_from_bytes(self.get(entry["key"])), dir=temp_dir)
+
+    def close(self):
+        self._connection.close()
+
+
+def archive_mailbox(
+    credentials: Dict[str, str],
+    folder: str = "INBOX",
+    since: Optional[str] = None,
+    max_emails: Optional[int] = None,
+    archive: Optional[MailArchive] = None,
+    max_connections: Optional[int] = None,
+) -> int:
+    """
+    Archive the messages of a folder not archived yet.
+
+    Args:
+        credentials: Dict with `host`, `username` and `password` keys
+        folder: Mailbox folder to archive
+        since: Date ('DD-Mon-YYYY') limiting the first archiving of the folder
+        max_emails: Maximum number of messages archived in this run
+        archive: Archive to write to, defaults to `MailArchive()`
+        max_connections: Maximum number of concurrent IMAP connections
+
+    Returns:
+        Number of messages archived
+    """
+    archive = archive if archive is not None else MailArchive()
+    sync = IMAPSync(credentials, folder=folder, store=archive.store)
+    count = 0
+    with ConcurrentFetcher(sync, max_connections=max_connections) as fetcher:
+        build = lambda uid, raw: archive.add(sync.key, sync.uidvalidity, uid, raw)
+        for _ in fetcher.sync_new(limit=max_emails, since=since, build=build):
+            count += 1
+    logger.info(f"Archived {count} messages from {sync.key} to {archive.path}")
+    return count
+
+
+async def replay(
+    archive: Optional[MailArchive] = None,
+    limit: Optional[int] = None,
+    workdir: Optional[str] = None,
+    **kwargs,
+) -> Dict[str, Any]:
+    """
+    Run the ingestion pipeline over archived messages.
+
+    The replay writes nothing the live ingestion uses: its candidate index,
+    classification cache, resumes, sync store and logs all go to a scratch
+    directory, emptied first so that every replay starts from the same state.
+
+    Args:
+        archive: Archive to replay, defaults to `MailArchive()`
+        limit: Maximum number of messages replayed
+        workdir: Scratch directory, defaults to `replay` in the archive directory
+        **kwargs: Passed on to `IngestionPipeline`, overriding the scratch paths
+
+    Returns:
+        Stats of the pipeline run, see `IngestionPipeline.stats`
+    """
+    from src.agents.cache import ClassificationCache
+    from src.search import CandidateIndex
+    from src.utils.pipeline import IngestionPipeline
+
+    archive = archive if archive is not None else MailArchive()
+    workdir = Path(workdir) if workdir else archive.path / "replay"
+    shutil.rmtree(workdir, ignore_errors=True)
+    workdir.mkdir(parents=True)
+    kwargs.setdefault("cache", ClassificationCache(str(workdir / "classify_cache.sqlite")))
+    kwargs.setdefault("index", CandidateIndex.load(str(workdir / "index")))
+    kwargs.setdefault("store", SyncStore(str(workdir / "imap_state.json")))
+    kwargs.setdefault("resume_dir", str(workdir / "resume"))
+    kwargs.setdefault("labels_path", str(workdir / "email_labels.jsonl"))
+    kwargs.setdefault("picks_path", str(workdir / "attachment_picks.jsonl"))
+
+    pipeline = IngestionPipeline(**kwargs)
+    start = time.perf_counter()
+    stats = await pipeline.run(source=lambda: archive.emails(limit=limit, temp_dir=workdir / "tmp"))
+    logger.info(f"Replayed {stats['emails']} archived emails in {time.perf_counter() - start:.2f} s")
+    return stats
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Archive emails locally and replay them through the ingestion pipeline")
+    parser.add_argument("command", choices=["fetch", "replay"])
+    parser.add_argument("--folder", type=str, default="INBOX", help="Mailbox folder to archive")
+    parser.add_argument("--since", type=str, help="Date ('DD-Mon-YYYY') limiting the first archiving of the folder")
+    parser.add_argument("--limit", type=int, help="Maximum number of emails archived or replayed")
+    parser.add_argument("--path", type=str, help="Archive directory")
+    parser.add_argument("--workdir", type=str, help="Scratch directory of the replay, emptied first")
+    args = parser.parse_args()
+
+    archive = MailArchive(args.path)
+    if args.command == "fetch":
+        from src.utils.emailer import DEFAULT_CREDENTIALS
+
+        archive_mailbox(DEFAULT_CREDENTIALS, folder=args.folder, since=args.since, max_emails=args.limit, archive=archive)
+    else:
+        asyncio.run(replay(archive, limit=args.limit, workdir=args.workdir))
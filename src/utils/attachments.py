@@ -0,0 +1,271 @@
+"""
+Resume attachment ranker.
+
+Candidate emails often carry more than the resume: cover letters,
+certificates, ID scans, signature logos. Every attachment sent to the
+extractor costs a rasterization and an LLM call, so the attachments of an
+email are scored with cheap signals first (filename, MIME type, size, page
+count and the text layer of the first page) and only the best ones are
+picked. Every decision is appended to a JSONL log, so the precision of the
+picks can be measured against the extraction results.
+"""
+
+import os
+import re
+import json
+import logging
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import fitz
+
+from src.agents.preclassify import RESUME_FILENAME
+
+logger = logging.getLogger(__name__)
+
+DECISIONS_PATH = os.getenv("ATTACHMENT_PICKS_PATH", "data/attachment_picks.jsonl")
+
+OTHER_FILENAME = re.compile(
+    r"cover|letter|certificate|marksheet|mark[\s_-]?sheet|transcript|degree|aadhaa?r|\bpan\b|passport"
+    r"|photo|signature|logo|image\d*|scan\d*|invoice|receipt",
+    re.IGNORECASE,
+)
+PDF_CONTENT_TYPES = {"application/pdf"}
+
+RESUME_KEYWORDS = [
+    "education", "experience", "skills", "qualification", "objective", "career",
+    "b.ed", "b.sc", "m.sc", "m.a", "declaration", "date of birth", "languages known",
+    "achievements", "personal details", "hobbies", "teaching experience",
+]
+COVER_LETTER_KEYWORDS = [
+    "dear sir", "dear madam", "respected sir", "respected madam", "yours sincerely",
+    "yours faithfully", "i am writing", "to whom it may concern",
+]
+CERTIFICATE_KEYWORDS = [
+    "this is to certify", "certify that", "marks obtained", "roll no", "grand total",
+    "unique identification", "income tax department",
+]
+CONTACT_PATTERN = re.compile(r"[\w.+-]+@[\w-]+\.[\w.]+|(\+?\d[\d\s-]{8,}\d)")
+
+# Attachments below this size are usually logos or signatures
+MIN_SIZE = 15 * 1024
+# Characters of the first page read for keywords
+FIRST_PAGE_CHARS = 4000
+
+
+class RankerStats:
+    """Counters of the decisions of an AttachmentRanker."""
+
+    def __init__(self):
+        self.emails = 0
+        self.attachments = 0
+        self.picked = 0
+        self.emails_without_pick = 0
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            "emails": self.emails,
+            "attachments": self.attachments,
+            "picked": self.picked,
+            "skipped": self.attachments - self.picked,
+            "emails_without_pick": self.emails_without_pick,
+        }
+
+
+def inspect_pdf(content: bytes) -> Dict[str, Any]:
+    """
+    Page count and first-page text of a PDF, without rendering it.
+
+    Returns:
+        Dict with `pages` and `text`; `pages` is 0 when the PDF can't be read
+    """
+    try:
+        with fitz.open(stream=content, filetype="pdf") as pdf:
+            if pdf.needs_pass or pdf.page_count == 0:
+                return {"pages": 0, "text": ""}
+            return {"pages": pdf.page_count, "text": pdf[0].get_text()[:FIRST_PAGE_CHARS]}
+    except Exception as e:
+        logger.debug(f"Failed to open PDF: {e}")
+        return {"pages": 0, "text": ""}
+
+
+def score_attachment(attachment) -> Dict[str, Any]:
+    """
+    Likelihood score of an attachment being a resume.
+
+    Args:
+        attachment: `Attachment`, whose content is inspected if it has been downloaded
+
+    Returns:
+        Dict with the `score`, the `reasons` behind it, the `pages` of a PDF and
+        whether it is `readable` by the pipeline (a downloaded, valid PDF)
+    """
+    score, reasons = 0.0, []
+    filename = attachment.filename or ""
+    is_pdf = attachment.content_type in PDF_CONTENT_TYPES or filename.lower().endswith(".pdf")
+
+    if RESUME_FILENAME.search(filename):
+        score += 3
+        reasons.append("resume filename")
+    elif OTHER_FILENAME.search(filename):
+        score -= 3
+        reasons.append("non-resume filename")
+
+    if is_pdf:
+        score += 2
+        reasons.append("pdf")
+    elif attachment.is_resume:
+        reasons.append("word document")
+    else:
+        score -= 5
+        reasons.append(f"content type {attachment.content_type}")
+
+    if attachment.size < MIN_SIZE:
+        score -= 2
+        reasons.append("small file")
+
+    pages = None
+    if is_pdf and attachment.loaded:
+        info = inspect_pdf(attachment.content)
+        pages = info["pages"]
+        if not pages:
+            return {"score": float("-inf"), "reasons": reasons + ["unreadable pdf"], "pages": 0, "readable": False}
+        if pages <= 4:
+            score += 2
+            reasons.append(f"{pages} pages")
+        elif pages > 8:
+            score -= 2
+            reasons.append(f"{pages} pages")
+
+        # Scanned PDFs have no text layer; they are neither rewarded nor penalized
+        text = info["text"].lower()
+        if text.strip():
+            keywords = sum(keyword in text for keyword in RESUME_KEYWORDS)
+            if keywords:
+                score += min(keywords, 6) * 0.5
+                reasons.append(f"{keywords} resume keywords")
+            if CONTACT_PATTERN.search(text):
+                score += 1
+                reasons.append("contact details")
+            if any(keyword in text for keyword in CERTIFICATE_KEYWORDS):
+                score -= 3
+                reasons.append("certificate text")
+            if keywords < 3 and any(keyword in text for keyword in COVER_LETTER_KEYWORDS):
+                score -= 2
+                reasons.append("cover letter text")
+        else:
+            reasons.append("no text layer")
+
+    return {"score": score, "reasons": reasons, "pages": pages, "readable": is_pdf and attachment.loaded}
+
+
+class AttachmentRanker:
+    """
+    Picks the attachments of an email most likely to be resumes.
+
+    Usage:
+        ranker = AttachmentRanker()
+        for attachment in ranker.pick(email):
+            ...
+    """
+
+    def __init__(
+        self,
+        min_score: float = 2.0,
+        margin: float = 1.5,
+        max_picks: int = 2,
+        log_path: Optional[str] = None,
+    ):
+        """
+        Args:
+            min_score: Minimum score of a picked attachment
+            margin: Attachments scoring within `margin` of the best one are picked too,
+                for emails carrying several resumes
+            max_picks: Maximum number of attachments picked per email
+            log_path: JSONL file the decisions are appended to, defaults to the
+                `ATTACHMENT_PICKS_PATH` environment variable
+        """
+        self.min_score = min_score
+        self.margin = margin
+        self.max_picks = max_picks
+        self.log_path = Path(log_path or DECISIONS_PATH)
+        self.stats = RankerStats()
+        self._lock = threading.Lock()
+
+    def rank(self, email) -> List[Dict[str, Any]]:
+        """
+        Score every resume-like attachment of an email, best first.
+
+        Returns:
+            List of dicts with the `attachment` and its `score_attachment` result
+        """
+        ranked = [
+            {"attachment": attachment, **score_attachment(attachment)}
+            for attachment in email._attachments
+            if attachment.is_resume
+        ]
+        return sorted(ranked, key=lambda item: item["score"], reverse=True)
+
+    def pick(self, email) -> list:
+        """
+        Attachments of an email to send to extraction.
+
+        Returns:
+            List of `Attachment`, possibly empty
+        """
+        ranked = self.rank(email)
+        best = ranked[0]["score"] if ranked else 0.0
+        picked = [
+            item for item in ranked
+            if item["readable"] and item["score"] >= self.min_score and item["score"] >= best - self.margin
+        ][:self.max_picks]
+
+        with self._lock:
+            self.stats.emails += 1
+            self.stats.attachments += len(ranked)
+            self.stats.picked += len(picked)
+            if not picked:
+                self.stats.emails_without_pick += 1
+        self.record(email, ranked, picked)
+        return [item["attachment"] for item in picked]
+
+    def record(self, email, ranked: List[Dict[str, Any]], picked: List[Dict[str, Any]]):
+        """Log the decision and append it to the decision log."""
+        decisions = [
+            {
+                "filename": item["attachment"].filename,
+                "content_type": item["attachment"].content_type,
+                "size": item["attachment"].size,
+                "pages": item["pages"],
+                "score": item["score"] if item["score"] != float("-inf") else None,
+                "reasons": item["reasons"],
+                "picked": any(item is chosen for chosen in picked),
+            }
+            for item in ranked
+        ]
+        logger.info(
+            f"Email {email.id}: picked {[d['filename'] for d in decisions if d['picked']]} "
+            f"out of {[(d['filename'], d['score']) for d in decisions]}"
+        )
+        try:
+            line = json.dumps({
+                "email_id": email.id,
+                "message_id": (email._metadata or {}).get("message_id"),
+                "decided_at": datetime.now(timezone.utc).isoformat(),
+                "attachments": decisions,
+            })
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            with self._lock, open(self.log_path, "a") as f:
+                f.write(line + "\n")
+        except OSError as e:
+            logger.error(f"Failed to record attachment picks of email {email.id}: {e}", exc_info=True)
+
+
+def load_decisions(path: Optional[str] = None) -> List[Dict[str, Any]]:
+    path = Path(path or DECISIONS_PATH)
+    if not path.exists():
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
@@ -1,7 +1,10 @@
 import mimetypes
 import os
+import re
+import logging
+import tempfile
 from datetime import datetime
-from typing import Literal
+from typing import Iterator, Literal, Optional
 
 import hashlib
 from pathlib import Path
@@ -11,6 +14,20 @@ import email
 from email.header import decode_header
 
 from agents.classify import EmailType
+from src.utils.archive import MailArchive
+from src.utils.imap_sync import ConcurrentFetcher, IMAPSync, SyncStore, connect, decode_part
+
+logger = logging.getLogger(__name__)
+
+RESUME_CONTENT_TYPES = {
+    "application/pdf",
+    "application/msword",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+}
+RESUME_EXTENSIONS = (".pdf", ".doc", ".docx")
+
+# Encoded attachments above this size are spooled to a temporary file
+SPOOL_MAX_SIZE = int(os.getenv("ATTACHMENT_SPOOL_MAX_SIZE", 256 * 1024))
 
 DEFAULT_CREDENTIALS = {
     "host":os.environ["EDUCARE_EMAIL_HOST"],
@@ -20,21 +37,165 @@ DEFAULT_CREDENTIALS = {
 
 
 
+def decoded_size(encoded: bytes, encoding: str) -> int:
+    """Size of a payload once decoded, computed from its encoded form without decoding it."""
+    if encoding == "base64":
+        length = len(re.sub(rb"\s+", b"", encoded))
+        return length * 3 // 4 - encoded.rstrip()[-2:].count(b"=")
+    if encoding == "quoted-printable":
+        escapes = len(re.findall(rb"=[0-9A-Fa-f]{2}", encoded))
+        return len(encoded) - 2 * escapes - 3 * encoded.count(b"=\r\n") - 2 * encoded.count(b"=\n")
+    return len(encoded)
+
+
+class Attachment:
+    """
+    Handle on an email attachment.
+
+    The payload is kept in its transfer encoding in a spooled temporary file,
+    which moves to disk once it grows past `SPOOL_MAX_SIZE`, and is only
+    decoded when `content` is read. Attachments of previews have no payload
+    until `load` is called with the part downloaded from the server.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        content_type: str,
+        disposition: str,
+        path: str,
+        size: int,
+        encoding: str = "7bit",
+        section: str | None = None,
+    ):
+        self.filename = filename
+        self.content_type = content_type
+        self.disposition = disposition
+        self.path = path
+        self.size = size
+        self.encoding = encoding
+        self.section = section
+        self.processed = False
+        self._spool: tempfile.SpooledTemporaryFile | None = None
+
+    def __repr__(self):
+        return str(self.metadata)
+
+    @classmethod
+    def from_part(cls, part: email.message.Message, filename: str, path: str) -> "Attachment":
+        """Copy the payload of a message part into a new attachment; the part is left as it is."""
+        if part.is_multipart():
+            # Attached emails (message/rfc822) are kept as they are
+            encoded, encoding = b"".join(p.as_bytes() for p in part.get_payload()), "8bit"
+        else:
+            encoded = part.get_payload(decode=False).encode("utf-8", errors="surrogateescape")
+            encoding = str(part.get("Content-Transfer-Encoding", "7bit")).strip().lower()
+        attachment = cls(
+            filename=filename,
+            content_type=part.get_content_type(),
+            disposition=str(part.get("Content-Disposition", "")),
+            path=path,
+            size=decoded_size(encoded, encoding),
+            encoding=encoding,
+        )
+        attachment.load(encoded)
+        return attachment
+
+    @property
+    def metadata(self) -> dict:
+        return {
+            "filename": self.filename,
+            "content_type": self.content_type,
+            "disposition": self.disposition,
+            "size": self.size,
+            "path": self.path,
+            "processed": self.processed,
+        }
+
+    @property
+    def loaded(self) -> bool:
+        return self._spool is not None
+
+    @property
+    def digest(self) -> str:
+        """SHA-256 of the decoded payload, or of the name and size when it hasn't been downloaded."""
+        content = self.content
+        if content is None:
+            return hashlib.sha256(f"{self.filename}:{self.size}".encode()).hexdigest()
+        return hashlib.sha256(content).hexdigest()
+
+    @property
+    def is_resume(self) -> bool:
+        """Whether the attachment looks like a resume document (PDF, DOC or DOCX)."""
+        return self.content_type in RESUME_CONTENT_TYPES or self.filename.lower().endswith(RESUME_EXTENSIONS)
+
+    def load(self, encoded: bytes):
+        """Store the payload, still in its transfer encoding."""
+        self.close()
+        self._spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        self._spool.write(encoded)
+
+    @property
+    def content(self) -> bytes | None:
+        """The decoded payload, or None if it hasn't been downloaded yet."""
+        if self._spool is None:
+            return None
+        self._spool.seek(0)
+        return decode_part(self._spool.read(), self.encoding)
+
+    def save(self, path: str | None = None) -> str:
+        """Write the decoded payload to `path` (defaults to `self.path`) and return the path."""
+        path = path or self.path
+        with open(path, "wb") as f:
+            f.write(self.content)
+        self.processed = True
+        return path
+
+    def close(self):
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+
+
 class Email :
 
     _metadata = None
     _body = None
-    _attachments = []
+    _attachments: tuple = ()
     type: EmailType = None
     
-    def __init__(self, id, hash, msg: email.message.Message, dir):
+    def __init__(self, id, hash, msg: email.message.Message, dir, parts: list[dict] | None = None, body: str | None = None):
+        """
+        Args:
+            id: IMAP UID of the email
+            hash: Unique hash used to name the saved attachments
+            msg: Parsed message; only its headers when built from a preview.
+                The email takes ownership of it: the payloads of its attachments
+                are moved into `Attachment` handles, leaving the parts empty
+            dir: Directory attachments are saved to
+            parts: BODYSTRUCTURE parts of a preview, whose attachments are
+                downloaded later with `download_attachments`
+            body: Text content of a preview
+        """
         self.id=id
         self.__hash=hash
         self.msg: email.message.Message = msg
 
         self._metadata = self.extract_metadata()
-        self._body = self.extract_text_content()
-        self._attachments = self.list_attachments(dir)
+        self._body = body if body is not None else self.extract_text_content()
+        self._attachments = self.list_attachments(dir) if parts is None else self.list_remote_attachments(parts, dir)
+
+    @classmethod
+    def from_preview(cls, uid: int, hash: str, preview: dict, dir) -> "Email":
+        """Build an email from a preview fetched with `IMAPSync.fetch_previews`."""
+        return cls(
+            id=str(uid),
+            hash=hash,
+            msg=email.message_from_bytes(preview["header"]),
+            dir=dir,
+            parts=preview["parts"],
+            body=preview["text"],
+        )
 
     def __repr__(self):
         return (
@@ -42,7 +203,7 @@ class Email :
             f"id={self.id},"
             f"Emailtype=({self.type}), "
             f"metadata={self._metadata},"
-            f"attachments=[{', '.join([str({k: v for k, v in attachment.items() if k != 'content'}) for attachment in self._attachments])}]"
+            f"attachments=[{', '.join([str(attachment) for attachment in self._attachments])}]"
             # f"body={self._body}),"
             f")"
         )
@@ -138,26 +299,74 @@ class Email :
                 
             # Create a reference path for where this would be stored
             safe_filename = Path(filename).name  # Remove any path manipulation
-            attachment_path = temp_dir / f"{self.__hash}_{safe_filename}"
+            attachment_path = Path(temp_dir) / f"{self.__hash}_{safe_filename}"
           
-            attachments.append({
-                "filename": safe_filename,
-                "content_type": content_type,
-                "disposition": content_disposition,
-                "content": part.get_payload(decode=True),
-                "size": len(part.get_payload(decode=True)),
-                "path": str(attachment_path),
-                "processed": False
-            })
+            attachments.append(Attachment.from_part(part, safe_filename, str(attachment_path)))
+            # The payload now lives in the attachment's spool, keep only headers and text in memory
+            part.set_payload("")
             
         return attachments
-    
+
+    def list_remote_attachments(self, parts: list[dict], temp_dir="."):
+        """Record the attachments of a preview; their content stays on the server until downloaded"""
+        attachments = []
+
+        for part in parts:
+            filename = part["filename"]
+            disposition = part["disposition"] or ""
+            if not filename and disposition not in ("attachment", "inline"):
+                continue
+
+            if not filename:
+                ext = mimetypes.guess_extension(part["content_type"]) or ".bin"
+                filename = f"unnamed_attachment_{len(attachments)}{ext}"
+
+            safe_filename = Path(filename).name
+            attachments.append(Attachment(
+                filename=safe_filename,
+                content_type=part["content_type"],
+                disposition=disposition,
+                path=str(Path(temp_dir) / f"{self.__hash}_{safe_filename}"),
+                # BODYSTRUCTURE reports the encoded size
+                size=part["size"] * 3 // 4 if part["encoding"] == "base64" else part["size"],
+                encoding=part["encoding"],
+                section=part["section"],
+            ))
+
+        return attachments
+
+    def download_attachments(self, sync: IMAPSync, mail: imaplib.IMAP4, resumes_only: bool = True) -> list[Attachment]:
+        """
+        Download the attachments of a preview that have no content yet.
+
+        Args:
+            sync: Sync the preview was fetched with
+            mail: Connection with the email's folder selected
+            resumes_only: Only download PDF/DOC/DOCX attachments
+
+        Returns:
+            The attachments that were downloaded
+        """
+        pending = [
+            attachment for attachment in self._attachments
+            if not attachment.loaded and attachment.section and (not resumes_only or attachment.is_resume)
+        ]
+        parts = [{"section": attachment.section, "encoding": attachment.encoding} for attachment in pending]
+        contents = sync.fetch_sections(mail, int(self.id), parts, decode=False)
+        for attachment in pending:
+            if attachment.section in contents:
+                attachment.load(contents[attachment.section])
+        return pending
+
     def process_attachments(self):
+        saved = [attachment.save() for attachment in self._attachments if attachment.loaded]
+        if saved:
+            print(f"Saved {len(saved)} to {saved[0]}")
+
+    def close(self):
+        """Release the spooled attachment payloads."""
         for attachment in self._attachments:
-            with open(attachment["path"], 'wb') as f:
-                f.write(attachment["content"])
-            attachment.update({"processed": True})
-        print(f"Saved {len(self._attachments)} to {self._attachments[0]['path']}")
+            attachment.close()
         
 
 def fetch_emails(
@@ -167,47 +376,155 @@ def fetch_emails(
         folder: Literal["INBOX"]="INBOX", #TODO: Have to expand  this to all allowed folder names
         max_emails: int=50,
         temp_dir=None, 
+        chunk_size: int=100,
+        archive: Optional[MailArchive] = None,
     ) -> list[Email]:
-    
-    if not all(key in credentials for key in ("host", "username", "password")):
-        raise ValueError("Credentials must contain 'host', 'username', and 'password' keys.")
+    """
+    Fetch the emails received on `start_date` (or between `start_date` and
+    `end_date`). For recurring runs prefer `sync_emails`, which only
+    downloads messages that arrived since the previous run.
 
-    mail = imaplib.IMAP4_SSL(credentials["host"], 993) 
-    mail.login(credentials["username"], credentials["password"])
-    mail.select(folder)
+    Pass `archive` to also keep the raw messages in a local `MailArchive`.
+    """
+    # Many UIDs per FETCH command rather than one round trip per message
+    sync = IMAPSync(credentials, folder=folder, store=SyncStore(), chunk_size=chunk_size)
+    mail = connect(credentials)
+    sync.select(mail)
     # The date format is 'DD-Mon-YYYY' (e.g., "25-Feb-2025")
     if end_date:
-        status, data = mail.search(None, f'(SINCE "{start_date}")', f'(BEFORE "{end_date}")')
+        status, data = mail.uid("SEARCH", None, f'(SINCE "{start_date}")', f'(BEFORE "{end_date}")')
     else:
-        status, data = mail.search(None, f'(ON "{start_date}")')        
+        status, data = mail.uid("SEARCH", None, f'(ON "{start_date}")')
 
-    email_ids = data[0].split()
+    uids = [int(uid) for uid in data[0].split()]
 
-    if max_emails and len(email_ids) > max_emails:
-        email_ids = email_ids[-max_emails:]  
+    if max_emails and len(uids) > max_emails:
+        logger.warning(f"Found {len(uids)} emails, fetching only the latest {max_emails}")
+        uids = uids[-max_emails:]
 
-    emails = []
     if not temp_dir:
         temp_dir = Path(os.getcwd()) / f"data/tmp/{start_date}"
     temp_dir.mkdir(exist_ok=True, parents=True)
 
-    for id in email_ids:
-        email_id = id.decode()
-        # Create a unique ID for this email
-        email_hash = hashlib.md5(f"{email_id}_{start_date}".encode()).hexdigest()
-        
-        status, messages = mail.fetch(id, "(RFC822)")
-        for message in messages:
-            if isinstance(message, tuple):
-                msg = email.message_from_bytes(message[1])
-                
-                emails.append(Email(id=email_id, hash=email_hash, msg=msg, dir=temp_dir))
+    emails = []
+    for uid, raw in sync.fetch(mail, uids):
+        if archive is not None:
+            archive.add(sync.key, sync.uidvalidity, uid, raw)
+        email_hash = hashlib.md5(f"{uid}_{start_date}".encode()).hexdigest()
+        emails.append(Email(id=str(uid), hash=email_hash, msg=email.message_from_bytes(raw), dir=temp_dir))
 
     mail.logout()
         
     return emails
 
 
+def stream_emails(
+        credentials: dict[str, str] = DEFAULT_CREDENTIALS,
+        folder: str = "INBOX",
+        max_emails: Optional[int] = None,
+        since: Optional[str] = None,
+        temp_dir=None,
+        store: Optional[SyncStore] = None,
+        chunk_size: int = 100,
+        max_connections: Optional[int] = None,
+        preview: bool = False,
+        archive: Optional[MailArchive] = None,
+        sync: Optional[IMAPSync] = None,
+        track: bool = False,
+    ) -> Iterator[Email]:
+    """
+    Stream the emails that arrived since the previous sync of `folder`.
+
+    Chunks of UIDs are fetched on up to `max_connections` connections at once
+    and parsed on the fetching threads, so emails are yielded while the rest
+    of the range is still downloading.
+
+    Args:
+        credentials: Dict with `host`, `username` and `password` keys
+        folder: Mailbox folder to sync
+        max_emails: Maximum number of emails in this run, the rest are
+            fetched by the next run
+        since: Date ('DD-Mon-YYYY') limiting the very first sync of the folder
+        temp_dir: Directory attachments are saved to
+        store: Watermark store, defaults to `SyncStore()`
+        chunk_size: Number of UIDs fetched per FETCH command
+        max_connections: Maximum number of concurrent IMAP connections,
+            defaults to the `IMAP_MAX_CONNECTIONS` environment variable
+        preview: Only fetch previews, see `scan_emails`
+        archive: Local archive the raw messages are also written to; ignored
+            for previews, which aren't complete messages
+        sync: Sync of the folder to use, instead of a new one on `store`
+        track: Keep the UIDs of the emails pending until they are passed to
+            `IMAPSync.resolve`, and fetch the pending and failed ones again
+
+    Yields:
+        New emails, in completion order
+    """
+    if not temp_dir:
+        temp_dir = Path(os.getcwd()) / "data/tmp/sync"
+    temp_dir.mkdir(exist_ok=True, parents=True)
+
+    sync = sync or IMAPSync(credentials, folder=folder, store=store, chunk_size=chunk_size)
+
+    def build(uid: int, payload) -> Email:
+        email_hash = hashlib.md5(f"{sync.uidvalidity}_{uid}".encode()).hexdigest()
+        if preview:
+            return Email.from_preview(uid, email_hash, payload, temp_dir)
+        if archive is not None:
+            archive.add(sync.key, sync.uidvalidity, uid, payload)
+        return Email(id=str(uid), hash=email_hash, msg=email.message_from_bytes(payload), dir=temp_dir)
+
+    with ConcurrentFetcher(sync, max_connections=max_connections) as fetcher:
+        yield from fetcher.sync_new(limit=max_emails, since=since, preview=preview, build=build, track=track)
+
+
+def sync_emails(**kwargs) -> list[Email]:
+    """
+    Fetch only the emails that arrived since the previous sync of a folder.
+    Takes the same arguments as `stream_emails`.
+
+    Returns:
+        List of new emails, oldest first
+    """
+    return sorted(stream_emails(**kwargs), key=lambda e: int(e.id))
+
+
+def scan_emails(
+        credentials: dict[str, str] = DEFAULT_CREDENTIALS,
+        folder: str = "INBOX",
+        store: Optional[SyncStore] = None,
+        **kwargs,
+    ) -> tuple[list[Email], IMAPSync]:
+    """
+    Like `sync_emails`, but only fetches the headers, structure and start of
+    the text of every new email. Classify the returned emails, then call
+    `download_resumes` to fetch the resume attachments of the candidates.
+
+    Returns:
+        The new emails, and the sync to pass on to `download_resumes`
+    """
+    emails = sync_emails(credentials=credentials, folder=folder, store=store, preview=True, **kwargs)
+    return emails, IMAPSync(credentials, folder=folder, store=store)
+
+
+def download_resumes(emails: list[Email], sync: IMAPSync, max_connections: Optional[int] = None) -> list[Email]:
+    """
+    Download the resume attachments of the emails classified as candidates,
+    spread over a pool of connections.
+
+    Returns:
+        The candidate emails
+    """
+    candidates = [e for e in emails if e.type is not None and e.type.type == "candidate"]
+    if not candidates:
+        return []
+
+    with ConcurrentFetcher(sync, max_connections=max_connections) as fetcher:
+        for _ in fetcher.map(lambda mail, candidate: candidate.download_attachments(sync, mail), candidates):
+            pass
+    logger.info(f"Downloaded resume attachments of {len(candidates)} candidate emails, {sync.bytes_fetched} bytes fetched")
+    return candidates
+
 
 def classify_emails(emails: list[Email], classification_threshold=0.7) -> list[Email]:
     """
@@ -245,19 +562,22 @@ def classify_emails(emails: list[Email], classification_threshold=0.7) -> list[E
 def process_candidate_email(
         email_data, 
         temp_dir, 
-        credentials: dict[str, str] = DEFAULT_CREDENTIALS):
+        credentials: dict[str, str] = DEFAULT_CREDENTIALS,
+        mail: imaplib.IMAP4 | None = None):
     """
     Process a classified candidate email to extract attachments and detailed information
     (Only called for emails classified as candidate-related)
-    """
 
-    mail = imaplib.IMAP4_SSL(credentials["host"], 993)
-    mail.login(credentials["username"], credentials["password"])
-    # Reconnect to get the full message if needed
+    Pass `mail`, a connection with the INBOX selected (e.g. from a
+    `ConnectionPool`), to avoid logging in again for every email.
+    """
 
-    mail.select("INBOX")
+    owns_connection = mail is None
+    if owns_connection:
+        mail = connect(credentials)
+        mail.select("INBOX", readonly=True)
     
-    status, messages = mail.fetch(email_data["id"].encode(), "(RFC822)")
+    status, messages = mail.uid("FETCH", email_data["id"], "(RFC822)")
     msg = email.message_from_bytes(messages[0][1]) #Getting only the response part(#1) from the last message(#0) 
     
     # Now process all attachments that we identified earlier
@@ -283,7 +603,8 @@ def process_candidate_email(
         "extracted_info": {}
     }
     
-    mail.logout()
+    if owns_connection:
+        mail.logout()
     return candidate_info
 
 
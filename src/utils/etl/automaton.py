@@ -0,0 +1,141 @@
+"""
+Aho-Corasick automaton for direct matching of reference terms.
+
+One automaton holds several vocabularies (roles, skills, levels) at once.
+Scanning a text visits every character once, whatever the number of terms,
+and returns, for the requested vocabulary, the term that comes first in its
+list among those contained in the text.
+"""
+
+from collections import deque
+from typing import Dict, List, Optional
+
+
+class TermAutomaton:
+    """
+    Case-insensitive exact and substring matching of terms from several
+    vocabularies.
+
+    Usage:
+        automaton = TermAutomaton({"roles": ROLES, "skills": SKILLS})
+        automaton.match("pgt maths teacher", "roles")  # -> "Teacher"
+    """
+
+    def __init__(self, vocabularies: Dict[str, List[str]]):
+        """
+        Args:
+            vocabularies: Lists of terms by vocabulary name; the order of a
+                list is the priority of its terms
+        """
+        self.names = list(vocabularies)
+        self.terms = {name: list(terms) for name, terms in vocabularies.items()}
+        # First term of every vocabulary by lowercase form, for exact matches
+        self.exact: Dict[str, Dict[str, str]] = {}
+        for name, terms in self.terms.items():
+            exact: Dict[str, str] = {}
+            for term in terms:
+                exact.setdefault(term.lower(), term)
+            self.exact[name] = exact
+        self._build()
+
+    def _build(self):
+        count = len(self.names)
+        # Transitions, failure links and, for every vocabulary, the lowest
+        # index of the terms ending at each state (directly or as a suffix)
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List = [[None] * count]
+        # Index of the first empty term, contained in every text
+        self.empty: List[Optional[int]] = [None] * count
+
+        for position, name in enumerate(self.names):
+            for index, term in enumerate(self.terms[name]):
+                word = term.lower()
+                if not word:
+                    if self.empty[position] is None:
+                        self.empty[position] = index
+                    continue
+                state = 0
+                for char in word:
+                    next_state = self.goto[state].get(char)
+                    if next_state is None:
+                        next_state = len(self.goto)
+                        self.goto[state][char] = next_state
+                        self.goto.append({})
+                        self.fail.append(0)
+                        self.output.append([None] * count)
+                    state = next_state
+                current = self.output[state][position]
+                if current is None or index < current:
+                    self.output[state][position] = index
+
+        # Breadth-first, so the failure target of a state is complete before the state itself
+        order = []
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            order.append(state)
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[next_state] = target if target != next_state else 0
+                inherited = self.output[self.fail[next_state]]
+                own = self.output[next_state]
+                for position in range(count):
+                    if inherited[position] is not None and (own[position] is None or inherited[position] < own[position]):
+                        own[position] = inherited[position]
+
+        # Complete transitions (failure links followed in advance), so the scan takes one lookup per character
+        self.delta: List[Dict[str, int]] = [dict(self.goto[0])]
+        self.delta.extend({} for _ in range(len(self.goto) - 1))
+        for state in order:
+            self.delta[state] = {**self.delta[self.fail[state]], **self.goto[state]}
+        # States without output share one tuple, which the scan skips by identity
+        self._no_output = (None,) * count
+        self.output = [tuple(output) if any(index is not None for index in output) else self._no_output for output in self.output]
+        self._last = (None, None)
+
+    def scan(self, text: str) -> tuple:
+        """
+        Index of the first term of every vocabulary contained in `text`
+        (lowercase), None for the vocabularies without any.
+        """
+        last_text, last_result = self._last
+        if text == last_text:
+            return last_result
+        delta, output, no_output = self.delta, self.output, self._no_output
+        best = list(self.empty)
+        state = 0
+        for char in text:
+            state = delta[state].get(char, 0)
+            found = output[state]
+            if found is not no_output:
+                for position, index in enumerate(found):
+                    if index is not None and (best[position] is None or index < best[position]):
+                        best[position] = index
+        result = tuple(best)
+        # Roles and skills are matched on the same text one after the other
+        self._last = (text, result)
+        return result
+
+    def find(self, text: str, name: str) -> Optional[str]:
+        """
+        Term of vocabulary `name` contained in `text` that comes first in its
+        list, or None.
+        """
+        index = self.scan(text.lower())[self.names.index(name)]
+        return self.terms[name][index] if index is not None else None
+
+    def match(self, text: str, name: str) -> Optional[str]:
+        """
+        Term of vocabulary `name` equal to `text` ignoring case, else the first
+        term in list order contained in `text`, or None.
+        """
+        cleaned = text.lower().strip()
+        exact = self.exact[name].get(cleaned)
+        if exact is not None:
+            return exact
+        return self.find(cleaned, name)
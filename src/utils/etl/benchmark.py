@@ -0,0 +1,215 @@
+"""
+Micro-benchmarks of the DataNormalizer matchers.
+
+Each benchmark times the current implementation against the previous one
+on the same values, and checks that both return the same results.
+
+Usage:
+    python -m src.utils.etl.benchmark --rows 100000
+    python -m src.utils.etl.benchmark --input_path candidates.xlsx
+"""
+
+import re
+import time
+import random
+import logging
+import argparse
+from typing import Any, Callable, Dict, List, Optional
+
+from .normalizer import DataNormalizer
+from .extract import load_excel_data, prepare_dataframe
+
+logger = logging.getLogger(__name__)
+
+# Typical values of the skill column, used when no sheet is given
+SAMPLE_SKILLS = [
+    "PRT English", "Maths Teacher", "TGT Science", "PGT Physics", "Computer teacher",
+    "Pre primary teacher", "Art and craft", "Physical Education Teacher", "Accountant",
+    "Mother teacher (NTT)", "Hindi", "Social Science TGT", "Music teacher", "Librarian",
+    "PGT Chemistry / Biology", "Academic Coordinator", "Front office executive",
+    "Montessori trainer", "Dance teacher (western)", "Admin officer", "Bus driver", "Yoga",
+]
+
+
+def sample_values(rows: int, seed: int = 0) -> List[str]:
+    """Synthetic skill column of `rows` values, with spelling variations."""
+    rng = random.Random(seed)
+    values = []
+    for _ in range(rows):
+        value = rng.choice(SAMPLE_SKILLS)
+        if rng.random() < 0.3:
+            value = value.upper()
+        if rng.random() < 0.2:
+            value = f"{value} {rng.choice(SAMPLE_SKILLS).lower()}"
+        values.append(value)
+    return values
+
+
+def load_values(input_path: str, column: str = "old_skills", rows: Optional[int] = None) -> List[str]:
+    """Values of a column of a candidate sheet, after the standard column renaming."""
+    df = prepare_dataframe(load_excel_data(input_path))
+    values = df[column].dropna().astype(str).tolist()
+    return values[:rows] if rows else values
+
+
+def time_per_row(fn: Callable[[str], Any], values: List[str]) -> Dict[str, Any]:
+    start = time.perf_counter()
+    results = [fn(value) for value in values]
+    elapsed = time.perf_counter() - start
+    return {"results": results, "seconds": elapsed, "us_per_row": elapsed / len(values) * 1e6}
+
+
+def time_batch(fn: Callable[[List[str]], List[Any]], values: List[str]) -> Dict[str, Any]:
+    start = time.perf_counter()
+    results = fn(values)
+    elapsed = time.perf_counter() - start
+    return {"results": results, "seconds": elapsed, "us_per_row": elapsed / len(values) * 1e6}
+
+
+def compare(
+    name: str,
+    baseline: Callable[[str], Any],
+    current: Callable,
+    values: List[str],
+    batch: bool = False,
+) -> Dict[str, Any]:
+    """
+    Time `current` against `baseline` over `values`.
+
+    Args:
+        batch: Whether `current` takes the whole list of values at once instead of one value
+
+    Returns:
+        Dict with the time per row of both, the speedup and the number of values they disagree on
+    """
+    before = time_per_row(baseline, values)
+    after = time_batch(current, values) if batch else time_per_row(current, values)
+    mismatches = sum(a != b for a, b in zip(before["results"], after["results"]))
+    report = {
+        "benchmark": name,
+        "rows": len(values),
+        "baseline_us_per_row": round(before["us_per_row"], 2),
+        "current_us_per_row": round(after["us_per_row"], 2),
+        "speedup": round(before["seconds"] / after["seconds"], 2) if after["seconds"] else None,
+        "mismatches": mismatches,
+    }
+    logger.info(report)
+    return report
+
+
+def _regex_match_baseline(input_text: str, pattern_dict: Dict[str, str]) -> Optional[str]:
+    """`DataNormalizer._regex_match` before the patterns were compiled."""
+    for pattern, result in pattern_dict.items():
+        if re.search(pattern, input_text, re.IGNORECASE):
+            return result
+    return None
+
+
+def benchmark_regex(normalizer: DataNormalizer, values: List[str]) -> Dict[str, Any]:
+    """Role, level and skill regex matching of one row."""
+    texts = [normalizer._preprocess_text(value) for value in values]
+    mappings = (normalizer.role_patterns, normalizer.level_patterns, normalizer.skill_patterns)
+    return compare(
+        "regex_match",
+        lambda text: tuple(_regex_match_baseline(text, mapping) for mapping in mappings),
+        lambda text: tuple(normalizer._regex_match(text, mapping) for mapping in mappings),
+        texts,
+    )
+
+
+def _direct_match_baseline(input_text: str, target_list: List[str]) -> Optional[str]:
+    """`DataNormalizer._direct_match` before the term automaton."""
+    cleaned_input = input_text.lower().strip()
+    for item in target_list:
+        if item.lower() == cleaned_input:
+            return item
+    for item in target_list:
+        if item.lower() in cleaned_input:
+            return item
+    return None
+
+
+def benchmark_direct(normalizer: DataNormalizer, values: List[str]) -> Dict[str, Any]:
+    """Role and skill direct matching of one row."""
+    texts = [normalizer._preprocess_text(value) for value in values]
+    lists = (normalizer.roles, normalizer.skills, normalizer.levels)
+    return compare(
+        "direct_match",
+        lambda text: tuple(_direct_match_baseline(text, targets) for targets in lists),
+        lambda text: tuple(normalizer._direct_match(text, targets) for targets in lists),
+        texts,
+    )
+
+
+def _fuzzy_match_baseline(input_text: str, target_list: List[str], threshold: int = 75) -> Optional[str]:
+    """`DataNormalizer._fuzzy_match` with fuzzywuzzy."""
+    from fuzzywuzzy import process
+
+    if not input_text or len(input_text) < 3:
+        return None
+    best_match = process.extractOne(input_text, target_list)
+    return best_match[0] if best_match and best_match[1] >= threshold else None
+
+
+def benchmark_fuzzy(normalizer: DataNormalizer, values: List[str]) -> Dict[str, Any]:
+    """Role and skill fuzzy matching of the distinct values, one by one against in one batch."""
+    texts = list(dict.fromkeys(normalizer._preprocess_text(value) for value in values))
+    lists = (normalizer.roles, normalizer.skills)
+    return compare(
+        "fuzzy_match",
+        lambda text: tuple(_fuzzy_match_baseline(text, targets) for targets in lists),
+        lambda texts: list(zip(*(normalizer.fuzzy_match_many(texts, targets) for targets in lists))),
+        texts,
+        batch=True,
+    )
+
+
+def _vector_similarity_match_baseline(normalizer: DataNormalizer, input_text: str, is_role: bool = False) -> Optional[str]:
+    """`DataNormalizer._vector_similarity_match` with one sklearn transform and cosine_similarity per value."""
+    import numpy as np
+    from sklearn.metrics.pairwise import cosine_similarity
+
+    if not input_text or len(input_text) < 3:
+        return None
+    if is_role:
+        vectorizer, matrix, target_list = normalizer.role_vectorizer, normalizer.role_matrix, normalizer.roles
+    else:
+        vectorizer, matrix, target_list = normalizer.skill_vectorizer, normalizer.skill_matrix, normalizer.skills
+    similarity_scores = cosine_similarity(vectorizer.transform([input_text]), matrix).flatten()
+    best_idx = np.argmax(similarity_scores)
+    return target_list[best_idx] if similarity_scores[best_idx] > 0.3 else None
+
+
+def benchmark_vector(normalizer: DataNormalizer, values: List[str]) -> Dict[str, Any]:
+    """Role and skill vector similarity matching of the distinct values, one by one against in one product."""
+    texts = list(dict.fromkeys(normalizer._preprocess_text(value) for value in values))
+    return compare(
+        "vector_match",
+        lambda text: tuple(_vector_similarity_match_baseline(normalizer, text, is_role) for is_role in (True, False)),
+        lambda texts: list(zip(*(normalizer.vector_similarity_match_many(texts, is_role) for is_role in (True, False)))),
+        texts,
+        batch=True,
+    )
+
+
+BENCHMARKS = {
+    "regex": benchmark_regex,
+    "direct": benchmark_direct,
+    "fuzzy": benchmark_fuzzy,
+    "vector": benchmark_vector,
+}
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='Benchmark the DataNormalizer matchers')
+    parser.add_argument('--input_path', type=str, help='Candidate sheet to take the values from, instead of synthetic ones')
+    parser.add_argument('--column', type=str, default='old_skills', help='Column of the sheet to take the values from')
+    parser.add_argument('--rows', type=int, default=100000, help='Number of values')
+    parser.add_argument('--only', type=str, choices=list(BENCHMARKS), nargs='*', help='Benchmarks to run')
+    args = parser.parse_args()
+
+    values = load_values(args.input_path, args.column, args.rows) if args.input_path else sample_values(args.rows)
+    normalizer = DataNormalizer()
+    for name in args.only or BENCHMARKS:
+        BENCHMARKS[name](normalizer, values)
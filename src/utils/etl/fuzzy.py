@@ -0,0 +1,210 @@
+"""
+Batch fuzzy matching.
+
+Inputs are matched against a target list with the scores of fuzzywuzzy's
+`process.extractOne` (WRatio), for a whole column of inputs at once:
+
+1. rapidfuzz's `process.cdist` scores every input against every target in
+   C. Its WRatio is never more than a point of rounding below fuzzywuzzy's
+   (fuzzywuzzy rounds the partial scores before scaling them; it can be
+   well above, as its partial alignment is exact), so it serves as an upper
+   bound: only targets within `SHORTLIST_MARGIN` of the threshold can be a
+   match.
+2. The shortlisted targets are scored with `wratio`, fuzzywuzzy's WRatio
+   rebuilt on the Levenshtein C extension, best rapidfuzz score first and
+   until no remaining target can beat the best one, so the matches and
+   thresholds are the same as with fuzzywuzzy.
+
+For long target lists (every city of the country), a `TrigramIndex` can
+first narrow the targets of each input down to the few sharing the most
+character trigrams with it, at the cost of missing matches that share
+almost none.
+"""
+
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import Levenshtein
+from rapidfuzz import fuzz, process
+
+# fuzzywuzzy's `full_process` drops the characters 128-255 and replaces non-word characters
+ASCII_TRANSLATION = dict.fromkeys(range(128, 256))
+NON_WORD_PATTERN = re.compile(r'(?ui)\W')
+
+# Points by which rapidfuzz's WRatio can fall below fuzzywuzzy's, with room to spare
+SHORTLIST_MARGIN = 2
+# Inputs scored per cdist call, bounding the size of the score matrix
+CHUNK_SIZE = 1024
+
+
+def full_process(text: str) -> str:
+    """fuzzywuzzy's default processing of a string."""
+    return NON_WORD_PATTERN.sub(' ', str(text).translate(ASCII_TRANSLATION)).lower().strip()
+
+
+def _ratio(s1: str, s2: str) -> int:
+    if not s1 or not s2:
+        return 0
+    return round(Levenshtein.ratio(s1, s2) * 100)
+
+
+def _partial_ratio(s1: str, s2: str) -> int:
+    """Best ratio of the shorter string with the windows of the longer one at its matching blocks."""
+    if not s1 or not s2:
+        return 0
+    shorter, longer = (s1, s2) if len(s1) <= len(s2) else (s2, s1)
+    blocks = Levenshtein.matching_blocks(Levenshtein.editops(shorter, longer), shorter, longer)
+    best = 0.0
+    for short_start, long_start, _ in blocks:
+        start = max(0, long_start - short_start)
+        score = Levenshtein.ratio(shorter, longer[start:start + len(shorter)])
+        if score > .995:
+            return 100
+        best = max(best, score)
+    return round(best * 100)
+
+
+def _token_sort_ratio(s1: str, s2: str, partial: bool) -> int:
+    sorted1, sorted2 = " ".join(sorted(s1.split())), " ".join(sorted(s2.split()))
+    return _partial_ratio(sorted1, sorted2) if partial else _ratio(sorted1, sorted2)
+
+
+def _token_set_ratio(s1: str, s2: str, partial: bool) -> int:
+    if not s1 or not s2:
+        return 0
+    tokens1, tokens2 = set(s1.split()), set(s2.split())
+    intersection = " ".join(sorted(tokens1 & tokens2))
+    combined1 = f"{intersection} {' '.join(sorted(tokens1 - tokens2))}".strip()
+    combined2 = f"{intersection} {' '.join(sorted(tokens2 - tokens1))}".strip()
+    scorer = _partial_ratio if partial else _ratio
+    return max(scorer(intersection, combined1), scorer(intersection, combined2), scorer(combined1, combined2))
+
+
+def wratio(p1: str, p2: str) -> int:
+    """
+    fuzzywuzzy's WRatio of two strings already processed with `full_process`.
+    """
+    if not p1 or not p2:
+        return 0
+    base = _ratio(p1, p2)
+    length_ratio = max(len(p1), len(p2)) / min(len(p1), len(p2))
+    if length_ratio < 1.5:
+        return round(max(
+            base,
+            _token_sort_ratio(p1, p2, partial=False) * .95,
+            _token_set_ratio(p1, p2, partial=False) * .95,
+        ))
+    partial_scale = .6 if length_ratio > 8 else .9
+    return round(max(
+        base,
+        _partial_ratio(p1, p2) * partial_scale,
+        _token_sort_ratio(p1, p2, partial=True) * .95 * partial_scale,
+        _token_set_ratio(p1, p2, partial=True) * .95 * partial_scale,
+    ))
+
+
+def trigrams(text: str) -> List[str]:
+    """Character trigrams of a processed string, padded so that words of any length have some."""
+    padded = f"  {text} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+class TrigramIndex:
+    """
+    Inverted index from character trigrams to the strings containing them.
+    """
+
+    def __init__(self, choices: Sequence[str]):
+        """
+        Args:
+            choices: Processed strings to index
+        """
+        self.size = len(choices)
+        postings: Dict[str, set] = defaultdict(set)
+        for index, choice in enumerate(choices):
+            for trigram in trigrams(choice):
+                postings[trigram].add(index)
+        self.postings = {trigram: np.fromiter(sorted(indexes), dtype=np.int64) for trigram, indexes in postings.items()}
+
+    def shortlist(self, query: str, limit: int) -> np.ndarray:
+        """
+        Indexes of the (at most) `limit` strings sharing the most trigrams
+        with `query`, in index order.
+        """
+        hits = [self.postings[trigram] for trigram in set(trigrams(query)) if trigram in self.postings]
+        if not hits:
+            return np.empty(0, dtype=np.int64)
+        counts = np.bincount(np.concatenate(hits), minlength=self.size)
+        candidates = np.flatnonzero(counts)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-counts[candidates], limit - 1)[:limit]]
+        return np.sort(candidates)
+
+
+class FuzzyMatcher:
+    """
+    Best fuzzy match of inputs in a target list, above a score threshold.
+
+    Usage:
+        matcher = FuzzyMatcher(SKILLS, threshold=75)
+        matcher.match_many(["mathematic", "englsh"])  # -> ["Mathematics", "English"]
+    """
+
+    def __init__(self, targets: Sequence[str], threshold: int = 75, shortlist: Optional[int] = None):
+        """
+        Args:
+            targets: List of target strings to match against
+            threshold: Minimum score (0-100) for a match to be considered valid
+            shortlist: Number of targets shortlisted by shared trigrams for each
+                input, when there are more targets than that; None scores every target
+        """
+        self.targets = list(targets)
+        self.threshold = threshold
+        self._choices = [full_process(target) for target in self.targets]
+        self.shortlist = shortlist if shortlist is not None and len(self.targets) > shortlist else None
+        self._index = TrigramIndex(self._choices) if self.shortlist else None
+
+    def _best(self, query: str, candidates: np.ndarray, bounds: np.ndarray) -> Optional[str]:
+        """
+        Best target among `candidates` for a processed input, from their
+        rapidfuzz scores `bounds`; ties go to the target first in the list.
+        """
+        best_index, best_score = None, -1
+        for position in sorted(np.flatnonzero(bounds >= self.threshold - SHORTLIST_MARGIN), key=lambda i: -bounds[i]):
+            if bounds[position] + SHORTLIST_MARGIN < best_score:
+                break
+            index = candidates[position]
+            score = wratio(query, self._choices[index])
+            if score > best_score or (score == best_score and index < best_index):
+                best_index, best_score = index, score
+        return self.targets[best_index] if best_score >= self.threshold else None
+
+    def match_many(self, inputs: Sequence[str]) -> List[Optional[str]]:
+        """
+        Best match of every input, or None when its score is below the
+        threshold. Ties go to the target that comes first in the list.
+        """
+        if not self.targets:
+            return [None] * len(inputs)
+        if self._index is not None:
+            return [self._match_shortlisted(full_process(text)) for text in inputs]
+        results: List[Optional[str]] = []
+        every_target = np.arange(len(self.targets))
+        for start in range(0, len(inputs), CHUNK_SIZE):
+            queries = [full_process(text) for text in inputs[start:start + CHUNK_SIZE]]
+            scores = process.cdist(queries, self._choices, scorer=fuzz.WRatio, workers=-1)
+            results.extend(self._best(query, every_target, row) for query, row in zip(queries, scores))
+        return results
+
+    def _match_shortlisted(self, query: str) -> Optional[str]:
+        """Best match of a processed input among the targets shortlisted for it."""
+        candidates = self._index.shortlist(query, self.shortlist)
+        if not len(candidates):
+            return None
+        scores = process.cdist([query], [self._choices[i] for i in candidates], scorer=fuzz.WRatio)[0]
+        return self._best(query, candidates, scores)
+
+    def match(self, text: str) -> Optional[str]:
+        return self.match_many([text])[0]
@@ -127,6 +127,19 @@ def save_report(report: Dict[str, Any], output_path: str) -> bool:
             f.write("==== TOP SKILLS ====\n")
             for skill, count in report.get('top_skills', {}).items():
                 f.write(f"{skill}: {count}\n")
+            
+            # Write matching stages, when the normalizer was profiled
+            stages = report.get('stages')
+            if stages:
+                f.write("\n==== MATCHING STAGES ====\n")
+                for field, field_stages in stages.items():
+                    f.write(f"{field}:\n")
+                    for stage, stats in field_stages.items():
+                        histogram = ", ".join(f"{bucket}: {count}" for bucket, count in stats['latency_histogram'].items() if count)
+                        f.write(
+                            f"  {stage}: {stats['hits']}/{stats['values']} resolved ({stats['hit_rate']:.2f}%), "
+                            f"{stats['seconds']:.3f}s, {stats['us_per_value']:.1f}us/value [{histogram}]\n"
+                        )
                 
         logger.info(f"Report successfully saved to {output_path}")
         return True
@@ -8,21 +8,95 @@ This module contains the DataNormalizer class, which is responsible for:
 """
 
 import re
+import time
 import logging
-from typing import Dict, List, Optional, Any, Union
+from typing import Dict, List, Optional, Any, Tuple, Union
 
 import numpy as np
 import pandas as pd
-from fuzzywuzzy import process
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
 
+from .automaton import TermAutomaton
+from .fuzzy import FuzzyMatcher
+from .profiler import MatchProfiler
 from src.utils.defs import ROLES, LEVELS, SKILLS, ROLE_MAPPING, LEVEL_MAPPING, SKILL_MAPPING, CITIES
 
 # Configure logger
 logger = logging.getLogger(__name__)
 # logger.setLevel(logging.DEBUG)
 
+WHITESPACE_PATTERN = re.compile(r'\s+')
+NON_WORD_PATTERN = re.compile(r'[^\w\s]')
+
+# Level abbreviations tried after LEVEL_MAPPING
+LEVEL_ABBREVIATIONS = [
+    (re.compile(r'\bprt\b', re.IGNORECASE), "Primary (PRT)"),
+    (re.compile(r'\btgt\b', re.IGNORECASE), "TGT"),
+    (re.compile(r'\bpgt\b', re.IGNORECASE), "PGT"),
+]
+
+MOBILE_PATTERN = re.compile(r'^\+\d{1,3}-\d{10}$')
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9][a-zA-Z0-9._%+-]*@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+# All the checks of `is_valid_email` in one pattern: EMAIL_PATTERN, no "..", a TLD (with the
+# newline `$` lets through) of at most 63 characters and no typo in the first domain label
+EMAIL_VALIDITY_PATTERN = re.compile(
+    r'^(?!.*\.\.)[a-zA-Z0-9][a-zA-Z0-9._%+-]*@(?![^.]*(?i:gmial|yahho|outlok|hotnail))'
+    r'[a-zA-Z0-9.-]+\.(?:[a-zA-Z]{2,63}|[a-zA-Z]{2,62}\n)\Z'
+)
+NUMBER_SEPARATORS_PATTERN = re.compile(r'[\s\-\(\)\+]')
+INDIAN_MOBILE_PREFIXES = ('6', '7', '8', '9')
+EMAIL_DOMAIN_TYPOS = ['gmial', 'yahho', 'outlok', 'hotnail']
+EMAIL_DOMAIN_FIXES = {
+    'gmial.com': 'gmail.com',
+    'gmal.com': 'gmail.com',
+    'gmail.co': 'gmail.com',
+    'gmail.comm': 'gmail.com',
+    'yahho.com': 'yahoo.com',
+    'yaho.com': 'yahoo.com',
+    'yahoo.comm': 'yahoo.com',
+    'hotmial.com': 'hotmail.com',
+    'hotnail.com': 'hotmail.com',
+    'hotmail.comm': 'hotmail.com',
+    'outlok.com': 'outlook.com',
+    'outloo.com': 'outlook.com',
+    'outlook.comm': 'outlook.com'
+}
+
+# TF-IDF analyzers of the vector matching, and n-gram sizes of the character ones
+VECTOR_ANALYZERS = ('word', 'char_wb', 'char')
+CHAR_NGRAM_RANGE = (2, 4)
+# Inputs per sparse product of the vector matching, bounding the dense score matrix
+VECTOR_CHUNK_SIZE = 4096
+# Cities shortlisted by shared trigrams before fuzzy scoring, in city lists longer than that
+CITY_SHORTLIST_SIZE = 64
+
+
+class PatternMatcher:
+    """
+    Regex patterns mapped to results, compiled once.
+
+    `match` returns the result of the first pattern in dict order matching
+    anywhere in a text, like looping over the dict with `re.search`, without
+    going through the `re` module's cache and flag handling for every
+    pattern of every row.
+    """
+
+    def __init__(self, pattern_dict: Dict[str, str], flags: int = re.IGNORECASE):
+        """
+        Args:
+            pattern_dict: Dictionary mapping regex patterns to result strings
+            flags: Flags the patterns are compiled with
+        """
+        self.patterns = [(re.compile(pattern, flags), result) for pattern, result in pattern_dict.items()]
+
+    def match(self, text: str) -> Optional[str]:
+        """Result of the first pattern matching `text`, or None."""
+        for pattern, result in self.patterns:
+            if pattern.search(text):
+                return result
+        return None
+
 
 def is_valid_mobile(num):
     """
@@ -32,8 +106,7 @@ def is_valid_mobile(num):
     if num is None:
         return False
     
-    pattern = r'^\+\d{1,3}-\d{10}$'
-    return bool(re.match(pattern, str(num)))
+    return bool(MOBILE_PATTERN.match(str(num)))
 
 def is_valid_email(email):
     """
@@ -48,8 +121,7 @@ def is_valid_email(email):
     email = str(email)
     
     # More comprehensive email pattern
-    pattern = r'^[a-zA-Z0-9][a-zA-Z0-9._%+-]*@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    if not re.match(pattern, email):
+    if not EMAIL_PATTERN.match(email):
         return False
     
     # Additional validations
@@ -62,9 +134,8 @@ def is_valid_email(email):
         return False
     
     # Common typo check
-    common_typos = ['gmial', 'yahho', 'outlok', 'hotnail']
     domain = email.split('@')[1].split('.')[0].lower()
-    for typo in common_typos:
+    for typo in EMAIL_DOMAIN_TYPOS:
         if typo in domain:
             return False
     
@@ -80,6 +151,18 @@ def is_valid_pin(pin):
     pin_str = str(pin).strip()
     return pin_str.isdigit() and len(pin_str) == 6
 
+def valid_mobile_mask(numbers: pd.Series) -> pd.Series:
+    """
+    `is_valid_mobile` of every value of a column, with pandas string operations.
+    """
+    return numbers.astype(str).str.match(MOBILE_PATTERN).fillna(False).astype(bool)
+
+def valid_email_mask(emails: pd.Series) -> pd.Series:
+    """
+    `is_valid_email` of every value of a column, with pandas string operations.
+    """
+    return emails.astype(str).str.match(EMAIL_VALIDITY_PATTERN).fillna(False).astype(bool)
+
 def is_valid_date(date):
     """
     Validates if a date is in the format DD/MM/YYYY.
@@ -115,7 +198,8 @@ class DataNormalizer:
     def __init__(self, roles: List[str] = ROLES, 
                  levels: List[str] = LEVELS, 
                  skills: List[str] = SKILLS,
-                 cities: List[str] = CITIES):
+                 cities: List[str] = CITIES,
+                 profile: bool = False):
         """
         Initialize the DataNormalizer with reference data.
         
@@ -123,15 +207,36 @@ class DataNormalizer:
             roles: List of standard role names
             levels: List of standard education/job levels
             skills: List of standard skills
+            profile: Whether to record hits, misses and latency of every matching stage in `profiler`
         """
         try:
             self.roles = roles
             self.levels = levels
             self.skills = skills
             self.cities = cities
+            self.profiler = MatchProfiler() if profile else None
             self.role_patterns = ROLE_MAPPING
             self.level_patterns = LEVEL_MAPPING
             self.skill_patterns = SKILL_MAPPING
+            # Compiled once, and looked up by identity of the mapping, which unlike id() survives
+            # pickling to the worker processes
+            self._pattern_matchers = [
+                (patterns, PatternMatcher(patterns))
+                for patterns in (self.role_patterns, self.level_patterns, self.skill_patterns)
+            ]
+            
+            # Direct matching of the three lists shares one automaton
+            self.term_automaton = TermAutomaton({"roles": self.roles, "skills": self.skills, "levels": self.levels})
+            self._term_lists = [(self.roles, "roles"), (self.skills, "skills"), (self.levels, "levels")]
+            
+            # Fuzzy matchers, built on first use, by target list (identity) and threshold, and by state for cities
+            self._fuzzy_matchers: List[Tuple[List[str], int, FuzzyMatcher]] = []
+            self._city_matchers: Dict[Optional[str], FuzzyMatcher] = {}
+            # City names by state, in table order
+            self.city_names = self.cities["name"].to_list()
+            self.state_cities: Dict[str, List[str]] = {
+                state: names.to_list() for state, names in self.cities.groupby("state", sort=False)["name"]
+            }
             
             # Prepare TF-IDF vectorizer for semantic matching
             self.skill_vectorizer = TfidfVectorizer()
@@ -140,6 +245,13 @@ class DataNormalizer:
             self.role_vectorizer = TfidfVectorizer()
             self.role_matrix = self.role_vectorizer.fit_transform(self.roles)
             
+            # Vectorizer and transposed unit-norm target matrix by (is_role, analyzer), the
+            # character n-gram ones fitted on first use
+            self._vector_models: Dict[Tuple[bool, str], Tuple[TfidfVectorizer, Any]] = {
+                (False, 'word'): (self.skill_vectorizer, normalize(self.skill_matrix).T.tocsr()),
+                (True, 'word'): (self.role_vectorizer, normalize(self.role_matrix).T.tocsr()),
+            }
+            
             logger.info("DataNormalizer initialized successfully")
         except Exception as e:
             logger.error(f"Error initializing DataNormalizer: {e}", exc_info=True)
@@ -159,14 +271,23 @@ class DataNormalizer:
             if pd.isna(text) or not isinstance(text, str):
                 return ""
             # Convert to lowercase, remove extra spaces
-            text = re.sub(r'\s+', ' ', str(text).lower().strip())
+            text = WHITESPACE_PATTERN.sub(' ', str(text).lower().strip())
             # Remove special characters but keep spaces
-            text = re.sub(r'[^\w\s]', ' ', text)
+            text = NON_WORD_PATTERN.sub(' ', text)
             return text
         except Exception as e:
             logger.error(f"Error preprocessing text: {e}", exc_info=True)
             return ""
     
+    def _profiled(self, field: str, stage: str, match: Any, *args) -> Any:
+        """Run a matching stage on one value, recording it in the profiler if there is one."""
+        if self.profiler is None:
+            return match(*args)
+        start = time.perf_counter()
+        result = match(*args)
+        self.profiler.record(field, stage, int(bool(result)), int(not result), time.perf_counter() - start)
+        return result
+    
     def _direct_match(self, input_text: str, target_list: List[str]) -> Optional[str]:
         """
         Perform direct string matching against a list of targets.
@@ -182,18 +303,13 @@ class DataNormalizer:
             if not input_text:
                 return None
             
-            # First try exact match
-            cleaned_input = input_text.lower().strip()
-            for item in target_list:
-                if item.lower() == cleaned_input:
-                    return item
-            
-            # Try case-insensitive contains match
-            for item in target_list:
-                if item.lower() in cleaned_input:
-                    return item
-                    
-            return None
+            # Exact match first, then the first item of the list contained in the input, in one scan
+            name = next((name for targets, name in self._term_lists if targets is target_list), None)
+            if name is None:
+                name = f"list_{len(self._term_lists)}"
+                self._term_lists.append((target_list, name))
+                self.term_automaton = TermAutomaton({name: targets for targets, name in self._term_lists})
+            return self.term_automaton.match(input_text, name)
         except Exception as e:
             logger.error(f"Error in direct matching: {e}", exc_info=True)
             return None
@@ -212,16 +328,26 @@ class DataNormalizer:
         try:
             if not input_text:
                 return None
-                
-            for pattern, result in pattern_dict.items():
-                if re.search(pattern, input_text, re.IGNORECASE):
-                    return result
-                    
-            return None
+
+            matcher = next((matcher for patterns, matcher in self._pattern_matchers if patterns is pattern_dict), None)
+            if matcher is None:
+                matcher = PatternMatcher(pattern_dict)
+                self._pattern_matchers.append((pattern_dict, matcher))
+            return matcher.match(input_text)
         except Exception as e:
             logger.error(f"Error in regex matching: {e}", exc_info=True)
             return None
     
+    def _fuzzy_matcher(self, target_list: List[str], threshold: int) -> FuzzyMatcher:
+        matcher = next(
+            (matcher for targets, limit, matcher in self._fuzzy_matchers if targets is target_list and limit == threshold),
+            None,
+        )
+        if matcher is None:
+            matcher = FuzzyMatcher(target_list, threshold)
+            self._fuzzy_matchers.append((target_list, threshold, matcher))
+        return matcher
+    
     def _fuzzy_match(self, input_text: str, target_list: List[str], threshold: int = 75) -> Optional[str]:
         """
         Find best fuzzy match in target list.
@@ -238,15 +364,44 @@ class DataNormalizer:
             if not input_text or len(input_text) < 3:
                 return None
                 
-            best_match = process.extractOne(input_text, target_list)
-            if best_match and best_match[1] >= threshold:
-                return best_match[0]
-                
-            return None
+            return self._fuzzy_matcher(target_list, threshold).match(input_text)
         except Exception as e:
             logger.error(f"Error in fuzzy matching: {e}", exc_info=True)
             return None
     
+    def fuzzy_match_many(self, inputs: List[str], target_list: List[str], threshold: int = 75) -> List[Optional[str]]:
+        """
+        Best fuzzy match in target list of every input, scored in one batch.
+        Same results as `_fuzzy_match` on each input.
+        
+        Args:
+            inputs: Preprocessed input texts to match
+            target_list: List of target strings to match against
+            threshold: Minimum score (0-100) for a match to be considered valid
+            
+        Returns:
+            Best fuzzy-matched string or None for every input
+        """
+        results: List[Optional[str]] = [None] * len(inputs)
+        try:
+            positions = [i for i, text in enumerate(inputs) if text and len(text) >= 3]
+            matches = self._fuzzy_matcher(target_list, threshold).match_many([inputs[i] for i in positions])
+            for position, match in zip(positions, matches):
+                results[position] = match
+        except Exception as e:
+            logger.error(f"Error in batch fuzzy matching: {e}", exc_info=True)
+        return results
+    
+    def _vector_model(self, is_role: bool, analyzer: str) -> Tuple[TfidfVectorizer, Any]:
+        model = self._vector_models.get((is_role, analyzer))
+        if model is None:
+            if analyzer not in VECTOR_ANALYZERS:
+                raise ValueError(f"Unknown analyzer: {analyzer}")
+            vectorizer = TfidfVectorizer(analyzer=analyzer, ngram_range=CHAR_NGRAM_RANGE)
+            matrix = vectorizer.fit_transform(self.roles if is_role else self.skills)
+            model = self._vector_models[(is_role, analyzer)] = (vectorizer, normalize(matrix).T.tocsr())
+        return model
+    
     def _vector_similarity_match(self, input_text: str, is_role: bool = False) -> Optional[str]:
         """
         Find best semantic match using TF-IDF and cosine similarity.
@@ -261,34 +416,63 @@ class DataNormalizer:
         try:
             if not input_text or len(input_text) < 3:
                 return None
-                
-            # Choose the appropriate vectorizer and matrix
-            if is_role:
-                vectorizer = self.role_vectorizer
-                matrix = self.role_matrix
-                target_list = self.roles
-            else:
-                vectorizer = self.skill_vectorizer
-                matrix = self.skill_matrix
-                target_list = self.skills
-                
-            # Transform input text to vector
-            input_vector = vectorizer.transform([input_text])
-            
-            # Calculate similarity scores
-            similarity_scores = cosine_similarity(input_vector, matrix).flatten()
-            
-            # Find the index of the highest similarity score
-            best_idx = np.argmax(similarity_scores)
             
-            # Return the best match if similarity is above threshold
-            if similarity_scores[best_idx] > 0.3:
-                return target_list[best_idx]
-                
+            return self.vector_similarity_match_many([input_text], is_role=is_role)[0]
         except Exception as e:
             logger.error(f"Vector similarity matching error: {e}", exc_info=True)
             
         return None
+    
+    def vector_similarity_match_many(self, 
+                                     inputs: List[str], 
+                                     is_role: bool = False, 
+                                     analyzer: str = 'word') -> List[Optional[str]]:
+        """
+        Find the best semantic match of every input with one sparse matrix
+        product: the inputs are transformed together, multiplied by the
+        target matrix, and the best target of each row is kept when its
+        cosine similarity is above 0.3.
+        
+        Args:
+            inputs: Preprocessed input texts to match
+            is_role: Whether matching against roles (True) or skills (False)
+            analyzer: 'word' for the word TF-IDF of `_vector_similarity_match`, or
+                'char_wb' / 'char' for character n-grams, more tolerant of misspellings
+            
+        Returns:
+            Best semantically matched string or None for every input
+        """
+        results: List[Optional[str]] = [None] * len(inputs)
+        try:
+            positions = [i for i, text in enumerate(inputs) if text and len(text) >= 3]
+            if not positions:
+                return results
+            
+            vectorizer, target_matrix = self._vector_model(is_role, analyzer)
+            target_list = self.roles if is_role else self.skills
+            
+            for start in range(0, len(positions), VECTOR_CHUNK_SIZE):
+                chunk = positions[start:start + VECTOR_CHUNK_SIZE]
+                input_matrix = normalize(vectorizer.transform([inputs[i] for i in chunk]))
+                similarity_scores = (input_matrix @ target_matrix).toarray()
+                best_indices = similarity_scores.argmax(axis=1)
+                best_scores = similarity_scores[np.arange(len(chunk)), best_indices]
+                for position, best_idx, score in zip(chunk, best_indices, best_scores):
+                    if score > 0.3:
+                        results[position] = target_list[best_idx]
+        except Exception as e:
+            logger.error(f"Vector similarity matching error: {e}", exc_info=True)
+        
+        return results
+    
+    def _city_matcher(self, state: Optional[str]) -> FuzzyMatcher:
+        """Fuzzy matcher of the cities of a state, or of all cities for Andhra Pradesh and unknown states."""
+        key = state if state is not None and state != "Andhra Pradesh" else None
+        matcher = self._city_matchers.get(key)
+        if matcher is None:
+            target = self.state_cities.get(key, []) if key is not None else self.city_names
+            matcher = self._city_matchers[key] = FuzzyMatcher(target, threshold=70, shortlist=CITY_SHORTLIST_SIZE)
+        return matcher
 
     def match_city(self, city: str, state: str = None) -> str:
         """
@@ -303,19 +487,42 @@ class DataNormalizer:
             if not preprocessed or len(preprocessed) < 3:
                 logger.warning(f"Input text {city} is too short: {city}")
                 return None
-            if state is not None and state != "Andhra Pradesh":
-                target = self.cities[self.cities["state"] == state]["name"].to_list()
-            else:
-                target = self.cities["name"].to_list()
-            best_match = process.extractOne(preprocessed, target)
-            if best_match and best_match[1] >= 70:
-                return best_match[0]
-                
-            return None
+            return self._profiled('city', 'fuzzy', self._city_matcher(state).match, preprocessed)
         except Exception as e:
             logger.error(f"Error matching city: {e}", exc_info=True)
             return None
 
+    def match_cities(self, cities: List[Any], states: List[Optional[str]]) -> List[Optional[str]]:
+        """
+        Match a column of cities to standardized cities, scoring the cities of
+        each state in one batch. Same results as `match_city` on each pair.
+        
+        Args:
+            cities: Input city texts
+            states: State of every city, None when unknown
+            
+        Returns:
+            Standardized city or None for every input
+        """
+        results: List[Optional[str]] = [None] * len(cities)
+        try:
+            groups: Dict[Optional[str], List[int]] = {}
+            texts = [self._preprocess_text(city) for city in cities]
+            for position, (text, state) in enumerate(zip(texts, states)):
+                if text and len(text) >= 3:
+                    groups.setdefault(state, []).append(position)
+            for state, positions in groups.items():
+                start = time.perf_counter()
+                matches = self._city_matcher(state).match_many([texts[i] for i in positions])
+                for position, match in zip(positions, matches):
+                    results[position] = match
+                if self.profiler is not None:
+                    hits = sum(match is not None for match in matches)
+                    self.profiler.record('city', 'fuzzy', hits, len(matches) - hits, time.perf_counter() - start)
+        except Exception as e:
+            logger.error(f"Error matching cities: {e}", exc_info=True)
+        return results
+
     def match_role(self, input_text: str, strategy: str = 'progressive') -> str:
         """
         Match input text to a standardized role.
@@ -339,28 +546,28 @@ class DataNormalizer:
                 return None
                 
             if strategy == 'direct':
-                return self._direct_match(preprocessed, self.roles) or None
+                return self._profiled('role', 'direct', self._direct_match, preprocessed, self.roles) or None
             elif strategy == 'regex':
-                return self._regex_match(preprocessed, self.role_patterns) or None
+                return self._profiled('role', 'regex', self._regex_match, preprocessed, self.role_patterns) or None
             elif strategy == 'fuzzy':
-                return self._fuzzy_match(preprocessed, self.roles) or None
+                return self._profiled('role', 'fuzzy', self._fuzzy_match, preprocessed, self.roles) or None
             elif strategy == 'vector':
-                return self._vector_similarity_match(preprocessed, is_role=True) or None
+                return self._profiled('role', 'vector', self._vector_similarity_match, preprocessed, True) or None
             elif strategy == 'progressive':
                 # Try strategies in order of increasing computational cost
-                result = self._direct_match(preprocessed, self.roles)
+                result = self._profiled('role', 'direct', self._direct_match, preprocessed, self.roles)
                 if result:
                     return result
                     
-                result = self._regex_match(preprocessed, self.role_patterns)
+                result = self._profiled('role', 'regex', self._regex_match, preprocessed, self.role_patterns)
                 if result:
                     return result
                     
-                result = self._fuzzy_match(preprocessed, self.roles)
+                result = self._profiled('role', 'fuzzy', self._fuzzy_match, preprocessed, self.roles)
                 if result:
                     return result
                     
-                result = self._vector_similarity_match(preprocessed, is_role=True)
+                result = self._profiled('role', 'vector', self._vector_similarity_match, preprocessed, True)
                 if result:
                     return result
                     
@@ -371,6 +578,13 @@ class DataNormalizer:
             logger.error(f"Error matching role: {e}", exc_info=True)
             return None
     
+    def _abbreviation_match(self, input_text: str) -> Optional[str]:
+        """Level of the first common level abbreviation found in the input."""
+        for pattern, level in LEVEL_ABBREVIATIONS:
+            if pattern.search(input_text):
+                return level
+        return None
+    
     def match_level(self, input_text: str, strategy: str = 'regex') -> Optional[str]:
         """
         Match input text to a standardized level.
@@ -389,21 +603,18 @@ class DataNormalizer:
                 return None
                 
             # For levels, regex matching is usually sufficient
-            result = self._regex_match(preprocessed, self.level_patterns)
+            result = self._profiled('level', 'regex', self._regex_match, preprocessed, self.level_patterns)
             if result:
                 return result
                 
             # Check for common abbreviations
-            if re.search(r'\bprt\b', preprocessed, re.IGNORECASE):
-                return "Primary (PRT)"
-            elif re.search(r'\btgt\b', preprocessed, re.IGNORECASE):
-                return "TGT"
-            elif re.search(r'\bpgt\b', preprocessed, re.IGNORECASE):
-                return "PGT"
+            result = self._profiled('level', 'abbreviation', self._abbreviation_match, preprocessed)
+            if result:
+                return result
                 
             # Use fuzzy matching as fallback
             if strategy == 'fuzzy' or strategy == 'progressive':
-                fuzzy_result = self._fuzzy_match(preprocessed, self.levels)
+                fuzzy_result = self._profiled('level', 'fuzzy', self._fuzzy_match, preprocessed, self.levels)
                 if fuzzy_result:
                     return fuzzy_result
                     
@@ -430,28 +641,28 @@ class DataNormalizer:
                 return None
                 
             if strategy == 'direct':
-                return self._direct_match(preprocessed, self.skills) or None
+                return self._profiled('skill', 'direct', self._direct_match, preprocessed, self.skills) or None
             elif strategy == 'regex':
-                return self._regex_match(preprocessed, self.skill_patterns) or None
+                return self._profiled('skill', 'regex', self._regex_match, preprocessed, self.skill_patterns) or None
             elif strategy == 'fuzzy':
-                return self._fuzzy_match(preprocessed, self.skills) or None
+                return self._profiled('skill', 'fuzzy', self._fuzzy_match, preprocessed, self.skills) or None
             elif strategy == 'vector':
-                return self._vector_similarity_match(preprocessed) or None
+                return self._profiled('skill', 'vector', self._vector_similarity_match, preprocessed) or None
             elif strategy == 'progressive':
                 # Try strategies in order from simple to complex
-                result = self._direct_match(preprocessed, self.skills)
+                result = self._profiled('skill', 'direct', self._direct_match, preprocessed, self.skills)
                 if result:
                     return result
                     
-                result = self._regex_match(preprocessed, self.skill_patterns)
+                result = self._profiled('skill', 'regex', self._regex_match, preprocessed, self.skill_patterns)
                 if result:
                     return result
                     
-                result = self._fuzzy_match(preprocessed, self.skills)
+                result = self._profiled('skill', 'fuzzy', self._fuzzy_match, preprocessed, self.skills)
                 if result:
                     return result
                     
-                result = self._vector_similarity_match(preprocessed)
+                result = self._profiled('skill', 'vector', self._vector_similarity_match, preprocessed)
                 if result:
                     return result
                     
@@ -483,16 +694,16 @@ class DataNormalizer:
             number = str(number)
             
             # Remove all whitespace and special characters
-            new_num = re.sub(r'[\s\-\(\)\+]', '', number)
+            new_num = NUMBER_SEPARATORS_PATTERN.sub('', number)
 
         # Check if it's an Indian number (10 digits with optional 91 prefix)
-            if len(new_num) == 10 and new_num.startswith(('6', '7', '8', '9')):
+            if len(new_num) == 10 and new_num.startswith(INDIAN_MOBILE_PREFIXES):
                 # Add the country code if it's just 10 digits
                 return f"+91-{new_num}"
-            elif len(new_num) == 12 and new_num.startswith('91') and new_num[2:].startswith(('6', '7', '8', '9')):
+            elif len(new_num) == 12 and new_num.startswith('91') and new_num[2:].startswith(INDIAN_MOBILE_PREFIXES):
                 # Format with proper prefix if it has country code
                 return f"+91-{new_num[2:]}"
-            elif len(new_num) == 11 and new_num.startswith('0') and new_num[1:].startswith(('6', '7', '8', '9')):
+            elif len(new_num) == 11 and new_num.startswith('0') and new_num[1:].startswith(INDIAN_MOBILE_PREFIXES):
                 # Handle numbers starting with 0
                 return f"+91-{new_num[1:]}"
             else:
@@ -546,24 +757,8 @@ class DataNormalizer:
                     local_part = local_part.split('+', 1)[0]
                 
                 # Fix common domain typos
-                domain_fixes = {
-                    'gmial.com': 'gmail.com',
-                    'gmal.com': 'gmail.com',
-                    'gmail.co': 'gmail.com',
-                    'gmail.comm': 'gmail.com',
-                    'yahho.com': 'yahoo.com',
-                    'yaho.com': 'yahoo.com',
-                    'yahoo.comm': 'yahoo.com',
-                    'hotmial.com': 'hotmail.com',
-                    'hotnail.com': 'hotmail.com',
-                    'hotmail.comm': 'hotmail.com',
-                    'outlok.com': 'outlook.com',
-                    'outloo.com': 'outlook.com',
-                    'outlook.comm': 'outlook.com'
-                }
-                
-                if domain in domain_fixes:
-                    domain = domain_fixes[domain]
+                if domain in EMAIL_DOMAIN_FIXES:
+                    domain = EMAIL_DOMAIN_FIXES[domain]
                 
                 # Fix any domain ending with .comm
                 if domain.endswith('.comm'):
@@ -575,7 +770,170 @@ class DataNormalizer:
         except Exception as e:
             logger.error(f"Error sanitizing email: {e}", exc_info=True)
             return None
+    
+    def sanitize_numbers(self, numbers: pd.Series) -> pd.Series:
+        """
+        `sanitize_number` of every value of a column, with pandas string operations.
+        
+        Args:
+            numbers: Column of phone numbers
+            
+        Returns:
+            Column of sanitized numbers, None where the value is not an int or a string
+        """
+        result = pd.Series([None] * len(numbers), index=numbers.index, dtype=object)
+        try:
+            mask = numbers.map(lambda number: isinstance(number, (int, str))).to_numpy(dtype=bool)
+            if not mask.any():
+                return result
+            
+            text = numbers[mask].astype(str)
+            digits = text.str.replace(NUMBER_SEPARATORS_PATTERN, '', regex=True)
+            length = digits.str.len()
+            local = digits.where((length == 10) & digits.str[0].isin(INDIAN_MOBILE_PREFIXES))
+            with_code = (length == 12) & digits.str.startswith('91') & digits.str[2].isin(INDIAN_MOBILE_PREFIXES)
+            local = local.mask(with_code, digits.str[2:])
+            with_zero = (length == 11) & digits.str.startswith('0') & digits.str[1].isin(INDIAN_MOBILE_PREFIXES)
+            local = local.mask(with_zero, digits.str[1:])
+            
+            formatted = local.notna()
+            if not formatted.all():
+                # If we can't confidently format them, keep the originals
+                logger.warning(f"Failed to sanitise {(~formatted).sum()} mobile numbers")
+            result[mask] = ("+91-" + local).where(formatted, text).to_numpy()
+        except Exception as e:
+            logger.error(f"Error sanitizing numbers: {e}", exc_info=True)
+        return result
+    
+    def sanitize_emails(self, emails: pd.Series) -> pd.Series:
+        """
+        `sanitize_email` of every value of a column, with pandas string operations.
+        
+        Args:
+            emails: Column of email addresses
+            
+        Returns:
+            Column of sanitized emails, None where the value is not a string
+        """
+        result = pd.Series([None] * len(emails), index=emails.index, dtype=object)
+        try:
+            is_text = emails.map(lambda email: isinstance(email, str)).to_numpy(dtype=bool)
+            if not is_text.any():
+                return result
             
+            # Invalid emails are kept as they are
+            text = emails[is_text]
+            valid = valid_email_mask(text).to_numpy()
+            if not valid.all():
+                logger.warning(f"Invalid email format: {(~valid).sum()} emails")
+            sanitized = text.to_numpy(dtype=object, copy=True)
+            
+            if valid.any():
+                # Basic sanitization
+                parts = text[valid].str.strip().str.lower().str.split('@', n=1, expand=True)
+                local_part, domain = parts[0], parts[1]
+                
+                # Gmail ignores dots in the local part, then drop plus addressing
+                local_part = local_part.where(domain != 'gmail.com', local_part.str.replace('.', '', regex=False))
+                local_part = local_part.str.split('+', n=1).str[0]
+                
+                # Fix common domain typos, and any domain ending with .comm
+                domain = domain.replace(EMAIL_DOMAIN_FIXES)
+                domain = domain.where(~domain.str.endswith('.comm'), domain.str[:-1])
+                
+                sanitized[valid] = (local_part + '@' + domain).to_numpy()
+            result[is_text] = sanitized
+        except Exception as e:
+            logger.error(f"Error sanitizing emails: {e}", exc_info=True)
+        return result
+    
+    def normalize_skill(self, skill: str, strategy: str = 'progressive') -> Dict[str, Optional[str]]:
+        """
+        Extract the skill, role and level of a skill or designation text.
+        
+        Args:
+            skill: Skill or designation text
+            strategy: Matching strategy to use
+            
+        Returns:
+            Dictionary with normalized skill, role, and level values
+        """
+        if not skill or pd.isna(skill) or skill.strip() == "":
+            return {"skill": None, "role": None, "level": None}
+        
+        # First attempt to match level since it's often part of the title
+        level = self.match_level(skill, strategy)
+        
+        # Match the role
+        role = self.match_role(skill, strategy)
+        
+        # Match the skill
+        sanitized_skill = self.match_skill(skill, strategy)
+        
+        return {"skill": sanitized_skill, "role": role, "level": level}
+    
+    def _match_many(self, 
+                    texts: List[str], 
+                    target_list: List[str], 
+                    pattern_dict: Dict[str, str], 
+                    is_role: bool, 
+                    strategy: str) -> List[Optional[str]]:
+        """
+        `match_role` / `match_skill` over preprocessed texts, running each
+        strategy stage over all the texts it still has to resolve at once.
+        """
+        results: List[Optional[str]] = [None] * len(texts)
+        stages = {
+            'direct': lambda batch: [self._direct_match(text, target_list) for text in batch],
+            'regex': lambda batch: [self._regex_match(text, pattern_dict) for text in batch],
+            'fuzzy': lambda batch: self.fuzzy_match_many(batch, target_list),
+            'vector': lambda batch: self.vector_similarity_match_many(batch, is_role=is_role),
+        }
+        if strategy == 'progressive':
+            order = list(stages)
+        elif strategy in stages:
+            order = [strategy]
+        else:
+            logger.error(f"Unknown strategy: {strategy}")
+            return results
+        
+        for stage in order:
+            pending = [i for i, text in enumerate(texts) if text and results[i] is None]
+            if not pending:
+                break
+            start = time.perf_counter()
+            matches = stages[stage]([texts[i] for i in pending])
+            for position, match in zip(pending, matches):
+                results[position] = match or None
+            if self.profiler is not None:
+                hits = sum(results[i] is not None for i in pending)
+                field = 'role' if is_role else 'skill'
+                self.profiler.record(field, stage, hits, len(pending) - hits, time.perf_counter() - start)
+        return results
+    
+    def normalize_skills(self, skills: List[str], strategy: str = 'progressive') -> List[Dict[str, Optional[str]]]:
+        """
+        Normalize a batch of skill texts, with the same results as
+        `normalize_skill` on each. Roles and skills are matched stage by
+        stage over the whole batch, so the fuzzy and vector stages score all
+        the unresolved texts in one call. Runs in one task of a process pool,
+        so the normalizer is sent to the worker once per batch rather than
+        once per value.
+        """
+        try:
+            present = [bool(skill) and not pd.isna(skill) and skill.strip() != "" for skill in skills]
+            levels = [self.match_level(skill, strategy) if keep else None for skill, keep in zip(skills, present)]
+            texts = [self._preprocess_text(skill) if keep else "" for skill, keep in zip(skills, present)]
+            roles = self._match_many(texts, self.roles, self.role_patterns, True, strategy)
+            matched_skills = self._match_many(texts, self.skills, self.skill_patterns, False, strategy)
+            return [
+                {"skill": skill, "role": role, "level": level}
+                for skill, role, level in zip(matched_skills, roles, levels)
+            ]
+        except Exception as e:
+            logger.error(f"Error normalizing skills: {e}", exc_info=True)
+            return [{"skill": None, "role": None, "level": None} for _ in skills]
+    
     def normalize_row(self, row: Union[Dict, pd.Series], strategy: str = 'progressive') -> Dict[str, str]:
         """
         Process a single row to extract role, level, and skill.
@@ -624,21 +982,10 @@ class DataNormalizer:
                     "email": sanitized_email
                 }
             
-            # First attempt to match level since it's often part of the title
-            level = self.match_level(skill, strategy)
-            
-            # Match the role
-            role = self.match_role(skill, strategy)
-            
-            # Match the skill
-            sanitized_skill = self.match_skill(skill, strategy)
-            
             new_city = self.match_city(city, state)
 
             return {
-                "skill": sanitized_skill,
-                "role": role,
-                "level": level,
+                **self.normalize_skill(skill, strategy),
                 "city": new_city,
                 "mobile": sanitized_mobile,
                 "whatsapp": sanitized_whatsapp,
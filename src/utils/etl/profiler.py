@@ -0,0 +1,105 @@
+"""
+Profiling of the DataNormalizer matching stages.
+
+For every field (role, skill, level, city) and strategy stage (direct,
+regex, abbreviation, fuzzy, vector), a MatchProfiler counts the values the
+stage resolved (hits) and those it passed on (misses), and keeps a
+histogram of the time spent per value. Profilers of process-pool workers
+are merged into the parent's with `merge`.
+"""
+
+import bisect
+from typing import Any, Dict, List, Optional
+
+# Upper bounds (microseconds per value) of the latency histogram buckets, the last one is open-ended
+LATENCY_BUCKETS_US = (1, 10, 100, 1_000, 10_000, 100_000)
+
+
+def bucket_labels() -> List[str]:
+    bounds = [0, *LATENCY_BUCKETS_US]
+    labels = [f"{low}-{high}us" for low, high in zip(bounds, bounds[1:])]
+    return labels + [f">{LATENCY_BUCKETS_US[-1]}us"]
+
+
+class StageStats:
+    """Hits, misses and latency histogram of one stage of one field."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.seconds = 0.0
+        self.histogram = [0] * (len(LATENCY_BUCKETS_US) + 1)
+
+    def record(self, hits: int, misses: int, seconds: float):
+        values = hits + misses
+        if not values:
+            return
+        self.hits += hits
+        self.misses += misses
+        self.seconds += seconds
+        # Stages scoring a batch at once only know their time per value on average
+        self.histogram[bisect.bisect_left(LATENCY_BUCKETS_US, seconds / values * 1e6)] += values
+
+    def merge(self, other: "StageStats"):
+        self.hits += other.hits
+        self.misses += other.misses
+        self.seconds += other.seconds
+        self.histogram = [a + b for a, b in zip(self.histogram, other.histogram)]
+
+    def summary(self) -> Dict[str, Any]:
+        values = self.hits + self.misses
+        return {
+            "values": values,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / values * 100 if values else 0.0,
+            "seconds": round(self.seconds, 4),
+            "us_per_value": round(self.seconds / values * 1e6, 2) if values else 0.0,
+            "latency_histogram": dict(zip(bucket_labels(), self.histogram)),
+        }
+
+
+class MatchProfiler:
+    """
+    Stage statistics by field and stage, in the order the stages first ran.
+
+    Usage:
+        profiler = MatchProfiler()
+        profiler.record("skill", "fuzzy", hits=12, misses=3, seconds=0.004)
+        profiler.merge(worker_profiler)
+        profiler.summary()
+    """
+
+    def __init__(self):
+        self.stats: Dict[str, Dict[str, StageStats]] = {}
+
+    def record(self, field: str, stage: str, hits: int, misses: int, seconds: float):
+        """
+        Record a stage run over `hits + misses` values.
+
+        Args:
+            field: Field matched, e.g. 'skill'
+            stage: Strategy stage, e.g. 'fuzzy'
+            hits: Values the stage resolved
+            misses: Values the stage left unresolved
+            seconds: Time the stage took over all the values
+        """
+        self.stats.setdefault(field, {}).setdefault(stage, StageStats()).record(hits, misses, seconds)
+
+    def merge(self, other: Optional["MatchProfiler"]) -> "MatchProfiler":
+        """Add the statistics of another profiler, e.g. of a process-pool worker, to this one."""
+        if other is not None:
+            for field, stages in other.stats.items():
+                for stage, stats in stages.items():
+                    self.stats.setdefault(field, {}).setdefault(stage, StageStats()).merge(stats)
+        return self
+
+    def reset(self):
+        self.stats = {}
+
+    def summary(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Statistics by field and stage, see `StageStats.summary`."""
+        return {
+            field: {stage: stats.summary() for stage, stats in stages.items()}
+            for field, stages in self.stats.items()
+        }
@@ -83,7 +83,8 @@ def run_full_processing(
     file_path: str, 
     output_path: Optional[str] = None, 
     strategy: str = 'progressive', 
-    num_workers: Optional[int] = None
+    num_workers: Optional[int] = None,
+    profile: bool = False
 ) -> Tuple[Optional[pd.DataFrame], Optional[Dict[str, Any]]]:
     """
     Run the full preprocessing pipeline on all data and generate a report.
@@ -93,6 +94,7 @@ def run_full_processing(
         output_path: Path to save the processed data (optional)
         strategy: Matching strategy to use
         num_workers: Number of parallel workers (None = auto)
+        profile: Whether to add the statistics of every matching stage to the report
         
     Returns:
         Tuple of (processed_dataframe, report)
@@ -119,7 +121,7 @@ def run_full_processing(
         prepared_df = prepare_dataframe(df)
 
         # Initialize normalizer
-        normalizer = DataNormalizer()
+        normalizer = DataNormalizer(profile=profile)
 
         result = process_dataframe(
             prepared_df, 
@@ -129,7 +131,7 @@ def run_full_processing(
         )
         
         # Generate report
-        report = generate_matching_report(result)
+        report = generate_matching_report(result, normalizer.profiler)
         
         # Save results if output path is provided (Load phase)
         if output_path and result is not None:
@@ -229,7 +231,8 @@ def process_candidate_skills(
     sample_size: int = 100, 
     strategy: str = 'progressive', 
     output_path: Optional[str] = None, 
-    num_workers: Optional[int] = None
+    num_workers: Optional[int] = None,
+    profile: bool = False
 ) -> Union[pd.DataFrame, None, pd.DataFrame]:
     """
     Main function to orchestrate data preprocessing pipeline.
@@ -241,6 +244,7 @@ def process_candidate_skills(
         strategy: Matching strategy to use
         output_path: Path to save output Excel file (only used in 'full' mode)
         num_workers: Number of parallel workers (None = auto)
+        profile: Whether to report the statistics of every matching stage (only used in 'full' mode)
     
     Returns:
         DataFrame with results, or comparison report if mode='compare'
@@ -249,7 +253,7 @@ def process_candidate_skills(
         if mode == 'test':
             return test_sample(input_path, sample_size, strategy)
         elif mode == 'full':
-            result, report = run_full_processing(input_path, output_path, strategy, num_workers)
+            result, report = run_full_processing(input_path, output_path, strategy, num_workers, profile)
             if report:
                 logger.info("\nMatching Report:")
                 logger.info(f"Total records processed: {report['summary']['total_records']}")
@@ -279,6 +283,7 @@ if __name__ == "__main__":
                            choices=['direct', 'regex', 'fuzzy', 'vector', 'progressive'],
                            help='Matching strategy to use')
         parser.add_argument('--num_workers', type=int, help='Number of parallel workers')
+        parser.add_argument('--profile', action='store_true', help='Report hits, misses and latency of every matching stage')
         
         # Parse arguments
         args = parser.parse_args()
@@ -291,7 +296,8 @@ if __name__ == "__main__":
             sample_size=args.sample_size,
             strategy=args.strategy,
             output_path=args.output_path,
-            num_workers=args.num_workers
+            num_workers=args.num_workers,
+            profile=args.profile
         )
         
         # Print report or results summary
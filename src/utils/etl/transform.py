@@ -5,29 +5,89 @@ This module contains functions for processing and transforming data, including
 parallel processing of data and standardizing column names and values.
 """
 
+import os
 import time
 import logging
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from functools import partial
 from concurrent.futures import ProcessPoolExecutor
 
 import pandas as pd
 
-from .normalizer import DataNormalizer, is_valid_mobile, is_valid_email
+from .normalizer import DataNormalizer, valid_mobile_mask, valid_email_mask
+from .profiler import MatchProfiler
 
 # Configure logger
 logger = logging.getLogger(__name__)
 
 
+# Distinct skills below which normalizing them in the main process beats starting a process pool
+PARALLEL_MIN_VALUES = 2000
+# Skill batches per worker, so that slow batches don't hold up the pool
+BATCHES_PER_WORKER = 4
+
+
+def _text_column(df: pd.DataFrame, column: str) -> pd.Series:
+    """Column as `normalize_row` reads it: `str` of every value, empty when the column is missing."""
+    if column not in df.columns:
+        return pd.Series("", index=df.index, dtype=object)
+    return df[column].map(str)
+
+
+def _normalize_skill_batch(normalizer: DataNormalizer, 
+                           skills: List[str], 
+                           strategy: str) -> Tuple[List[Dict[str, Optional[str]]], Optional[MatchProfiler]]:
+    """
+    Process-pool task normalizing a batch of skills. Returns the worker's
+    profiler with the results, started empty so only this batch is counted.
+    """
+    if normalizer.profiler is not None:
+        normalizer.profiler = MatchProfiler()
+    return normalizer.normalize_skills(skills, strategy), normalizer.profiler
+
+
+def _normalize_unique_skills(skills: List[str], 
+                             normalizer: DataNormalizer, 
+                             strategy: str, 
+                             num_workers: Optional[int]) -> List[Dict[str, Optional[str]]]:
+    """
+    Normalize distinct skill texts, in a process pool when there are enough of them.
+    """
+    if len(skills) < PARALLEL_MIN_VALUES or num_workers == 1:
+        return normalizer.normalize_skills(skills, strategy)
+    
+    workers = num_workers or os.cpu_count() or 1
+    batch_size = max(1, -(-len(skills) // (workers * BATCHES_PER_WORKER)))
+    batches = [skills[i:i + batch_size] for i in range(0, len(skills), batch_size)]
+    results = []
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        futures = [executor.submit(_normalize_skill_batch, normalizer, batch, strategy) for batch in batches]
+        for batch, future in zip(batches, futures):
+            try:
+                batch_results, profiler = future.result()
+                results.extend(batch_results)
+                if normalizer.profiler is not None:
+                    normalizer.profiler.merge(profiler)
+            except Exception as e:
+                logger.error(f"Error normalizing skills in parallel execution: {e}", exc_info=True)
+                results.extend({"skill": None, "role": None, "level": None} for _ in batch)
+    return results
+
+
 def process_dataframe(df: pd.DataFrame, 
                      normalizer: DataNormalizer, 
                      primary_skill_column: str = 'old_skills',
                      strategy: str = 'progressive', 
                      num_workers: int = 4) -> Optional[pd.DataFrame]:
     """
-    Process entire dataframe with parallel execution.
+    Process entire dataframe, normalizing every distinct value once.
     This is the main Transform phase of ETL.
     
+    Skills and (city, state) pairs repeat a lot across rows, so each distinct
+    value is normalized once and the results are mapped back to the rows by
+    their factorized codes. The results are the same as `normalize_row` on
+    every row, and the runtime follows the number of distinct values.
+    
     Args:
         df: DataFrame to process
         normalizer: DataNormalizer instance
@@ -43,38 +103,42 @@ def process_dataframe(df: pd.DataFrame,
             logger.warning("Cannot process empty DataFrame")
             return None  
         start_time = time.time()
+        df = df.reset_index(drop=True)
         
-        results = []
+        # Skill, role and level, from the distinct skill texts
+        skill_codes, unique_skills = pd.factorize(_text_column(df, "skill"))
+        skill_results = _normalize_unique_skills(list(unique_skills), normalizer, strategy, num_workers)
+        skill_df = pd.DataFrame(skill_results, columns=["skill", "role", "level"]).take(skill_codes).reset_index(drop=True)
         
-        # Use ProcessPoolExecutor for parallel processing
-        with ProcessPoolExecutor(max_workers=num_workers) as executor:
-            # Submit all rows for processing
-            futures = [executor.submit(normalizer.normalize_row, row, strategy) for _, row in df.iterrows()]
-            
-            # Collect results as they complete
-            for future in futures:
-                try:
-                    results.append(future.result())
-                except Exception as e:
-                    logger.error(f"Error processing row in parallel execution: {e}", exc_info=True)
-                    results.append({
-                        "skill": None, 
-                        "role": None, 
-                        "level": None, 
-                        "city": None, 
-                        "mobile": None,
-                        "whatsapp": None, 
-                        "email": None
-                    })
+        # City, from the distinct (city, state) pairs
+        cities, states = _text_column(df, "old_city"), _text_column(df, "state")
+        city_codes, unique_pairs = pd.MultiIndex.from_arrays([cities, states]).factorize()
+        unique_cities = normalizer.match_cities(
+            list(unique_pairs.get_level_values(0)), 
+            list(unique_pairs.get_level_values(1)),
+        )
+        city_df = pd.DataFrame({"city": unique_cities}).take(city_codes).reset_index(drop=True)
+        
+        # Contact details are mostly distinct, so they are sanitized a column at a time instead, and
+        # assigned as lists to get the same dtypes as the other result columns
+        def sanitize(column, fn):
+            if column not in df.columns:
+                return [None] * len(df)
+            return fn(df[column]).tolist()
         
-        # Convert results to DataFrame
-        result_df = pd.DataFrame(results)
+        result_df = pd.concat([skill_df, city_df], axis=1)
+        result_df["mobile"] = sanitize("old_mobile", normalizer.sanitize_numbers)
+        result_df["whatsapp"] = sanitize("old_whatsapp", normalizer.sanitize_numbers)
+        result_df["email"] = sanitize("old_email", normalizer.sanitize_emails)
         
         # Add results back to original dataframe
-        df_result = pd.concat([df.reset_index(drop=True), result_df], axis=1)
+        df_result = pd.concat([df, result_df], axis=1)
         
         end_time = time.time()
-        logger.info(f"Processing completed in {end_time - start_time:.2f} seconds")
+        logger.info(
+            f"Processing completed in {end_time - start_time:.2f} seconds "
+            f"({len(df)} rows, {len(unique_skills)} distinct skills, {len(unique_pairs)} distinct cities)"
+        )
         logger.debug(f"Resulting dataframe columns: {df_result.columns}")
         # Apply status labeling
         return apply_status_labels(df_result)
@@ -83,12 +147,14 @@ def process_dataframe(df: pd.DataFrame,
         return None
 
 
-def generate_matching_report(df: pd.DataFrame) -> Optional[Dict[str, Any]]:
+def generate_matching_report(df: pd.DataFrame, profiler: Optional[MatchProfiler] = None) -> Optional[Dict[str, Any]]:
     """
     Generate a report on the matching results.
     
     Args:
         df: Processed DataFrame
+        profiler: Profiler of the normalizer that processed it, to add the
+            hits, misses and latency of every matching stage to the report
         
     Returns:
         Dictionary with report data or None if an error occurs
@@ -121,6 +187,8 @@ def generate_matching_report(df: pd.DataFrame) -> Optional[Dict[str, Any]]:
             'top_levels': level_counts.head(5).to_dict(),
             'top_skills': skill_counts.head(10).to_dict(),
         }
+        if profiler is not None:
+            report['stages'] = profiler.summary()
         
         logger.info(f"Report generated: {total_rows} records processed")
         return report
@@ -152,8 +220,8 @@ def apply_status_labels(df: pd.DataFrame, invert: bool = False) -> pd.DataFrame:
         # Apply validation filters
         if 'skill' in result_df.columns and 'mobile' in result_df.columns and 'email' in result_df.columns:
             skill_filter = result_df['skill'] != None
-            number_filter = result_df["mobile"].apply(is_valid_mobile)
-            email_filter = result_df["email"].apply(is_valid_email)
+            number_filter = valid_mobile_mask(result_df["mobile"])
+            email_filter = valid_email_mask(result_df["email"])
             city_filter = result_df["city"] != None
 
             logger.debug(f"City Filter: {city_filter.shape}, {city_filter.head()}")
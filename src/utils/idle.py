@@ -0,0 +1,186 @@
+"""
+IMAP IDLE listener.
+
+Keeps a connection idling on the mailbox folder; as soon as the server
+reports a change, the listener leaves IDLE, fetches the previews of the UIDs
+above the sync watermark and hands the emails to the ingestion pipeline.
+The UIDs stay pending in the sync store until the pipeline has processed
+them, and the first catch-up also fetches the pending and failed UIDs left
+by earlier runs.
+Connection failures are retried with exponential backoff, and every
+(re)connection starts by catching up on whatever arrived meanwhile.
+
+imaplib only supports IDLE from Python 3.14, so the command is issued on
+the raw connection.
+
+Usage:
+    python -m src.utils.idle --folder INBOX
+"""
+
+import time
+import select
+import socket
+import asyncio
+import hashlib
+import imaplib
+import logging
+import argparse
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from src.utils.emailer import DEFAULT_CREDENTIALS, Email
+from src.utils.imap_sync import IMAPSync, SyncStore
+
+logger = logging.getLogger(__name__)
+
+# Servers drop IDLE after 30 minutes (RFC 2177), so it is renewed before that
+IDLE_TIMEOUT = 29 * 60
+# Seconds between two checks of the stop event while idling
+POLL_INTERVAL = 1.0
+
+
+class IdleListener:
+    """
+    Yields the emails arriving in a folder, using IMAP IDLE.
+    """
+
+    def __init__(
+        self,
+        credentials: Dict[str, str] = DEFAULT_CREDENTIALS,
+        folder: str = "INBOX",
+        store: Optional[SyncStore] = None,
+        since: Optional[str] = None,
+        temp_dir: Optional[Path] = None,
+        idle_timeout: float = IDLE_TIMEOUT,
+        backoff_initial: float = 1.0,
+        backoff_max: float = 300.0,
+    ):
+        """
+        Args:
+            credentials: Dict with `host`, `username` and `password` keys
+            folder: Mailbox folder to listen on
+            store: Watermark store, defaults to `SyncStore()`; other stores over the same file (the scheduled syncs) see its updates
+            since: Date ('DD-Mon-YYYY') limiting the catch-up of a folder never synced before
+            temp_dir: Directory attachments are saved to
+            idle_timeout: Seconds after which IDLE is renewed
+            backoff_initial: Seconds before the first reconnection attempt
+            backoff_max: Maximum seconds between reconnection attempts
+        """
+        self.sync = IMAPSync(credentials, folder=folder, store=store)
+        self.since = since
+        self.temp_dir = temp_dir or Path("data/tmp/sync")
+        self.idle_timeout = idle_timeout
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.stop_event = threading.Event()
+        self._tag = 0
+        self._retried = False
+
+    def stop(self):
+        self.stop_event.set()
+
+    def emails(self) -> Iterator[Email]:
+        """
+        Blocking iterator of the previews of new emails, until `stop` is called.
+        Suitable as the source of `IngestionPipeline.run` with `track=True`,
+        which resolves the UIDs this leaves pending.
+        """
+        self.temp_dir.mkdir(parents=True, exist_ok=True)
+        backoff = self.backoff_initial
+        while not self.stop_event.is_set():
+            mail = None
+            try:
+                mail = self.sync.connect()
+                self.sync.select(mail)
+                logger.info(f"Listening for new emails on {self.sync.key}")
+                backoff = self.backoff_initial
+                while not self.stop_event.is_set():
+                    yield from self._catch_up(mail)
+                    self._idle(mail)
+            except (imaplib.IMAP4.error, OSError) as e:
+                if self.stop_event.is_set():
+                    break
+                logger.warning(f"IMAP connection to {self.sync.key} lost ({e}), reconnecting in {backoff:.0f} s")
+                self.stop_event.wait(backoff)
+                backoff = min(backoff * 2, self.backoff_max)
+            finally:
+                if mail is not None:
+                    try:
+                        mail.logout()
+                    except Exception as e:
+                        logger.debug(f"Error logging out of {self.sync.key}: {e}")
+
+    def _catch_up(self, mail: imaplib.IMAP4) -> Iterator[Email]:
+        uids = self.sync.new_uids(mail, self.since, retry=not self._retried)
+        self._retried = True
+        if not uids:
+            return
+        logger.info(f"{len(uids)} new emails in {self.sync.key}")
+        # Pending until the pipeline is done with them, so later catch-ups don't fetch them again
+        self.sync.commit(uids[-1], pending=uids)
+        for uid, preview in self.sync.fetch_previews(mail, uids):
+            email_hash = hashlib.md5(f"{self.sync.uidvalidity}_{uid}".encode()).hexdigest()
+            yield Email.from_preview(uid, email_hash, preview, self.temp_dir)
+
+    def _idle(self, mail: imaplib.IMAP4):
+        """
+        Idle until the server sends anything, `idle_timeout` passes or the
+        listener is stopped, then end IDLE so the connection can be used again.
+        """
+        self._tag += 1
+        tag = f"IDLE{self._tag}".encode()
+        mail.send(tag + b" IDLE\r\n")
+        line = mail.readline()
+        if not line.startswith(b"+"):
+            raise imaplib.IMAP4.error(f"IDLE rejected: {line!r}")
+
+        deadline = time.monotonic() + self.idle_timeout
+        while not self.stop_event.is_set() and time.monotonic() < deadline:
+            # Data already decrypted by the SSL layer doesn't make the socket readable
+            pending = getattr(mail.sock, "pending", lambda: 0)()
+            if pending or select.select([mail.sock], [], [], POLL_INTERVAL)[0]:
+                line = mail.readline()
+                if not line:
+                    raise socket.error("Connection closed by the server while idling")
+                # Any update ends IDLE; lines still buffered are drained below
+                logger.debug(f"IDLE update on {self.sync.key}: {line!r}")
+                break
+
+        mail.send(b"DONE\r\n")
+        while True:
+            line = mail.readline()
+            if not line:
+                raise socket.error("Connection closed by the server while ending IDLE")
+            if line.startswith(tag):
+                if not line[len(tag):].strip().upper().startswith(b"OK"):
+                    raise imaplib.IMAP4.error(f"IDLE failed: {line!r}")
+                return
+
+
+async def listen(folder: str = "INBOX", since: Optional[str] = None):
+    """Feed the emails arriving in `folder` into the ingestion pipeline until interrupted."""
+    from src.search import IndexWriter
+    from src.utils.pipeline import IngestionPipeline
+
+    # The listener runs next to the API, which serves the index and picks up the journaled candidates
+    pipeline = IngestionPipeline(folder=folder, since=since, index=IndexWriter())
+    # The pipeline resolves the UIDs the listener leaves pending, in the same store
+    listener = IdleListener(folder=folder, since=since, store=pipeline.store)
+    try:
+        await pipeline.run(source=listener.emails, track=True)
+    finally:
+        listener.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Ingest resumes as soon as candidate emails arrive")
+    parser.add_argument("--folder", type=str, default="INBOX", help="Mailbox folder to listen on")
+    parser.add_argument("--since", type=str, help="Date ('DD-Mon-YYYY') limiting the catch-up of a folder never synced before")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(listen(args.folder, args.since))
+    except KeyboardInterrupt:
+        logger.info("Stopped listening")
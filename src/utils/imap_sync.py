@@ -0,0 +1,850 @@
+"""
+Incremental IMAP synchronisation.
+
+Instead of searching a mailbox by date and downloading every message on
+every run, the sync engine remembers, per folder, the mailbox UIDVALIDITY
+and the last UID it has handed out. Each run only asks the server for UIDs
+above that watermark and downloads them in chunks of many UIDs per `UID FETCH`
+command, so a rerun costs one SEARCH when nothing new has arrived.
+
+In preview mode only the headers, the BODYSTRUCTURE and the first bytes of
+the text part are downloaded; attachment parts are fetched later by section,
+and only for the emails that need them.
+"""
+
+import os
+import re
+import json
+import fcntl
+import quopri
+import base64
+import logging
+import imaplib
+import queue
+import threading
+import urllib.parse
+from collections import defaultdict
+from contextlib import contextmanager
+from itertools import takewhile
+from email.header import decode_header, make_header
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_PATH = "data/imap_state.json"
+MAX_CONNECTIONS = int(os.getenv("IMAP_MAX_CONNECTIONS", 4))
+# Plain IMAP on another port is useful against a local test server
+IMAP_PORT = int(os.getenv("IMAP_PORT", 993))
+IMAP_SSL = os.getenv("IMAP_SSL", "true").lower() == "true"
+
+# Syncs after which a UID that keeps failing to be processed is given up on
+MAX_ATTEMPTS = 3
+
+UID_PATTERN = re.compile(rb"UID (\d+)")
+UIDVALIDITY_PATTERN = re.compile(rb"UIDVALIDITY (\d+)")
+
+# Header, structure and size of a message, without any body part
+PREVIEW_ITEMS = "(UID RFC822.SIZE BODYSTRUCTURE BODY.PEEK[HEADER])"
+
+# Bytes of the text part downloaded for classification
+PREVIEW_TEXT_BYTES = 2048
+
+TOKEN_PATTERN = re.compile(rb'\s*(?:(\()|(\))|"((?:[^"\\]|\\.)*)"|\{(\d+)\}$|([^\s()"]+))')
+_OPEN, _CLOSE, _LITERAL = object(), object(), object()
+
+
+def connect(credentials: Dict[str, str], port: int = IMAP_PORT, use_ssl: bool = IMAP_SSL) -> imaplib.IMAP4:
+    """
+    Open an authenticated IMAP connection.
+
+    Args:
+        credentials: Dict with `host`, `username` and `password` keys
+        port: Server port
+        use_ssl: Whether to use IMAP over SSL; disable for a local test server
+
+    Returns:
+        Logged in IMAP connection
+    """
+    if not all(key in credentials for key in ("host", "username", "password")):
+        raise ValueError("Credentials must contain 'host', 'username', and 'password' keys.")
+    mail = imaplib.IMAP4_SSL(credentials["host"], port) if use_ssl else imaplib.IMAP4(credentials["host"], port)
+    mail.login(credentials["username"], credentials["password"])
+    return mail
+
+
+class SyncStore:
+    """
+    JSON file holding the UIDVALIDITY and last seen UID of every synced folder.
+
+    Consumers that process emails after fetching them (the ingestion pipeline)
+    also keep the UIDs they fetched but haven't finished with (`pending`) and
+    those they failed on with their number of attempts (`failed`), so that
+    later syncs fetch them again. UIDs that fail `MAX_ATTEMPTS` times are moved
+    to `given_up` and no longer fetched.
+
+    Several processes (the scheduler, the IDLE listener, one-off scripts) may
+    sync the same folder with their own store over the same file, so every
+    read and update goes to the file, under an exclusive lock on a sibling
+    `.lock` file, and updates merge with what is there: the watermark only
+    moves forward and pending UIDs are added to those already recorded.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path or os.getenv("IMAP_STATE_PATH", DEFAULT_STATE_PATH))
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(credentials: Dict[str, str], folder: str) -> str:
+        return f"{credentials['username']}@{credentials['host']}/{folder}"
+
+    @contextmanager
+    def _locked(self) -> Iterator[Dict[str, Dict[str, Any]]]:
+        """
+        Hold the store lock of this process and of the file, yielding the
+        state read from the file; it is written back on exit.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock, open(self.path.with_suffix(".lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            state = self._read()
+            snapshot = json.dumps(state, sort_keys=True)
+            yield state
+            if json.dumps(state, sort_keys=True) != snapshot:
+                self._write(state)
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        if not self.path.exists():
+            return {}
+        with open(self.path) as f:
+            return json.load(f)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._locked() as state:
+            return dict(state[key]) if key in state else None
+
+    def set(self, key: str, uidvalidity: int, last_uid: int, pending: Iterable[int] = ()):
+        """
+        Advance the watermark of a folder to `last_uid`, unless another
+        process has taken it further, adding `pending` to its pending UIDs.
+        A new UIDVALIDITY drops the previous watermark and the pending,
+        failed and given up UIDs.
+        """
+        with self._locked() as state:
+            folder = state.get(key, {})
+            if folder.get("uidvalidity") != uidvalidity:
+                folder = {}
+            state[key] = {
+                "uidvalidity": uidvalidity,
+                "last_uid": max(last_uid, folder.get("last_uid", 0)),
+                "pending": sorted(set(folder.get("pending", [])).union(pending)),
+                "failed": folder.get("failed", {}),
+                "given_up": folder.get("given_up", []),
+            }
+
+    def resolve(self, key: str, done: Iterable[int] = (), failed: Iterable[int] = ()):
+        """
+        Settle pending UIDs of a folder: `done` ones are dropped, `failed` ones
+        have their number of attempts incremented, and are given up on once
+        they reach `MAX_ATTEMPTS`.
+        """
+        with self._locked() as state:
+            folder = state.get(key)
+            if folder is None:
+                return
+            done, failed = set(done), set(failed)
+            attempts = {int(uid): count for uid, count in folder.get("failed", {}).items() if int(uid) not in done}
+            for uid in failed:
+                attempts[uid] = attempts.get(uid, 0) + 1
+            given_up = sorted(uid for uid, count in attempts.items() if count >= MAX_ATTEMPTS)
+            if given_up:
+                logger.warning(f"Gave up on UIDs {', '.join(map(str, given_up))} of {key} after {MAX_ATTEMPTS} attempts")
+            folder["pending"] = sorted(set(folder.get("pending", [])) - done - failed)
+            folder["failed"] = {str(uid): count for uid, count in sorted(attempts.items()) if count < MAX_ATTEMPTS}
+            folder["given_up"] = sorted(set(folder.get("given_up", [])).union(given_up) - done)
+
+    def _write(self, state: Dict[str, Dict[str, Any]]):
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def parse_fetch_response(data: list) -> Iterator[Tuple[int, bytes]]:
+    """
+    Pair every message in a `UID FETCH` response with its UID.
+
+    Args:
+        data: Response data of `IMAP4.uid("FETCH", ...)`
+
+    Yields:
+        (uid, payload) tuples, payload being the first literal of the message
+    """
+    for item in data:
+        if isinstance(item, tuple):
+            match = UID_PATTERN.search(item[0])
+            if match:
+                yield int(match.group(1)), item[1]
+
+
+def _tokenize(text: bytes) -> Iterator[Any]:
+    for match in TOKEN_PATTERN.finditer(text):
+        if match.group(1):
+            yield _OPEN
+        elif match.group(2):
+            yield _CLOSE
+        elif match.group(3) is not None:
+            yield re.sub(rb"\\(.)", rb"\1", match.group(3)).decode("utf-8", errors="replace")
+        elif match.group(4):
+            yield _LITERAL
+        elif match.group(5):
+            atom = match.group(5).decode("utf-8", errors="replace")
+            yield None if atom.upper() == "NIL" else atom
+
+
+def parse_fetch_items(data: list) -> Iterator[Dict[str, Any]]:
+    """
+    Parse a `UID FETCH` response into one dict of data items per message.
+
+    Unlike `parse_fetch_response` this handles several data items per
+    message, nested lists such as BODYSTRUCTURE, and literals anywhere in
+    the response.
+
+    Args:
+        data: Response data of `IMAP4.uid("FETCH", ...)`
+
+    Yields:
+        Dicts mapping upper-cased item names (e.g. `UID`, `BODY[HEADER]`,
+        `BODY[1]<0>`) to their values; literals are returned as bytes
+    """
+    stack: List[list] = []
+    for item in data:
+        if item is None:
+            continue
+        text, literal = item if isinstance(item, tuple) else (item, None)
+        for token in _tokenize(text):
+            if token is _OPEN:
+                stack.append([])
+            elif token is _CLOSE:
+                value = stack.pop()
+                if stack:
+                    stack[-1].append(value)
+                else:
+                    yield {str(key).upper(): value for key, value in zip(value[::2], value[1::2])}
+            elif stack:
+                # Tokens outside a list are the message sequence numbers
+                stack[-1].append(literal if token is _LITERAL else token)
+
+
+def _params(values: Optional[list]) -> Dict[str, str]:
+    if not isinstance(values, list):
+        return {}
+    return {
+        str(key).lower(): value.decode("utf-8", errors="replace") if isinstance(value, bytes) else value
+        for key, value in zip(values[::2], values[1::2])
+    }
+
+
+def _param(params: Dict[str, str], name: str) -> Optional[str]:
+    """Value of a MIME parameter, decoding RFC 2231 and RFC 2047 encodings."""
+    continuations = sorted(
+        (key for key in params if key == f"{name}*" or re.fullmatch(rf"{name}\*\d+\*?", key)),
+        key=lambda key: int(re.sub(r"\D", "", key) or 0),
+    )
+    if continuations:
+        value = "".join(params[key] for key in continuations)
+        if continuations[0].endswith("*"):
+            charset, _, rest = value.partition("'")
+            value = urllib.parse.unquote(rest.partition("'")[2], encoding=charset or "utf-8", errors="replace")
+        return value
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        return str(make_header(decode_header(value)))
+    except Exception:
+        return value
+
+
+def parse_bodystructure(body: list, section: str = "") -> List[Dict[str, Any]]:
+    """
+    Flatten a parsed BODYSTRUCTURE into its leaf parts.
+
+    Args:
+        body: BODYSTRUCTURE value as returned by `parse_fetch_items`
+        section: Section number of `body`, empty for the whole message
+
+    Returns:
+        One dict per leaf part with its `section`, `content_type`, `params`,
+        `encoding`, encoded `size`, `disposition` and `filename`
+    """
+    if body and isinstance(body[0], list):
+        # Child bodies come first, followed by the subtype and extension data
+        parts = []
+        for number, child in enumerate(takewhile(lambda value: isinstance(value, list), body), 1):
+            parts.extend(parse_bodystructure(child, f"{section}.{number}" if section else str(number)))
+        return parts
+
+    maintype, subtype = str(body[0] or "text").lower(), str(body[1] or "plain").lower()
+    params = _params(body[2])
+    # Extension data follows the basic fields, text/* adds a line count and
+    # message/rfc822 an envelope, a body and a line count
+    extension = 7 + {"text": 1, "message": 3 if subtype == "rfc822" else 0}.get(maintype, 0)
+    disposition, disposition_params = None, {}
+    if len(body) > extension + 1 and isinstance(body[extension + 1], list):
+        disposition = str(body[extension + 1][0] or "").lower()
+        disposition_params = _params(body[extension + 1][1] if len(body[extension + 1]) > 1 else None)
+
+    return [{
+        "section": section or "1",
+        "content_type": f"{maintype}/{subtype}",
+        "params": params,
+        "encoding": str(body[5] or "7bit").lower(),
+        "size": int(body[6] or 0),
+        "disposition": disposition,
+        "filename": _param(disposition_params, "filename") or _param(params, "name"),
+    }]
+
+
+def text_part(parts: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """The part classification reads: the first inline text/plain part, else text/html."""
+    inline = [part for part in parts if part["disposition"] != "attachment" and not part["filename"]]
+    for content_type in ("text/plain", "text/html"):
+        for part in inline:
+            if part["content_type"] == content_type:
+                return part
+    return None
+
+
+def decode_part(payload: Optional[bytes], encoding: str) -> bytes:
+    """Decode a (possibly truncated) part body from its transfer encoding."""
+    if not payload:
+        return b""
+    if encoding == "base64":
+        payload = re.sub(rb"\s+", b"", payload)
+        return base64.b64decode(payload[:len(payload) - len(payload) % 4])
+    if encoding == "quoted-printable":
+        return quopri.decodestring(payload)
+    return payload
+
+
+class IMAPSync:
+    """
+    Watermark-based incremental sync of one mailbox folder.
+    """
+
+    def __init__(
+        self,
+        credentials: Dict[str, str],
+        folder: str = "INBOX",
+        store: Optional[SyncStore] = None,
+        chunk_size: int = 100,
+        port: int = IMAP_PORT,
+        use_ssl: bool = IMAP_SSL,
+    ):
+        """
+        Args:
+            credentials: Dict with `host`, `username` and `password` keys
+            folder: Mailbox folder to sync
+            store: Where watermarks are persisted, defaults to `SyncStore()`
+            chunk_size: Number of UIDs fetched per `UID FETCH` command
+            port: Server port
+            use_ssl: Whether to use IMAP over SSL
+        """
+        self.credentials = credentials
+        self.folder = folder
+        self.store = store or SyncStore()
+        self.chunk_size = chunk_size
+        self.port = port
+        self.use_ssl = use_ssl
+        self.key = SyncStore.key(credentials, folder)
+        self.uidvalidity: Optional[int] = None
+        self.bytes_fetched = 0
+        self.bytes_total = 0
+        self._lock = threading.Lock()
+
+    def connect(self) -> imaplib.IMAP4:
+        return connect(self.credentials, self.port, self.use_ssl)
+
+    def _count(self, fetched: int, total: int = 0):
+        # Fetches may run on several connections at once
+        with self._lock:
+            self.bytes_fetched += fetched
+            self.bytes_total += total
+
+    def select(self, mail: imaplib.IMAP4) -> int:
+        """Select the folder read-only and return its UIDVALIDITY."""
+        status, data = mail.select(self.folder, readonly=True)
+        if status != "OK":
+            raise RuntimeError(f"Failed to select folder {self.folder}: {data}")
+        _, response = mail.response("UIDVALIDITY")
+        if response and response[0]:
+            self.uidvalidity = int(response[0])
+        else:
+            _, status_data = mail.status(self.folder, "(UIDVALIDITY)")
+            self.uidvalidity = int(UIDVALIDITY_PATTERN.search(status_data[0]).group(1))
+        return self.uidvalidity
+
+    def watermark(self) -> int:
+        """
+        Last UID already synced, or 0 when the folder was never synced or its
+        UIDVALIDITY changed (in which case every UID has to be fetched again).
+        """
+        state = self.store.get(self.key)
+        if state is None:
+            return 0
+        if state["uidvalidity"] != self.uidvalidity:
+            logger.warning(f"UIDVALIDITY of {self.key} changed from {state['uidvalidity']} to {self.uidvalidity}, resyncing")
+            return 0
+        return state["last_uid"]
+
+    def retry_uids(self) -> List[int]:
+        """
+        UIDs below the watermark to fetch again: the pending ones, left by a
+        consumer that stopped before finishing with them, and the failed ones
+        that haven't been given up on.
+        """
+        state = self.store.get(self.key)
+        if state is None or state["uidvalidity"] != self.uidvalidity:
+            return []
+        # Stores written before `given_up` existed keep exhausted UIDs under `failed`
+        failed = [int(uid) for uid, count in state.get("failed", {}).items() if count < MAX_ATTEMPTS]
+        return sorted(set(state.get("pending", [])).union(failed))
+
+    def new_uids(self, mail: imaplib.IMAP4, since: Optional[str] = None, retry: bool = False) -> List[int]:
+        """
+        UIDs above the watermark, in ascending order.
+
+        Args:
+            mail: Connection with the folder selected
+            since: Date ('DD-Mon-YYYY') limiting the first sync of a folder
+            retry: Include the UIDs of `retry_uids`
+        """
+        last_uid = self.watermark()
+        criteria = [f"UID {last_uid + 1}:*"]
+        if last_uid == 0 and since:
+            criteria.append(f'SINCE "{since}"')
+        status, data = mail.uid("SEARCH", None, *criteria)
+        if status != "OK":
+            raise RuntimeError(f"UID SEARCH failed on {self.key}: {data}")
+        # "n:*" always matches the highest UID, even when it is below n
+        uids = {uid for uid in map(int, data[0].split()) if uid > last_uid}
+        if retry:
+            uids.update(self.retry_uids())
+        return sorted(uids)
+
+    def fetch(
+        self,
+        mail: imaplib.IMAP4,
+        uids: List[int],
+        items: str = "(UID RFC822)",
+    ) -> Iterator[Tuple[int, bytes]]:
+        """
+        Fetch messages in chunks of `chunk_size` UIDs per command.
+
+        Yields:
+            (uid, payload) tuples in the order returned by the server
+        """
+        for start in range(0, len(uids), self.chunk_size):
+            chunk = uids[start:start + self.chunk_size]
+            status, data = mail.uid("FETCH", ",".join(map(str, chunk)), items)
+            if status != "OK":
+                raise RuntimeError(f"UID FETCH failed on {self.key}: {data}")
+            for uid, payload in parse_fetch_response(data):
+                self._count(len(payload), len(payload))
+                yield uid, payload
+
+    def fetch_previews(
+        self,
+        mail: imaplib.IMAP4,
+        uids: List[int],
+        text_bytes: int = PREVIEW_TEXT_BYTES,
+    ) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Fetch what classification needs: headers, structure and the start of
+        the text part. Every chunk costs one FETCH for the headers and
+        structure, plus one per distinct text section (usually one or two).
+
+        Yields:
+            (uid, preview) tuples, a preview holding the raw `header` bytes,
+            the leaf `parts` of the BODYSTRUCTURE, the decoded `text` and the
+            full message `size`
+        """
+        for start in range(0, len(uids), self.chunk_size):
+            chunk = uids[start:start + self.chunk_size]
+            status, data = mail.uid("FETCH", ",".join(map(str, chunk)), PREVIEW_ITEMS)
+            if status != "OK":
+                raise RuntimeError(f"UID FETCH failed on {self.key}: {data}")
+
+            previews: Dict[int, Dict[str, Any]] = {}
+            for item in parse_fetch_items(data):
+                header = item.get("BODY[HEADER]") or b""
+                previews[int(item["UID"])] = {
+                    "header": header,
+                    "parts": parse_bodystructure(item["BODYSTRUCTURE"]),
+                    "text": "",
+                    "size": int(item.get("RFC822.SIZE") or 0),
+                }
+                self._count(len(header), previews[int(item["UID"])]["size"])
+
+            # Text parts sit at different sections, fetch each section for all its emails at once
+            sections = defaultdict(dict)
+            for uid, preview in previews.items():
+                part = text_part(preview["parts"])
+                if part:
+                    sections[part["section"]][uid] = part
+            for section, members in sections.items():
+                status, data = mail.uid("FETCH", ",".join(map(str, members)), f"(UID BODY.PEEK[{section}]<0.{text_bytes}>)")
+                if status != "OK":
+                    raise RuntimeError(f"UID FETCH failed on {self.key}: {data}")
+                for item in parse_fetch_items(data):
+                    uid = int(item["UID"])
+                    payload = item.get(f"BODY[{section}]<0>") or b""
+                    part = members[uid]
+                    charset = part["params"].get("charset") or "utf-8"
+                    previews[uid]["text"] = decode_part(payload, part["encoding"]).decode(charset, errors="replace")
+                    self._count(len(payload))
+
+            for uid in chunk:
+                if uid in previews:
+                    yield uid, previews[uid]
+
+    def fetch_sections(
+        self,
+        mail: imaplib.IMAP4,
+        uid: int,
+        parts: List[Dict[str, Any]],
+        decode: bool = True,
+    ) -> Dict[str, bytes]:
+        """
+        Download some parts of one message in a single FETCH.
+
+        Args:
+            mail: Connection with the folder selected
+            uid: UID of the message
+            parts: Parts as returned by `parse_bodystructure`
+            decode: Decode the parts from their transfer encoding
+
+        Returns:
+            Mapping of section to content
+        """
+        if not parts:
+            return {}
+        items = " ".join(f"BODY.PEEK[{part['section']}]" for part in parts)
+        status, data = mail.uid("FETCH", str(uid), f"(UID {items})")
+        if status != "OK":
+            raise RuntimeError(f"UID FETCH failed on {self.key}: {data}")
+        contents = {}
+        for item in parse_fetch_items(data):
+            for part in parts:
+                payload = item.get(f"BODY[{part['section']}]")
+                if payload is not None:
+                    self._count(len(payload))
+                    contents[part["section"]] = decode_part(payload, part["encoding"]) if decode else payload
+        return contents
+
+    def commit(self, last_uid: int, pending: Iterable[int] = ()):
+        """
+        Advance the watermark of the folder to `last_uid`; it is left as is
+        when another sync has already taken it further.
+
+        Args:
+            last_uid: New watermark
+            pending: UIDs handed out but not processed yet, fetched again by
+                `retry_uids` until they are passed to `resolve`
+        """
+        self.store.set(self.key, self.uidvalidity, last_uid, pending)
+
+    def resolve(self, done: Iterable[int] = (), failed: Iterable[int] = ()):
+        """Record that pending UIDs were processed (`done`) or failed to be (`failed`)."""
+        self.store.resolve(self.key, done, failed)
+
+    def sync(
+        self,
+        limit: Optional[int] = None,
+        since: Optional[str] = None,
+        preview: bool = False,
+    ) -> Iterator[Tuple[int, Any]]:
+        """
+        Download the messages that arrived since the last sync, oldest first.
+
+        The watermark is advanced after each chunk has been consumed, so an
+        interrupted run resumes where it stopped. Messages beyond `limit` are
+        left for the next run rather than dropped.
+
+        Args:
+            limit: Maximum number of messages to download in this run
+            since: Date ('DD-Mon-YYYY') limiting the first sync of a folder
+            preview: Download previews (see `fetch_previews`) instead of
+                whole messages
+
+        Yields:
+            (uid, raw RFC822 bytes) tuples, or (uid, preview) in preview mode
+        """
+        fetch = self.fetch_previews if preview else self.fetch
+        mail = self.connect()
+        try:
+            self.select(mail)
+            uids = self.new_uids(mail, since)
+            if limit and len(uids) > limit:
+                logger.info(f"{len(uids)} new messages in {self.key}, syncing {limit} and leaving {len(uids) - limit} for the next run")
+                uids = uids[:limit]
+            else:
+                logger.info(f"{len(uids)} new messages in {self.key}")
+
+            for start in range(0, len(uids), self.chunk_size):
+                chunk = uids[start:start + self.chunk_size]
+                yield from fetch(mail, chunk)
+                self.commit(chunk[-1])
+            if uids:
+                logger.info(f"Fetched {self.bytes_fetched} of {self.bytes_total} message bytes from {self.key}")
+        finally:
+            try:
+                mail.logout()
+            except Exception as e:
+                logger.debug(f"Error logging out of {self.key}: {e}")
+
+
+class ConnectionPool:
+    """
+    Bounded pool of authenticated connections with the sync's folder selected.
+    Connections are opened on demand and reused until `close`.
+    """
+
+    def __init__(self, sync: IMAPSync, size: int = MAX_CONNECTIONS):
+        self.sync = sync
+        self.size = max(1, size)
+        self._idle: "queue.LifoQueue[imaplib.IMAP4]" = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self) -> Iterator[imaplib.IMAP4]:
+        try:
+            mail = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._opened < self.size
+                if create:
+                    self._opened += 1
+            if create:
+                try:
+                    mail = self.sync.connect()
+                    self.sync.select(mail)
+                except Exception:
+                    with self._lock:
+                        self._opened -= 1
+                    raise
+            else:
+                mail = self._idle.get()
+
+        try:
+            yield mail
+        except (imaplib.IMAP4.abort, OSError):
+            # The connection is unusable: close its socket, without a LOGOUT
+            # round trip, and let the next caller open a new one
+            try:
+                mail.shutdown()
+            except Exception as e:
+                logger.debug(f"Error closing a broken connection to {self.sync.key}: {e}")
+            with self._lock:
+                self._opened -= 1
+            raise
+        except BaseException:
+            self._idle.put(mail)
+            raise
+        else:
+            self._idle.put(mail)
+
+    def close(self):
+        while True:
+            try:
+                mail = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                mail.logout()
+            except Exception as e:
+                logger.debug(f"Error logging out of {self.sync.key}: {e}")
+            with self._lock:
+                self._opened -= 1
+
+
+class _ChunkDone:
+    def __init__(self, index: int):
+        self.index = index
+
+
+class _Failed:
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+_WORKER_DONE = object()
+
+
+class ConcurrentFetcher:
+    """
+    Fetches chunks of UIDs on several pooled connections at once and streams
+    the results through a bounded queue, so parsing and classification can
+    start before the whole range is downloaded.
+    """
+
+    def __init__(
+        self,
+        sync: IMAPSync,
+        max_connections: Optional[int] = None,
+        queue_size: int = 256,
+    ):
+        """
+        Args:
+            sync: Sync whose folder, credentials and chunk size are used
+            max_connections: Maximum number of concurrent connections,
+                defaults to the `IMAP_MAX_CONNECTIONS` environment variable
+            queue_size: Maximum number of fetched items waiting to be consumed
+        """
+        self.sync = sync
+        self.max_connections = max_connections or MAX_CONNECTIONS
+        self.queue_size = queue_size
+        self.pool = ConnectionPool(sync, self.max_connections)
+
+    def __enter__(self) -> "ConcurrentFetcher":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.pool.close()
+
+    def map(self, fn: Callable[[imaplib.IMAP4, Any], Any], items: Iterable[Any]) -> Iterator[Any]:
+        """
+        Call `fn(connection, item)` for every item on the pooled connections.
+
+        Yields:
+            The results, in completion order rather than item order
+        """
+        tasks: "queue.Queue" = queue.Queue()
+        for index, item in enumerate(items):
+            tasks.put((index, item))
+        yield from self._run(tasks, lambda mail, index, item: [fn(mail, item)])
+
+    def stream(
+        self,
+        uids: List[int],
+        build: Optional[Callable[[int, Any], Any]] = None,
+        preview: bool = False,
+        commit: bool = False,
+        track: bool = False,
+    ) -> Iterator[Any]:
+        """
+        Fetch UIDs in chunks spread over the pooled connections.
+
+        Args:
+            uids: UIDs to fetch, in ascending order
+            build: Called with (uid, payload) on the fetching thread, e.g. to
+                parse an `Email`; defaults to yielding the tuple itself
+            preview: Fetch previews instead of whole messages
+            commit: Advance the watermark as chunks complete; it only moves
+                past a chunk once every chunk before it is complete
+            track: Commit the UIDs of the chunks as pending, for consumers that
+                `resolve` them once processed
+
+        Yields:
+            The built items, in completion order
+        """
+        build = build or (lambda uid, payload: (uid, payload))
+        fetch = self.sync.fetch_previews if preview else self.sync.fetch
+        chunk_size = self.sync.chunk_size
+        chunks = [uids[start:start + chunk_size] for start in range(0, len(uids), chunk_size)]
+        tasks: "queue.Queue" = queue.Queue()
+        for index, chunk in enumerate(chunks):
+            tasks.put((index, chunk))
+
+        done, next_commit = set(), 0
+        for item in self._run(tasks, lambda mail, index, chunk: (build(uid, payload) for uid, payload in fetch(mail, chunk)), markers=True):
+            if isinstance(item, _ChunkDone):
+                done.add(item.index)
+                while commit and next_commit in done:
+                    chunk = chunks[next_commit]
+                    self.sync.commit(chunk[-1], chunk if track else ())
+                    next_commit += 1
+            else:
+                yield item
+
+    def sync_new(
+        self,
+        limit: Optional[int] = None,
+        since: Optional[str] = None,
+        preview: bool = False,
+        build: Optional[Callable[[int, Any], Any]] = None,
+        track: bool = False,
+    ) -> Iterator[Any]:
+        """
+        Concurrent equivalent of `IMAPSync.sync`; see `stream` for `build`
+        and `track`. Tracked syncs also fetch the UIDs to retry.
+        """
+        with self.pool.connection() as mail:
+            uids = self.sync.new_uids(mail, since, retry=track)
+        if limit and len(uids) > limit:
+            logger.info(f"{len(uids)} new messages in {self.sync.key}, syncing {limit} and leaving {len(uids) - limit} for the next run")
+            uids = uids[:limit]
+        else:
+            logger.info(f"{len(uids)} new messages in {self.sync.key}")
+        yield from self.stream(uids, build=build, preview=preview, commit=True, track=track)
+        if uids:
+            logger.info(f"Fetched {self.sync.bytes_fetched} of {self.sync.bytes_total} message bytes from {self.sync.key}")
+
+    def _run(self, tasks: "queue.Queue", work: Callable, markers: bool = False) -> Iterator[Any]:
+        """
+        Drain `tasks` with one worker thread per connection, yielding what
+        `work(connection, index, task)` produces as soon as it is queued.
+        """
+        results: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+
+        def put(value) -> bool:
+            while not stop.is_set():
+                try:
+                    results.put(value, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def worker():
+            try:
+                with self.pool.connection() as mail:
+                    while not stop.is_set():
+                        try:
+                            index, task = tasks.get_nowait()
+                        except queue.Empty:
+                            break
+                        for value in work(mail, index, task):
+                            if not put(value):
+                                return
+                        if markers:
+                            put(_ChunkDone(index))
+            except Exception as e:
+                put(_Failed(e))
+            finally:
+                put(_WORKER_DONE)
+
+        n_workers = min(self.max_connections, tasks.qsize())
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(n_workers)]
+        for thread in threads:
+            thread.start()
+        try:
+            running = n_workers
+            while running:
+                value = results.get()
+                if value is _WORKER_DONE:
+                    running -= 1
+                elif isinstance(value, _Failed):
+                    raise value.error
+                else:
+                    yield value
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
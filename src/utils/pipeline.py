@@ -0,0 +1,501 @@
+"""
+Email-to-candidate ingestion pipeline.
+
+Emails flow through a chain of stages connected by bounded asyncio queues:
+
+    fetch -> classify -> pick -> rasterize -> extract -> persist
+
+Each stage runs a fixed number of workers, so slow stages (LLM extraction)
+don't hold up fast ones beyond the queue size, and a full queue makes the
+stages before it wait (backpressure). Candidates are extracted while later
+emails are still being downloaded.
+
+The IMAP watermark moves as emails are fetched, but their UIDs stay pending
+in the sync store until every resume of the email is persisted; emails that
+fail at any stage, or that were still in flight when the process stopped,
+are fetched again by the next sync. Candidate ids are derived from the email
+and the resume, so a retried email replaces its candidates rather than
+duplicating them.
+"""
+
+import os
+import time
+import uuid
+import asyncio
+import logging
+from collections import Counter, deque
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Set
+
+import fitz
+
+from src.utils.attachments import AttachmentRanker
+from src.utils.emailer import DEFAULT_CREDENTIALS, Attachment, Email, stream_emails
+from src.utils.imap_sync import ConnectionPool, IMAPSync, SyncStore
+from src.utils.loader import pdf_to_img64, create_message
+from src.outputs import TeachingCandidate
+from src.agents import CandidateAgent
+from src.agents.cache import ClassificationCache
+from src.agents.preclassify import classify_emails
+from src.search import get_candidate_index
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = {
+    "classify": 1,
+    "pick": 4,
+    "rasterize": os.cpu_count() or 2,
+    "extract": 4,
+    "persist": 1,
+}
+
+# Emails classified per batch, and how long the classifier waits to fill a batch
+CLASSIFY_BATCH_SIZE = 20
+CLASSIFY_BATCH_WAIT = 1.0
+
+# Seconds between two writes of the processed and failed UIDs to the sync store
+RESOLVE_INTERVAL = 5.0
+
+# Number of resume outcomes kept for the stats; older ones are only counted
+RESULTS_HISTORY = 1000
+
+# Namespace of the candidate ids derived from an email and its resume
+CANDIDATE_NAMESPACE = uuid.UUID("5b0c2a4e-3f7d-4c55-9d7e-2f1a8c6b9e10")
+
+_DONE = object()
+
+
+class StageStats:
+    """Throughput counters of one pipeline stage."""
+
+    def __init__(self, name: str, concurrency: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.received = 0
+        self.emitted = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "received": self.received,
+            "emitted": self.emitted,
+            "failed": self.failed,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "elapsed_seconds": round(self.elapsed, 3),
+            "throughput_per_second": round(self.received / self.elapsed, 3) if self.elapsed else 0.0,
+        }
+
+
+class Stage:
+    """
+    A pipeline stage: `concurrency` workers taking batches of up to
+    `batch_size` items from `inbox`, passing them to `handler` and putting
+    what it returns in `outbox`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[List[Any]], Awaitable[List[Any]]],
+        concurrency: int = 1,
+        batch_size: int = 1,
+        batch_wait: float = 0.0,
+        on_failure: Optional[Callable[[List[Any]], None]] = None,
+    ):
+        self.name = name
+        self.handler = handler
+        self.on_failure = on_failure
+        self.concurrency = max(1, concurrency)
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.stats = StageStats(name, self.concurrency)
+
+    async def _batch(self, inbox: asyncio.Queue) -> List[Any]:
+        first = await inbox.get()
+        if first is _DONE:
+            return [first]
+        batch = [first]
+        deadline = time.perf_counter() + self.batch_wait
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                item = inbox.get_nowait() if timeout <= 0 else await asyncio.wait_for(inbox.get(), timeout)
+            except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                break
+            if item is _DONE:
+                # Leave the end marker for the next read
+                inbox.put_nowait(item)
+                break
+            batch.append(item)
+        return batch
+
+    async def _worker(self, inbox: asyncio.Queue, outbox: Optional[asyncio.Queue]):
+        while True:
+            batch = await self._batch(inbox)
+            if batch[0] is _DONE:
+                # Let the sibling workers see the end marker too
+                await inbox.put(_DONE)
+                return
+            self.stats.received += len(batch)
+            start = time.perf_counter()
+            try:
+                outputs = await self.handler(batch)
+            except Exception as e:
+                logger.error(f"Stage {self.name} failed on {len(batch)} items: {e}", exc_info=True)
+                self.stats.failed += len(batch)
+                if self.on_failure is not None:
+                    self.on_failure(batch)
+                outputs = []
+            finally:
+                self.stats.busy_seconds += time.perf_counter() - start
+            for output in outputs:
+                self.stats.emitted += 1
+                if outbox is not None:
+                    await outbox.put(output)
+
+    async def run(self, inbox: asyncio.Queue, outbox: Optional[asyncio.Queue]):
+        self.stats.started = time.perf_counter()
+        await asyncio.gather(*(self._worker(inbox, outbox) for _ in range(self.concurrency)))
+        self.stats.finished = time.perf_counter()
+        if outbox is not None:
+            await outbox.put(_DONE)
+
+
+class EmailTracker:
+    """
+    Follows every email through the pipeline and resolves its UID in the
+    sync store once it is done, i.e. discarded by the classifier or with
+    every picked resume persisted, or once it has failed at any stage.
+    """
+
+    def __init__(self, sync: Optional[IMAPSync], interval: float = RESOLVE_INTERVAL):
+        """
+        Args:
+            sync: Sync of the folder the emails come from; None for emails
+                that don't come from a sync (e.g. a replayed archive), which
+                are followed but not resolved
+            interval: Seconds between two writes to the sync store
+        """
+        self.sync = sync
+        self.interval = interval
+        # Resumes of an email still in the pipeline, and the emails one of whose resumes failed
+        self._resumes: Dict[str, int] = {}
+        self._failed_resumes: Set[str] = set()
+        self._done: Set[int] = set()
+        self._failed: Set[int] = set()
+        self._last_write = time.perf_counter()
+
+    def finish(self, email_id: str, failed: bool = False):
+        """Mark an email as done or failed."""
+        (self._failed if failed else self._done).add(int(email_id))
+        if time.perf_counter() - self._last_write > self.interval:
+            self.flush()
+
+    def expect(self, email_id: str, resumes: int):
+        """Record the number of resumes picked from an email; it is done once they are all finished."""
+        if resumes:
+            self._resumes[email_id] = resumes
+        else:
+            self.finish(email_id)
+
+    def finish_resume(self, email_id: str, failed: bool = False):
+        """Mark a resume of an email as persisted or failed."""
+        if failed:
+            self._failed_resumes.add(email_id)
+        self._resumes[email_id] -= 1
+        if not self._resumes[email_id]:
+            del self._resumes[email_id]
+            self.finish(email_id, failed=email_id in self._failed_resumes)
+            self._failed_resumes.discard(email_id)
+
+    def flush(self):
+        """Write the UIDs resolved since the last write to the sync store."""
+        self._last_write = time.perf_counter()
+        if self.sync is None or (not self._done and not self._failed):
+            return
+        done, failed = self._done, self._failed
+        self._done, self._failed = set(), set()
+        try:
+            self.sync.resolve(done, failed)
+        except Exception as e:
+            # Unresolved UIDs stay pending and are processed again by the next sync
+            logger.error(f"Failed to record {len(done)} processed and {len(failed)} failed emails: {e}", exc_info=True)
+        if failed:
+            logger.warning(f"{len(failed)} emails of {self.sync.key} failed and will be retried: {sorted(failed)}")
+
+
+class IngestionPipeline:
+    """
+    Turns new emails into indexed candidates.
+
+    Usage:
+        pipeline = IngestionPipeline(max_emails=500)
+        stats = asyncio.run(pipeline.run())
+    """
+
+    def __init__(
+        self,
+        credentials: Dict[str, str] = DEFAULT_CREDENTIALS,
+        folder: str = "INBOX",
+        max_emails: Optional[int] = None,
+        since: Optional[str] = None,
+        store: Optional[SyncStore] = None,
+        concurrency: Optional[Dict[str, int]] = None,
+        queue_size: int = 16,
+        resume_dir: str = "./static/resume",
+        index=None,
+        cache: Optional[ClassificationCache] = None,
+        labels_path: Optional[str] = None,
+        picks_path: Optional[str] = None,
+    ):
+        """
+        Args:
+            credentials: Dict with `host`, `username` and `password` keys
+            folder: Mailbox folder to ingest
+            max_emails: Maximum number of emails per run
+            since: Date ('DD-Mon-YYYY') limiting the very first sync of the folder
+            store: Watermark store, defaults to `SyncStore()`
+            concurrency: Number of workers per stage, overriding `DEFAULT_CONCURRENCY`
+            queue_size: Capacity of the queue in front of every stage
+            resume_dir: Directory the resume PDFs are saved to
+            index: Index the candidates are added to, a `CandidateIndex` or,
+                outside the process serving the index, an `IndexWriter`;
+                defaults to the process-wide `get_candidate_index()`
+            cache: Classification cache, see `classify_emails`
+            labels_path: Training set of the pre-classifier the LLM labels are
+                appended to, see `classify_emails`
+            picks_path: Log of the attachment picks, see `AttachmentRanker`
+        """
+        self.credentials = credentials
+        self.folder = folder
+        self.max_emails = max_emails
+        self.since = since
+        self.store = store or SyncStore()
+        self.concurrency = {**DEFAULT_CONCURRENCY, **(concurrency or {})}
+        self.queue_size = queue_size
+        self.resume_dir = Path(resume_dir)
+        self._index = index
+        self.cache = cache
+        self.labels_path = labels_path
+        self.sync = IMAPSync(credentials, folder=folder, store=self.store)
+        self.pool = ConnectionPool(self.sync, self.concurrency["pick"])
+        self.ranker = AttachmentRanker(log_path=picks_path)
+        self.fetch_stats = StageStats("fetch", 1)
+        self.stages = [
+            Stage("classify", self.classify, self.concurrency["classify"], CLASSIFY_BATCH_SIZE, CLASSIFY_BATCH_WAIT, on_failure=self._on_failure),
+            Stage("pick", self.pick, self.concurrency["pick"], on_failure=self._on_failure),
+            Stage("rasterize", self.rasterize, self.concurrency["rasterize"], on_failure=self._on_failure),
+            Stage("extract", self.extract, self.concurrency["extract"], on_failure=self._on_failure),
+            Stage("persist", self.persist, self.concurrency["persist"], on_failure=self._on_failure),
+        ]
+        self.tracker = EmailTracker(None)
+        # Outcome of the latest resumes, and the number of resumes per outcome
+        self.results: deque = deque(maxlen=RESULTS_HISTORY)
+        self.outcomes: Counter = Counter()
+
+    @property
+    def index(self):
+        # Loaded on first use, so building a pipeline doesn't load the whole index
+        if self._index is None:
+            self._index = get_candidate_index()
+        return self._index
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-stage counters, the number of resumes per outcome and the outcome of the latest resumes."""
+        stages = {"fetch": self.fetch_stats.summary()}
+        stages.update({stage.name: stage.stats.summary() for stage in self.stages})
+        return {
+            "emails": self.fetch_stats.emitted,
+            "candidates": stages["classify"]["emitted"],
+            "resumes": self.outcomes["success"],
+            "stages": stages,
+            "attachments": self.ranker.stats.summary(),
+            "outcomes": dict(self.outcomes),
+            "results": list(self.results),
+        }
+
+    async def run(
+        self,
+        source: Optional[Callable[[], Iterator[Email]]] = None,
+        track: Optional[bool] = None,
+    ) -> Dict[str, Any]:
+        """
+        Run the pipeline until the source is exhausted and every email has
+        gone through all the stages.
+
+        Args:
+            source: Blocking iterator of emails, run on a thread; defaults to
+                the previews of the emails that arrived since the last sync
+            track: Resolve the UIDs of the emails in the sync store as they
+                are done or fail (see `EmailTracker`); only for sources that
+                leave them pending, like the default one. Defaults to True
+                when no source is given
+
+        Returns:
+            See `stats`
+        """
+        if track is None:
+            track = source is None
+        source = source or (lambda: stream_emails(
+            credentials=self.credentials,
+            folder=self.folder,
+            max_emails=self.max_emails,
+            since=self.since,
+            preview=True,
+            sync=self.sync,
+            track=True,
+        ))
+        self.tracker = EmailTracker(self.sync if track else None)
+        self.resume_dir.mkdir(parents=True, exist_ok=True)
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        tasks = [
+            asyncio.create_task(stage.run(inbox, queues[i + 1] if i + 1 < len(queues) else None))
+            for i, (stage, inbox) in enumerate(zip(self.stages, queues))
+        ]
+        try:
+            await self._fetch(source, queues[0])
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.pool.close()
+            self.tracker.flush()
+
+        stats = self.stats()
+        logger.info(f"Ingestion pipeline finished: {stats['emails']} emails, {stats['candidates']} candidates, {stats['resumes']} resumes")
+        return stats
+
+    async def _fetch(self, source: Callable[[], Iterator[Email]], outbox: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        stats = self.fetch_stats
+        stats.started = time.perf_counter()
+
+        def produce():
+            for email in source():
+                stats.received += 1
+                # Blocks the fetching thread while the classifier is behind
+                asyncio.run_coroutine_threadsafe(outbox.put(email), loop).result()
+                stats.emitted += 1
+
+        try:
+            await asyncio.to_thread(produce)
+        except Exception as e:
+            logger.error(f"Failed to fetch emails: {e}", exc_info=True)
+            stats.failed += 1
+        finally:
+            stats.finished = time.perf_counter()
+            await outbox.put(_DONE)
+
+    def _record(self, result: Dict[str, Any]):
+        self.results.append(result)
+        self.outcomes[result["status"]] += 1
+
+    def _on_failure(self, items: List[Any]):
+        """Mark the emails, or the resumes, a stage raised on as failed."""
+        for item in items:
+            if isinstance(item, Email):
+                self.tracker.finish(item.id, failed=True)
+            else:
+                self.tracker.finish_resume(item["email_id"], failed=True)
+
+    async def classify(self, emails: List[Email]) -> List[Email]:
+        await asyncio.to_thread(classify_emails, emails, cache=self.cache, labels_path=self.labels_path)
+        candidates = []
+        for email in emails:
+            if email.type is None:
+                # Not classified, retried by a later sync
+                self.tracker.finish(email.id, failed=True)
+            elif email.type.type == "candidate":
+                candidates.append(email)
+            else:
+                self.tracker.finish(email.id)
+        return candidates
+
+    async def pick(self, emails: List[Email]) -> List[Dict[str, Any]]:
+        """Download the resume attachments of a candidate email and pick the likely resumes."""
+        email = emails[0]
+
+        def download_and_rank():
+            if any(not attachment.loaded and attachment.section for attachment in email._attachments):
+                with self.pool.connection() as mail:
+                    email.download_attachments(self.sync, mail)
+            return self.ranker.pick(email)
+
+        picked = await asyncio.to_thread(download_and_rank)
+        if not picked:
+            self.tracker.expect(email.id, 0)
+            documents = [attachment.filename for attachment in email._attachments if attachment.is_resume]
+            if documents:
+                self._record({
+                    "id": None,
+                    "email_id": email.id,
+                    "filename": ", ".join(documents),
+                    "status": "cancelled",
+                    "error": "No attachment picked as a PDF resume",
+                })
+            return []
+        source = (email._metadata or {}).get("message_id") or f"{self.sync.key}/{email.id}"
+        jobs = [
+            {
+                "id": "cand-" + str(uuid.uuid5(CANDIDATE_NAMESPACE, f"{source}/{attachment.digest}")),
+                "email_id": email.id,
+                "filename": attachment.filename,
+                "attachment": attachment,
+            }
+            for attachment in picked
+        ]
+        self.tracker.expect(email.id, len(jobs))
+        return jobs
+
+    async def rasterize(self, jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        job = jobs[0]
+        attachment: Attachment = job.pop("attachment")
+
+        def convert():
+            pdf_bytes = attachment.content
+            with fitz.open(stream=pdf_bytes, filetype="pdf") as pdf:
+                return pdf_bytes, pdf_to_img64(pdf, zoom=2, save=False)
+
+        try:
+            job["pdf"], job["images"] = await asyncio.to_thread(convert)
+        except Exception as e:
+            logger.error(f"Failed to convert {job['filename']} to images: {e}")
+            self._record({**job, "status": "failed", "error": f"Failed to convert PDF to images: {e}"})
+            self.tracker.finish_resume(job["email_id"], failed=True)
+            return []
+        return [job]
+
+    async def extract(self, jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        job = jobs[0]
+        output = await CandidateAgent.ainvoke({
+            "messages": [create_message(job.pop("images"))],
+            "schema": TeachingCandidate.model_json_schema(),
+            "id": job["id"],
+        })
+        if not output.get("candidate"):
+            job.pop("pdf")
+            self._record({**job, "status": "failed", "error": f"Failed to extract information after {output.get('iteration')} iterations"})
+            self.tracker.finish_resume(job["email_id"], failed=True)
+            return []
+        job["candidate"] = output["candidate"][-1]
+        return [job]
+
+    async def persist(self, jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        job = jobs[0]
+        pdf_bytes = job.pop("pdf")
+        await asyncio.to_thread((self.resume_dir / f"{job['id']}.pdf").write_bytes, pdf_bytes)
+        # Embedding (and, on a large pool, IVF training) would otherwise block the event loop
+        await asyncio.to_thread(self.index.add, job["id"], job["candidate"])
+        self._record({**job, "status": "success", "resume_url": f"/static/resume/{job['id']}.pdf"})
+        self.tracker.finish_resume(job["email_id"])
+        return [job]
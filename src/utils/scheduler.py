@@ -0,0 +1,178 @@
+"""
+In-process scheduler of the email ingestion.
+
+Runs the ingestion pipeline every `EMAIL_CRON_INTERVAL` seconds and on
+demand, never two runs at a time. The IMAP watermark of every run is kept
+by the pipeline's SyncStore; the scheduler persists the record of the last
+runs so their stats survive restarts.
+"""
+
+import os
+import json
+import uuid
+import asyncio
+import logging
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+STATE_PATH = os.getenv("EMAIL_CRON_STATE_PATH", "data/email_cron.json")
+INTERVAL = int(os.getenv("EMAIL_CRON_INTERVAL", 3600))
+MAX_EMAILS = int(os.getenv("EMAIL_CRON_MAX_EMAILS", 500))
+
+# Number of past runs kept in the state file
+HISTORY = 50
+
+
+class RunInProgress(Exception):
+    """Raised when a run is triggered while another one is in progress."""
+
+    def __init__(self, run: Dict[str, Any]):
+        super().__init__(f"Email ingestion run {run['run_id']} is already in progress")
+        self.run = run
+
+
+class EmailScheduler:
+    """
+    Periodic and on-demand runs of the IngestionPipeline, one at a time.
+    """
+
+    def __init__(
+        self,
+        interval: int = INTERVAL,
+        max_emails: int = MAX_EMAILS,
+        since: Optional[str] = None,
+        state_path: Optional[str] = None,
+    ):
+        """
+        Args:
+            interval: Seconds between two scheduled runs
+            max_emails: Maximum number of emails per run, the rest wait for the next run
+            since: Date ('DD-Mon-YYYY') limiting the very first sync of the mailbox
+            state_path: File the run records are kept in
+        """
+        self.interval = interval
+        self.max_emails = max_emails
+        self.since = since or os.getenv("EMAIL_CRON_SINCE")
+        self.state_path = Path(state_path or STATE_PATH)
+        self.runs: Dict[str, Dict[str, Any]] = {}
+        if self.state_path.exists():
+            with open(self.state_path) as f:
+                self.runs = json.load(f).get("runs", {})
+        self._lock = asyncio.Lock()
+        self._current: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop_task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> Optional[Dict[str, Any]]:
+        """Record of the run in progress, if any."""
+        return self._current
+
+    def get(self, run_id: str) -> Optional[Dict[str, Any]]:
+        return self.runs.get(run_id)
+
+    async def trigger(self, trigger: str = "manual") -> Dict[str, Any]:
+        """
+        Start a run in the background.
+
+        Returns:
+            The record of the new run, updated in place as it progresses
+
+        Raises:
+            RunInProgress: If a run is already in progress
+        """
+        if self._lock.locked():
+            raise RunInProgress(self._current)
+        await self._lock.acquire()
+        run = {
+            "run_id": str(uuid.uuid4()),
+            "trigger": trigger,
+            "status": "running",
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "finished_at": None,
+            "error": None,
+            "stats": None,
+        }
+        self._current = run
+        self.runs[run["run_id"]] = run
+        self._task = asyncio.create_task(self._run(run))
+        return run
+
+    async def wait(self) -> None:
+        """Wait for the run in progress, if any, to finish."""
+        if self._task is not None:
+            await asyncio.shield(self._task)
+
+    async def _run(self, run: Dict[str, Any]):
+        # Imported here so that the API starts without IMAP credentials when the scheduler isn't used
+        from src.utils.pipeline import IngestionPipeline
+
+        try:
+            pipeline = IngestionPipeline(max_emails=self.max_emails, since=self.since)
+            stats = await pipeline.run()
+            run["stats"] = summarize(stats)
+            run["status"] = "success"
+        except Exception as e:
+            logger.error(f"Email ingestion run {run['run_id']} failed: {e}", exc_info=True)
+            run["status"] = "failure"
+            run["error"] = str(e)
+        finally:
+            run["finished_at"] = datetime.now(timezone.utc).isoformat()
+            self._current = None
+            self._save()
+            self._lock.release()
+        logger.info(f"Email ingestion run {run['run_id']} finished with status {run['status']}: {run['stats']}")
+
+    def _save(self):
+        # Keep the most recent runs only
+        self.runs = dict(sorted(self.runs.items(), key=lambda item: item[1]["started_at"])[-HISTORY:])
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"runs": self.runs}, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.trigger(trigger="scheduled")
+                await self.wait()
+            except RunInProgress:
+                logger.info("Skipping scheduled email ingestion, a run is already in progress")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Start the periodic runs on the running event loop."""
+        if self._loop_task is None:
+            logger.info(f"Starting email ingestion scheduler, every {self.interval} s")
+            self._loop_task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        """Stop the periodic runs and wait for the run in progress."""
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            self._loop_task = None
+        await self.wait()
+
+
+def summarize(stats: Dict[str, Any]) -> Dict[str, Any]:
+    """Run stats reported by the API, from the stats of an IngestionPipeline run."""
+    return {
+        "emails_scanned": stats["emails"],
+        "emails_classified": stats["stages"]["classify"]["received"],
+        "candidate_emails": stats["candidates"],
+        "resumes_extracted": stats["resumes"],
+        "resumes_failed": stats["outcomes"].get("failed", 0),
+        "stage_seconds": {name: stage["busy_seconds"] for name, stage in stats["stages"].items()},
+        "stages": stats["stages"],
+    }
+
+
+@lru_cache(maxsize=1)
+def get_email_scheduler() -> EmailScheduler:
+    """Process-wide scheduler used by the API."""
+    return EmailScheduler()
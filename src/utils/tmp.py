@@ -1,34 +1,20 @@
-from agents.classify import agent, model
-from src.utils.emailer import fetch_emails, DEFAULT_CREDENTIALS
-from src.routes.resume import load_resume
-import httpx
+import asyncio
+import argparse
 
-start_date = "27-Feb-2025"
-from fastapi import UploadFile
-def cron_job(start_date, credentials=None):
-    
-    all_emails = fetch_emails(start_date, max_emails=1)
-    print("Fetched all emails")
-    inputs= [{"email":str(email)} for email in all_emails]
-    outputs= model.batch(inputs)
-    print("Received Outputs")
+from src.search import IndexWriter
+from src.utils.emailer import DEFAULT_CREDENTIALS
+from src.utils.pipeline import IngestionPipeline
 
-    for idx, output in enumerate(outputs):
-        all_emails[idx].type = output
 
-    candidates=[]
+def cron_job(start_date, credentials=None):
+    """Ingest the emails received since the last run; `start_date` bounds the very first run."""
+    # Candidates are journaled for the API, which serves the index
+    pipeline = IngestionPipeline(credentials or DEFAULT_CREDENTIALS, since=start_date, index=IndexWriter())
+    return asyncio.run(pipeline.run())
 
-    for my_email in all_emails:
-        if my_email.type.type != 'candidate':
-            pass
-        attachment = my_email._attachments[0]
-        upload_file = UploadFile(
-            filename=attachment["filename"],
-            file=attachment["content"],
-            content_type=attachment["content_type"]
-        )
-        candidates.append(load_resume(upload_file))
-    
-    return candidates
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest the resumes of new candidate emails")
+    parser.add_argument("--since", type=str, help="Date ('DD-Mon-YYYY') limiting the very first run")
+    args = parser.parse_args()
 
-print(cron_job('27-Feb-2025'))    
\ No newline at end of file
+    print(cron_job(args.since))    
\ No newline at end of file
@@ -0,0 +1,66 @@
+"""
+TeachingCandidate payloads for the search and matching tests.
+"""
+
+import copy
+from typing import Any, Dict, List, Optional
+
+from src.outputs import TeachingCandidate
+from src.schemas import DEMO_RESPONSE
+
+
+def teaching_candidate(
+    first_name: str,
+    primary_skill: str,
+    level: Optional[str] = "PGT",
+    city: str = "Noida",
+    state: str = "Uttar Pradesh",
+    designations: Optional[List[str]] = None,
+    career_start_date: str = "01-2015",
+    **fields: Any,
+) -> Dict[str, Any]:
+    """
+    Candidate record as the extractor stores it, i.e. a validated
+    `TeachingCandidate` dumped to JSON, built from the demo candidate.
+
+    Args:
+        first_name: First name of the candidate
+        primary_skill: Primary skill, a master skill
+        level: Level applied for, a master level
+        city: City of residence
+        state: State of residence, a master state
+        designations: Designation of every experience, most recent first;
+            defaults to one "<level> <primary_skill>" experience
+        career_start_date: Start of the career (MM-YYYY)
+        **fields: Other TeachingCandidate fields overriding the demo ones
+    """
+    candidate = copy.deepcopy(DEMO_RESPONSE["candidate"])
+    designations = designations or [f"{level or ''} {primary_skill}".strip()]
+    experiences = [
+        {
+            "organisation": f"{first_name} Public School {number}",
+            "designation": designation,
+            "start_date": career_start_date,
+            "end_date": None,
+            "contributions": [],
+            "current_job_or_not": number == 0,
+        }
+        for number, designation in enumerate(designations)
+    ]
+    education = {**candidate["education"][1], "specialization": primary_skill}
+    candidate.update({
+        "first_name": first_name,
+        "last_name": "Sharma",
+        "email": f"{first_name.lower()}@example.com",
+        "primary_skill": primary_skill,
+        "secondary_skill": None,
+        "tertiary_skill": None,
+        "level": level,
+        "city": city,
+        "state": state,
+        "career_start_date": career_start_date,
+        "education": [education],
+        "experiences": experiences,
+        **fields,
+    })
+    return TeachingCandidate.model_validate(candidate).model_dump(mode="json")
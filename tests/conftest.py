@@ -0,0 +1,12 @@
+import pytest
+
+from tests.imap_server import IMAPStandIn, make_message
+
+
+@pytest.fixture
+def imap_server():
+    """IMAP stand-in holding messages with UIDs 1 to 250."""
+    with IMAPStandIn() as server:
+        for uid in range(1, 251):
+            server.add(uid, make_message(uid))
+        yield server
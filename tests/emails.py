@@ -0,0 +1,32 @@
+"""
+`Email` objects for the classification and ingestion tests.
+"""
+
+import email
+from pathlib import Path
+from typing import List
+
+import fitz
+
+from src.utils.emailer import Email
+from tests.imap_server import make_message
+
+
+def make_email(uid: int, directory: Path, **fields) -> Email:
+    """
+    Email parsed from a message built by `make_message`.
+
+    Args:
+        uid: Id of the email
+        directory: Directory the attachments would be saved to
+        **fields: Arguments of `make_message` (subject, body, sender, message_id, attachments)
+    """
+    return Email(str(uid), f"hash{uid}", email.message_from_bytes(make_message(uid, **fields)), str(directory))
+
+
+def make_pdf(pages: List[str]) -> bytes:
+    """PDF with one page per string, holding the string as its text layer."""
+    with fitz.open() as pdf:
+        for text in pages:
+            pdf.new_page().insert_text((72, 72), text)
+        return pdf.tobytes()
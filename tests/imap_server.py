@@ -0,0 +1,255 @@
+"""
+Local IMAP stand-in for the sync tests.
+
+Serves one folder of in-memory messages over plain IMAP on localhost and
+implements just what the sync engine sends: LOGIN, SELECT/EXAMINE,
+UID SEARCH, UID FETCH (whole messages, previews and body sections), IDLE
+and LOGOUT. Every FETCH can be delayed to stand in for the round trip to a
+remote server.
+"""
+
+import re
+import time
+import email
+import socket
+import mimetypes
+import socketserver
+import threading
+from email.message import EmailMessage
+from typing import Dict, List, Optional
+
+SECTION_PATTERN = re.compile(rb"BODY\.PEEK\[([\d.]+)\](?:<0\.(\d+)>)?")
+
+
+def make_message(
+    uid: int,
+    subject: Optional[str] = None,
+    body: Optional[str] = None,
+    sender: Optional[str] = None,
+    message_id: Optional[str] = None,
+    attachments: Optional[Dict[str, bytes]] = None,
+) -> bytes:
+    """
+    An RFC822 message with a plain-text body.
+
+    Args:
+        uid: UID the message is meant for, used in the default headers and body
+        subject: Subject, defaults to "Message <uid>"
+        body: Text body, defaults to "Body of message <uid>"
+        sender: From address, defaults to "sender<uid>@example.com"
+        message_id: Message-ID, defaults to "<uid@example.com>"
+        attachments: Content of every attachment by filename, with the
+            content type guessed from the filename
+    """
+    message = EmailMessage()
+    message["From"] = sender or f"sender{uid}@example.com"
+    message["To"] = "jobs@example.com"
+    message["Subject"] = subject or f"Message {uid}"
+    message["Message-ID"] = message_id or f"<{uid}@example.com>"
+    message.set_content(body or f"Body of message {uid}")
+    for filename, content in (attachments or {}).items():
+        content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        maintype, subtype = content_type.split("/")
+        message.add_attachment(content, maintype=maintype, subtype=subtype, filename=filename)
+    return message.as_bytes().replace(b"\n", b"\r\n")
+
+
+def _quote(value: str) -> bytes:
+    return b'"' + value.replace("\\", "\\\\").replace('"', '\\"').encode() + b'"'
+
+
+def bodystructure(part: email.message.Message) -> bytes:
+    """BODYSTRUCTURE of a parsed message, with the extension data the sync engine reads."""
+    if part.is_multipart():
+        children = b"".join(bodystructure(child) for child in part.get_payload())
+        return b"(" + children + b" " + _quote(part.get_content_subtype().upper()) + b")"
+    params = b" ".join(_quote(key.upper()) + b" " + _quote(value) for key, value in part.get_params()[1:]) or None
+    body = part.get_payload().encode()
+    fields = b"(%s %s %s NIL NIL %s %d" % (
+        _quote(part.get_content_maintype().upper()), _quote(part.get_content_subtype().upper()),
+        b"(" + params + b")" if params else b"NIL", _quote(part.get("Content-Transfer-Encoding", "7bit").upper()), len(body),
+    )
+    if part.get_content_maintype() == "text":
+        fields += b" %d" % body.count(b"\n")
+    disposition = part.get_content_disposition()
+    if disposition:
+        filename = part.get_filename()
+        disposition_params = b"(" + _quote("FILENAME") + b" " + _quote(filename) + b")" if filename else b"NIL"
+        fields += b" NIL (" + _quote(disposition.upper()) + b" " + disposition_params + b") NIL"
+    return fields + b")"
+
+
+def section(message: email.message.Message, number: str) -> bytes:
+    """Body of a section of a message, in its transfer encoding."""
+    part = message
+    for index in number.split("."):
+        if part.is_multipart():
+            part = part.get_payload()[int(index) - 1]
+    return part.get_payload().encode()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: "IMAPStandIn"
+
+    def send(self, data: bytes):
+        self.wfile.write(data)
+        self.wfile.flush()
+
+    def handle(self):
+        self.server.connections += 1
+        self.send(b"* OK IMAP stand-in ready\r\n")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            tag, command, *rest = line.rstrip(b"\r\n").split(b" ", 2)
+            args = rest[0] if rest else b""
+            command = command.upper()
+            if command == b"CAPABILITY":
+                self.send(b"* CAPABILITY IMAP4rev1 IDLE\r\n" + tag + b" OK CAPABILITY completed\r\n")
+            elif command == b"LOGIN":
+                if self.server.login_failures:
+                    self.server.login_failures -= 1
+                    self.send(tag + b" NO [UNAVAILABLE] LOGIN failed\r\n")
+                    continue
+                self.server.logins += 1
+                self.send(tag + b" OK LOGIN completed\r\n")
+            elif command in (b"SELECT", b"EXAMINE"):
+                self.send(
+                    b"* %d EXISTS\r\n* OK [UIDVALIDITY %d] UIDs valid\r\n" % (len(self.server.messages), self.server.uidvalidity)
+                    + tag + b" OK [READ-ONLY] EXAMINE completed\r\n"
+                )
+            elif command == b"NOOP":
+                self.send(tag + b" OK NOOP completed\r\n")
+            elif command == b"IDLE":
+                if not self.idle(tag):
+                    return
+            elif command == b"LOGOUT":
+                self.send(b"* BYE\r\n" + tag + b" OK LOGOUT completed\r\n")
+                return
+            elif command == b"UID":
+                subcommand, args = args.split(b" ", 1)
+                if subcommand.upper() == b"SEARCH":
+                    self.search(tag, args)
+                else:
+                    self.fetch(tag, args)
+            else:
+                self.send(tag + b" BAD unknown command\r\n")
+
+    def idle(self, tag: bytes) -> bool:
+        """Idle until the client sends DONE; False if the connection was dropped meanwhile."""
+        self.send(b"+ idling\r\n")
+        with self.server.lock:
+            self.server.idlers.append(self)
+        try:
+            line = self.rfile.readline()
+        finally:
+            with self.server.lock:
+                self.server.idlers.remove(self)
+        if not line:
+            return False
+        self.send(tag + b" OK IDLE terminated\r\n")
+        return True
+
+    def search(self, tag: bytes, args: bytes):
+        low = int(re.search(rb"UID (\d+):", args).group(1))
+        uids = self.server.uids()
+        # "n:*" always matches the highest UID, as on a real server
+        matched = [uid for uid in uids if uid >= low] or uids[-1:]
+        self.send(b"* SEARCH " + b" ".join(b"%d" % uid for uid in matched) + b"\r\n" + tag + b" OK SEARCH completed\r\n")
+
+    def fetch(self, tag: bytes, args: bytes):
+        uid_set, items = args.split(b" ", 1)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.server.fetches += 1
+        for number, uid in enumerate(map(int, uid_set.split(b",")), start=1):
+            raw = self.server.messages[uid]
+            message = email.message_from_bytes(raw)
+            header = raw.split(b"\r\n\r\n", 1)[0] + b"\r\n\r\n"
+            sections = SECTION_PATTERN.findall(items)
+            if b"BODYSTRUCTURE" in items:
+                self.send(
+                    b"* %d FETCH (UID %d RFC822.SIZE %d BODYSTRUCTURE %s BODY[HEADER] {%d}\r\n"
+                    % (number, uid, len(raw), bodystructure(message), len(header)) + header + b")\r\n"
+                )
+            elif sections:
+                response = b"* %d FETCH (UID %d" % (number, uid)
+                for name, length in sections:
+                    content = section(message, name.decode())
+                    if length:
+                        content = content[:int(length)]
+                        name += b"]<0>"
+                    else:
+                        name += b"]"
+                    response += b" BODY[%s {%d}\r\n" % (name, len(content)) + content
+                self.send(response + b")\r\n")
+            else:
+                self.send(b"* %d FETCH (UID %d RFC822 {%d}\r\n" % (number, uid, len(raw)) + raw + b")\r\n")
+        self.send(tag + b" OK FETCH completed\r\n")
+
+
+class IMAPStandIn(socketserver.ThreadingTCPServer):
+    """
+    In-memory IMAP server on a free localhost port.
+
+    Usage:
+        with IMAPStandIn(latency=0.05) as server:
+            server.add(1, make_message(1))
+            sync = IMAPSync(server.credentials, port=server.port, use_ssl=False)
+    """
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, latency: float = 0.0, uidvalidity: int = 1):
+        """
+        Args:
+            latency: Seconds every FETCH command is delayed by
+            uidvalidity: UIDVALIDITY reported for the folder
+        """
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.latency = latency
+        self.uidvalidity = uidvalidity
+        self.messages: Dict[int, bytes] = {}
+        self.idlers: List[_Handler] = []
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.logins = 0
+        # Number of upcoming LOGIN commands to reject
+        self.login_failures = 0
+        self.fetches = 0
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    @property
+    def credentials(self) -> Dict[str, str]:
+        return {"host": "127.0.0.1", "username": "jobs@example.com", "password": "secret"}
+
+    def uids(self) -> List[int]:
+        with self.lock:
+            return sorted(self.messages)
+
+    def add(self, uid: int, raw: bytes):
+        """Deliver a message, notifying the connections in IDLE."""
+        with self.lock:
+            self.messages[uid] = raw
+            for idler in self.idlers:
+                idler.send(b"* %d EXISTS\r\n" % len(self.messages))
+
+    def disconnect(self):
+        """Drop the connections in IDLE, as a server restart or a network failure would."""
+        with self.lock:
+            for idler in self.idlers:
+                idler.connection.shutdown(socket.SHUT_RDWR)
+
+    def __enter__(self) -> "IMAPStandIn":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
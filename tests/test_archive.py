@@ -0,0 +1,111 @@
+import asyncio
+import email
+import functools
+
+import pytest
+
+import src.utils.archive as archive_module
+import src.utils.pipeline as pipeline_module
+from src.agents.classify import EmailType
+from src.search import CandidateIndex
+from src.search.embeddings import HashingEmbedder
+from src.utils.archive import MailArchive, archive_mailbox, replay
+from src.utils.imap_sync import IMAPSync, SyncStore
+from tests.candidates import teaching_candidate
+from tests.emails import make_pdf
+from tests.imap_server import IMAPStandIn, make_message
+
+RESUME = make_pdf(["Education\nTeaching experience\nSkills\nasha@example.com"])
+
+
+def application(uid):
+    return make_message(
+        uid, subject=f"Application for PGT Physics {uid}",
+        message_id=f"<Application-{uid}@Example.com>", attachments={"Resume.pdf": RESUME},
+    )
+
+
+@pytest.fixture
+def server():
+    with IMAPStandIn(uidvalidity=7) as server:
+        server.add(1, application(1))
+        server.add(2, make_message(2, subject="Newsletter"))
+        server.add(3, application(3))
+        yield server
+
+
+@pytest.fixture
+def archive(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(archive_module, "IMAPSync", functools.partial(IMAPSync, port=server.port, use_ssl=False))
+    archive = MailArchive(str(tmp_path / "archive"))
+    yield archive
+    archive.close()
+
+
+def mailbox_key(server):
+    return SyncStore.key(server.credentials, "INBOX")
+
+
+def headers(raw):
+    message = email.message_from_bytes(raw)
+    return message["Message-ID"], message["Subject"]
+
+
+def test_archives_new_messages_only(server, archive):
+    assert archive_mailbox(server.credentials, archive=archive) == 3
+    assert archive_mailbox(server.credentials, archive=archive) == 0
+
+    server.add(4, make_message(4))
+
+    assert archive_mailbox(server.credentials, archive=archive) == 1
+    assert len(archive) == 4
+    assert [entry["uid"] for entry in archive.entries(mailbox_key(server))] == [1, 2, 3, 4]
+    assert {entry["uidvalidity"] for entry in archive.entries()} == {7}
+
+
+def test_looks_up_archived_messages_by_uid_and_message_id(server, archive):
+    archive_mailbox(server.credentials, archive=archive)
+
+    assert headers(archive.get_by_uid(mailbox_key(server), 2)) == ("<2@example.com>", "Newsletter")
+    assert headers(archive.get_by_uid(mailbox_key(server), 2, uidvalidity=7)) == ("<2@example.com>", "Newsletter")
+    assert archive.get_by_uid(mailbox_key(server), 2, uidvalidity=8) is None
+    assert archive.get_by_uid(mailbox_key(server), 5) is None
+    # Message-IDs are matched without their brackets and case
+    assert headers(archive.get_by_message_id("application-3@example.com")) == (
+        "<Application-3@Example.com>", "Application for PGT Physics 3",
+    )
+    assert archive.get_by_message_id("<missing@example.com>") is None
+
+
+class StubAgent:
+    async def ainvoke(self, state):
+        return {"candidate": [teaching_candidate("Asha", "Physics")]}
+
+
+def stub_classify(emails, cache=None, labels_path=None):
+    for email in emails:
+        candidate = email._metadata["subject"].startswith("Application")
+        email.type = EmailType(type="candidate" if candidate else "non candidate")
+    return [email.type for email in emails]
+
+
+def test_replays_the_archive_offline(server, archive, tmp_path, monkeypatch):
+    archive_mailbox(server.credentials, archive=archive)
+    # The replay never touches the mailbox
+    server.shutdown()
+    server.server_close()
+    monkeypatch.setattr(pipeline_module, "CandidateAgent", StubAgent())
+    monkeypatch.setattr(pipeline_module, "classify_emails", stub_classify)
+
+    replayed = [(e.id, e._metadata["subject"]) for e in archive.emails(temp_dir=tmp_path / "tmp")]
+    assert replayed == [("1", "Application for PGT Physics 1"), ("2", "Newsletter"), ("3", "Application for PGT Physics 3")]
+
+    workdir = tmp_path / "replay"
+    index = CandidateIndex(str(workdir / "index"), HashingEmbedder())
+    stats = asyncio.run(replay(archive, workdir=str(workdir), index=index, concurrency={"pick": 1, "rasterize": 1, "extract": 1}))
+
+    assert stats["emails"] == 3
+    assert stats["candidates"] == 2
+    assert stats["outcomes"] == {"success": 2}
+    assert len(index) == 2
+    assert len(list((workdir / "resume").glob("cand-*.pdf"))) == 2
@@ -0,0 +1,63 @@
+import logging
+
+import pytest
+
+from src.utils.attachments import AttachmentRanker, load_decisions
+from tests.emails import make_email, make_pdf
+
+CV = make_pdf([
+    "Priya Sharma\npriya.sharma@example.com\n+91 98765 43210\n"
+    "Career objective\nEducation: M.Sc Physics, B.Ed\nTeaching experience\nSkills\nLanguages known"
+])
+SIGNATURE = make_pdf(["Regards, Priya"])
+COVER_LETTER = make_pdf(["Respected Sir,\nI am writing to apply for the post of PGT Physics.\nYours faithfully"])
+LOGO = b"\x89PNG logo"
+
+
+@pytest.fixture
+def ranker(tmp_path):
+    return AttachmentRanker(log_path=str(tmp_path / "picks.jsonl"))
+
+
+def test_picks_the_cv_listed_after_a_signature_and_a_logo(ranker, tmp_path):
+    email = make_email(1, tmp_path, attachments={
+        "signature.pdf": SIGNATURE, "logo.png": LOGO, "Priya Sharma.pdf": CV,
+    })
+
+    picked = ranker.pick(email)
+
+    assert [attachment.filename for attachment in picked] == ["Priya Sharma.pdf"]
+
+
+def test_picks_the_resume_but_not_the_cover_letter(ranker, tmp_path):
+    email = make_email(1, tmp_path, attachments={"Cover letter.pdf": COVER_LETTER, "Resume.pdf": CV})
+
+    assert [attachment.filename for attachment in ranker.pick(email)] == ["Resume.pdf"]
+
+
+def test_decisions_are_logged_and_counted(ranker, tmp_path, caplog):
+    with caplog.at_level(logging.INFO, logger="src.utils.attachments"):
+        ranker.pick(make_email(1, tmp_path, message_id="<1@example.com>", attachments={
+            "signature.pdf": SIGNATURE, "Priya Sharma.pdf": CV,
+        }))
+        ranker.pick(make_email(2, tmp_path, attachments={"logo.png": LOGO}))
+
+    first, second = load_decisions(ranker.log_path)
+    assert first["email_id"] == "1"
+    assert first["message_id"] == "<1@example.com>"
+    # Best first, with the reasons behind every score
+    assert [(d["filename"], d["picked"]) for d in first["attachments"]] == [
+        ("Priya Sharma.pdf", True), ("signature.pdf", False),
+    ]
+    cv, signature = first["attachments"]
+    assert cv["pages"] == 1
+    assert cv["score"] > signature["score"]
+    assert "contact details" in cv["reasons"]
+    assert "non-resume filename" in signature["reasons"]
+    # Images are not even ranked
+    assert second["attachments"] == []
+    assert "Email 1: picked ['Priya Sharma.pdf']" in caplog.text
+
+    assert ranker.stats.summary() == {
+        "emails": 2, "attachments": 2, "picked": 1, "skipped": 1, "emails_without_pick": 1,
+    }
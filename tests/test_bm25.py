@@ -0,0 +1,120 @@
+import math
+
+import numpy as np
+import pytest
+
+from src.search import CandidateIndex
+from src.search.bm25 import BM25Index, candidate_terms, tokenize
+from tests.candidates import teaching_candidate
+
+DOCS = {
+    0: "pgt physics noida",
+    1: "tgt mathematics noida noida",
+    2: "prt english pune",
+}
+
+
+def bm25(query: str, docs: dict, k1: float = 1.2, b: float = 0.75) -> dict:
+    """Okapi BM25 of every document, term by term."""
+    tokenized = {slot: tokenize(text) for slot, text in docs.items()}
+    avg_len = sum(map(len, tokenized.values())) / len(tokenized)
+    scores = {}
+    for slot, terms in tokenized.items():
+        score = 0.0
+        for term in set(tokenize(query)):
+            df = sum(term in other for other in tokenized.values())
+            if not df:
+                continue
+            tf = terms.count(term)
+            idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+            score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(terms) / avg_len))
+        scores[slot] = score
+    return scores
+
+
+@pytest.fixture
+def index():
+    index = BM25Index()
+    for slot, text in DOCS.items():
+        index.add(slot, tokenize(text))
+    return index
+
+
+@pytest.mark.parametrize("query", ["physics", "noida", "Noida Physics", "mathematics noida", "chemistry"])
+def test_scores_match_okapi_bm25(index, query):
+    expected = bm25(query, DOCS)
+
+    np.testing.assert_allclose(index.scores(query, 3), [expected[slot] for slot in range(3)], rtol=1e-5)
+
+
+def test_rare_terms_weigh_more_than_common_ones(index):
+    scores = index.scores("physics noida", 3)
+
+    # Both match "noida", only the first matches the rarer "physics"
+    assert scores[0] > scores[1] > scores[2] == 0
+
+
+def test_masked_slots_score_zero(index):
+    scores = index.scores("noida", 3, mask=np.array([False, True, True]))
+
+    assert scores[0] == 0 and scores[1] > 0
+
+
+def test_removed_and_replaced_documents_are_rescored(index):
+    index.remove(0)
+    index.add(2, tokenize("pgt physics pune"))
+
+    expected = bm25("physics", {1: DOCS[1], 2: "pgt physics pune"})
+    np.testing.assert_allclose(index.scores("physics", 3), [0.0, expected[1], expected[2]], rtol=1e-5)
+    assert len(index) == 2
+
+
+def test_saved_index_scores_the_same(tmp_path, index):
+    index.save(tmp_path)
+
+    loaded = BM25Index.load(tmp_path)
+    np.testing.assert_array_equal(loaded.scores("noida physics", 3), index.scores("noida physics", 3))
+
+
+def test_candidate_terms_cover_the_searched_fields():
+    candidate = teaching_candidate("Asha", "Physics", level="PGT", designations=["PGT Physics"])
+
+    terms = candidate_terms(candidate)
+    assert {"pgt", "physics", "noida", "uttar", "pradesh", "teacher"} <= set(terms)
+    # Contact details aren't searchable
+    assert "asha@example.com" not in " ".join(terms)
+    assert "8010056152" not in terms
+
+
+class StubEmbedder:
+    """Embeds the query "Physics" close to chemistry candidates and away from physics ones."""
+
+    name = "stub"
+    dim = 2
+
+    def embed(self, texts):
+        vectors = []
+        for text in texts:
+            if text == "Physics":
+                vectors.append([1.0, 0.0])
+            elif "Chemistry" in text:
+                vectors.append([0.6, 0.8])
+            else:
+                vectors.append([0.0, 1.0])
+        return np.asarray(vectors, dtype=np.float32)
+
+
+@pytest.mark.parametrize("keyword_weight, best", [(0.0, "cand-chemistry"), (1.0, "cand-physics")])
+def test_keyword_weight_trades_keyword_matches_against_vector_similarity(tmp_path, keyword_weight, best):
+    index = CandidateIndex(str(tmp_path), StubEmbedder())
+    index.add_many({
+        "cand-physics": teaching_candidate("Asha", "Physics", designations=["PGT Physics"]),
+        "cand-chemistry": teaching_candidate("Ravi", "Chemistry", designations=["PGT Chemistry"]),
+    })
+
+    hits = index.search("Physics", confidence=0.0, keyword_weight=keyword_weight)
+
+    assert hits[0]["id"] == best
+    if keyword_weight == 1.0:
+        # The vector similarity no longer counts at all
+        assert hits[1]["confidence"] == 0.0
@@ -0,0 +1,98 @@
+import sqlite3
+
+import pytest
+
+from src.agents.cache import ClassificationCache, fingerprint, normalize_message_id, normalize_subject
+from src.agents.classify import EmailType
+from tests.emails import make_email
+
+CANDIDATE = EmailType(type="candidate")
+NON_CANDIDATE = EmailType(type="non candidate")
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ClassificationCache(str(tmp_path / "cache.sqlite"))
+    yield cache
+    cache.close()
+
+
+def application(uid, directory, resume=b"%PDF-1.4 resume", **fields):
+    fields.setdefault("subject", "Application for PGT Physics")
+    return make_email(uid, directory, attachments={"Resume.pdf": resume}, **fields)
+
+
+def test_normalization():
+    assert normalize_subject("RE: Fwd[2]:  Application  for PGT ") == "application for pgt"
+    assert normalize_message_id(" <ABC@Example.com> ") == "abc@example.com"
+
+
+def test_fingerprint_ignores_forwarding_but_not_content(tmp_path):
+    original = application(1, tmp_path)
+    forwarded = application(2, tmp_path, subject="Fwd: Application for PGT Physics", sender="hr@example.com")
+    changed = application(3, tmp_path, resume=b"%PDF-1.4 updated resume")
+
+    assert fingerprint(forwarded) == fingerprint(original)
+    assert fingerprint(changed) != fingerprint(original)
+    # Without attachments, the sender tells emails apart
+    assert fingerprint(make_email(4, tmp_path, subject="Hi")) != fingerprint(make_email(5, tmp_path, subject="Hi"))
+
+
+def test_lookup_by_message_id(tmp_path, cache):
+    cache.set_many([application(1, tmp_path)], [CANDIDATE])
+
+    assert cache.get_many([application(1, tmp_path)]) == [CANDIDATE]
+    assert (cache.stats.lookups, cache.stats.message_id_hits, cache.stats.fingerprint_hits) == (1, 1, 0)
+
+
+def test_lookup_by_fingerprint(tmp_path, cache):
+    cache.set_many([application(1, tmp_path)], [CANDIDATE])
+    forwarded = application(2, tmp_path, subject="Fwd: Application for PGT Physics")
+
+    assert cache.get_many([forwarded, make_email(3, tmp_path)]) == [CANDIDATE, None]
+    assert (cache.stats.lookups, cache.stats.message_id_hits, cache.stats.fingerprint_hits) == (2, 0, 1)
+    assert cache.stats.hit_rate == 0.5
+
+
+def test_message_id_entry_is_invalidated_when_the_content_changes(tmp_path, cache):
+    cache.set_many([application(1, tmp_path)], [CANDIDATE])
+    changed = application(1, tmp_path, resume=b"%PDF-1.4 updated resume")
+
+    assert cache.get_many([changed]) == [None]
+    assert cache.stats.stale == 1
+
+    cache.set_many([changed], [NON_CANDIDATE])
+    assert cache.get_many([changed]) == [NON_CANDIDATE]
+    assert cache.get_many([application(2, tmp_path)]) == [CANDIDATE]
+
+
+def test_unlabelled_emails_are_not_cached(tmp_path, cache):
+    cache.set_many([application(1, tmp_path)], [None])
+
+    assert cache.get_many([application(1, tmp_path)]) == [None]
+
+
+def test_labels_persist_across_instances(tmp_path, cache):
+    cache.set_many([application(1, tmp_path)], [CANDIDATE])
+    cache.close()
+
+    reopened = ClassificationCache(str(tmp_path / "cache.sqlite"))
+    assert reopened.get_many([application(1, tmp_path)]) == [CANDIDATE]
+    reopened.close()
+
+
+def test_caches_without_fingerprints_are_migrated(tmp_path):
+    path = tmp_path / "old.sqlite"
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE classifications (key TEXT PRIMARY KEY, type TEXT NOT NULL, created_at TEXT DEFAULT CURRENT_TIMESTAMP)"
+    )
+    connection.execute("INSERT INTO classifications (key, type) VALUES ('mid:1@example.com', 'candidate')")
+    connection.commit()
+    connection.close()
+
+    cache = ClassificationCache(str(path))
+    assert cache.get_many([application(1, tmp_path)]) == [CANDIDATE]
+    cache.set_many([application(2, tmp_path)], [NON_CANDIDATE])
+    assert cache.get_many([application(2, tmp_path)]) == [NON_CANDIDATE]
+    cache.close()
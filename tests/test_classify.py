@@ -0,0 +1,95 @@
+import re
+
+import pytest
+
+import src.agents.classify as classify
+from src.agents.classify import EmailType, EmailTypeBatch, LabelledEmailType, classify_batch, summarize_email
+from tests.emails import make_email
+
+
+class FakeBatchModel:
+    """Structured-output stand-in answering batches with `labels`, failing the batches holding a `fail_on` id."""
+
+    def __init__(self, labels, fail_on=(), leave_out=()):
+        self.labels = labels
+        self.fail_on = set(fail_on)
+        self.leave_out = set(leave_out)
+        self.batches = []
+
+    def invoke(self, inputs):
+        ids = re.findall(r"^\d+\. Id: (\S+)$", inputs["emails"], re.MULTILINE)
+        self.batches.append(ids)
+        if self.fail_on & set(ids):
+            raise ValueError("Invalid JSON output")
+        return EmailTypeBatch(labels=[
+            LabelledEmailType(id=id, type=self.labels[id]) for id in ids if id not in self.leave_out
+        ])
+
+
+class FakeModel:
+    """Per-email structured-output stand-in, failing the emails whose id is in `fail_on`."""
+
+    def __init__(self, labels, fail_on=()):
+        self.labels = labels
+        self.fail_on = set(fail_on)
+        self.requests = []
+
+    def batch(self, inputs, return_exceptions=False):
+        outputs = []
+        for item in inputs:
+            id = re.search(r"Email\(id=([^,]+),", item["email"]).group(1)
+            self.requests.append(id)
+            outputs.append(ValueError("Invalid JSON output") if id in self.fail_on else EmailType(type=self.labels[id]))
+        return outputs
+
+
+@pytest.fixture
+def emails(tmp_path):
+    return [make_email(uid, tmp_path) for uid in range(1, 7)]
+
+
+LABELS = {str(uid): "candidate" if uid % 2 else "non candidate" for uid in range(1, 7)}
+
+
+def test_summary_lists_the_email_fields(tmp_path):
+    email = make_email(7, tmp_path, subject="Application", attachments={"cv.pdf": b"%PDF"})
+
+    summary = summarize_email(email, 3)
+
+    assert summary.splitlines() == [
+        "3. Id: 7",
+        "Subject: Application",
+        "From: sender7@example.com",
+        "Attachments: cv.pdf",
+        "Body: Body of message 7",
+    ]
+
+
+def test_failed_batch_falls_back_to_one_request_per_email(monkeypatch, emails):
+    batch_model = FakeBatchModel(LABELS, fail_on=["4"])
+    model = FakeModel(LABELS, fail_on=["5"])
+    monkeypatch.setattr(classify, "batch_model", batch_model)
+    monkeypatch.setattr(classify, "model", model)
+
+    labels = classify_batch(emails, batch_size=3)
+
+    assert batch_model.batches == [["1", "2", "3"], ["4", "5", "6"]]
+    # Only the emails of the failed batch are classified one by one
+    assert model.requests == ["4", "5", "6"]
+    # The email whose own request failed too is left unlabelled, to be classified on a later run
+    assert [label and label.type for label in labels] == [
+        "candidate", "non candidate", "candidate", "non candidate", None, "non candidate",
+    ]
+
+
+def test_emails_missing_from_a_batch_answer_are_classified_alone(monkeypatch, emails):
+    batch_model = FakeBatchModel(LABELS, leave_out=["2"])
+    model = FakeModel(LABELS)
+    monkeypatch.setattr(classify, "batch_model", batch_model)
+    monkeypatch.setattr(classify, "model", model)
+
+    labels = classify_batch(emails, batch_size=20)
+
+    assert len(batch_model.batches) == 1
+    assert model.requests == ["2"]
+    assert [label.type for label in labels] == [LABELS[str(uid)] for uid in range(1, 7)]
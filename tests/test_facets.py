@@ -0,0 +1,131 @@
+import numpy as np
+import pytest
+
+from src.search.facets import Bitmap, FacetIndex
+from tests.candidates import teaching_candidate
+
+SIZE = 4096
+
+
+def members(bitmap: Bitmap, size: int = SIZE) -> set:
+    """Slots of a bitmap read through both representations, which must agree."""
+    from_array = set(bitmap.to_array().tolist())
+    from_bits = set(np.flatnonzero(np.unpackbits(bitmap.to_bits(size), bitorder="little")).tolist())
+    assert from_array == from_bits
+    assert bitmap.count() == len(from_array)
+    return from_array
+
+
+def test_bitmap_switches_to_a_bitset_when_dense_and_back_when_sparse():
+    bitmap, expected = Bitmap(), set()
+    for slot in range(0, SIZE, 3):
+        bitmap.add(slot)
+        expected.add(slot)
+    bitmap.optimize(SIZE)
+    assert bitmap.is_dense
+    assert members(bitmap) == expected
+
+    for slot in range(0, SIZE, 3):
+        if slot % 300:
+            bitmap.remove(slot)
+            expected.discard(slot)
+    bitmap.optimize(SIZE)
+    assert not bitmap.is_dense
+    assert members(bitmap) == expected
+
+
+@pytest.mark.parametrize("dense", [False, True])
+def test_bitmap_updates_and_counts_in_either_representation(dense):
+    rng = np.random.default_rng(0)
+    bitmap, expected = Bitmap(), set()
+    for slot in rng.choice(SIZE, 2000, replace=False).tolist():
+        bitmap.add(slot)
+        expected.add(slot)
+    bitmap.optimize(SIZE)
+    assert bitmap.is_dense
+    if not dense:
+        bitmap._array, bitmap._bits = bitmap.to_array(), None
+
+    # Interleaved adds and removes, including slots past the end of the bitset
+    for step, slot in enumerate(rng.integers(0, SIZE + 100, 500).tolist()):
+        if step % 2:
+            bitmap.add(slot)
+            expected.add(slot)
+        else:
+            bitmap.remove(slot)
+            expected.discard(slot)
+
+    assert members(bitmap, SIZE + 100) == expected
+    within = rng.random(SIZE + 100) < 0.5
+    assert bitmap.count(within) == sum(within[slot] for slot in expected)
+
+
+def test_bitmaps_combine_across_representations():
+    sparse, dense = Bitmap(), Bitmap()
+    for slot in (1, 9, 100, 2000):
+        sparse.add(slot)
+    for slot in range(0, SIZE, 2):
+        dense.add(slot)
+    sparse.optimize(SIZE)
+    dense.optimize(SIZE)
+    assert not sparse.is_dense and dense.is_dense
+
+    both = np.unpackbits(sparse.to_bits(SIZE) & dense.to_bits(SIZE), bitorder="little")
+    either = np.unpackbits(sparse.to_bits(SIZE) | dense.to_bits(SIZE), bitorder="little")
+    assert np.flatnonzero(both).tolist() == [100, 2000]
+    assert either.sum() == SIZE // 2 + 2
+
+
+@pytest.fixture
+def facets():
+    index = FacetIndex()
+    candidates = [
+        teaching_candidate("Asha", "Physics", level="PGT"),
+        teaching_candidate("Ravi", "Mathematics", level="TGT", secondary_skill="Physics", city="Lucknow"),
+        teaching_candidate("Meera", "English", level="PRT", city="Pune", state="Maharashtra"),
+        teaching_candidate("Kiran", "Chemistry", level="PGT", tertiary_skill="Physics", city="Mumbai", state="Maharashtra"),
+    ]
+    for slot, candidate in enumerate(candidates):
+        index.add(slot, candidate)
+    return index
+
+
+def matches(index: FacetIndex, filters: dict) -> list:
+    return np.flatnonzero(index.mask(filters)).tolist()
+
+
+@pytest.mark.parametrize("filters, expected", [
+    ({"level": "PGT"}, [0, 3]),
+    ({"level": "pgt"}, [0, 3]),
+    ({"level": ["PGT", "PRT"]}, [0, 2, 3]),
+    ({"level": "PGT", "state": "Maharashtra"}, [3]),
+    ({"skill": "Physics"}, [0, 1, 3]),
+    ({"primary_skill": "Physics"}, [0]),
+    ({"$or": [{"level": "PRT"}, {"city": "Lucknow"}]}, [1, 2]),
+    ({"$and": [{"skill": "Physics"}, {"$or": [{"level": "TGT"}, {"state": "Maharashtra"}]}]}, [1, 3]),
+    ({"skill": "Physics", "$or": [{"city": "Noida"}, {"city": "Mumbai"}]}, [0, 3]),
+    ({"level": "Day Care"}, []),
+])
+def test_evaluate_combines_fields_and_operators(facets, filters, expected):
+    assert matches(facets, filters) == expected
+
+
+def test_evaluate_rejects_unknown_fields(facets):
+    with pytest.raises(ValueError):
+        facets.mask({"$or": [{"colour": "blue"}]})
+
+
+def test_counts_follow_removals_and_filters(facets):
+    facets.remove(0, teaching_candidate("Asha", "Physics", level="PGT"))
+
+    assert facets.counts(["level"])["level"] == {"PGT": 1, "TGT": 1, "PRT": 1}
+    within = facets.mask({"state": "Maharashtra"})
+    assert facets.counts(["level"], within=within)["level"] == {"PRT": 1, "PGT": 1, "TGT": 0}
+
+
+def test_saved_facets_evaluate_the_same(tmp_path, facets):
+    facets.save(tmp_path)
+
+    loaded = FacetIndex.load(tmp_path)
+    assert matches(loaded, {"skill": "Physics", "level": "PGT"}) == [0, 3]
+    assert loaded.counts() == facets.counts()
@@ -0,0 +1,79 @@
+import pytest
+from fuzzywuzzy import fuzz, process
+
+from src.utils.etl.fuzzy import FuzzyMatcher, full_process, wratio
+
+SKILLS = [
+    "English", "Hindi", "Sanskrit", "French", "Mathematics", "Science", "Physics", "Chemistry",
+    "Biology", "Environmental Science", "Social Science", "History", "Geography", "Political Science",
+    "Economics", "Psychology", "Commerce", "Accountancy", "Business Studies", "Home Science",
+    "Library Science", "Computer Science", "Vocal Music Classical", "Instrumental Music Classical",
+    "Vocal Music Western", "Dance (Classical)", "Dance (Western)", "Arts", "Theatre", "Drama",
+    "Robotics", "Debate & Public Speaking", "Creative Writing", "General Sport", "Athletics", "Yoga",
+    "Cricket", "Basketball", "Football",
+]
+ROLES = [
+    "Teacher", "Mother Teacher", "Assistant Teacher", "Academic Coordinator", "Head of Department",
+    "Vice Principal", "Headmistress", "Principal", "Director", "School Counselor", "Admissions Counselor",
+    "Sport Coach", "Librarian", "Lab Assistant", "Lab Technician", "Front Desk Executive", "Clerk",
+    "Office Assistant", "HR Executive", "Finance Executive", "Admin Officer", "IT Support Staff",
+    "System Admin", "Software Developer", "Bus Driver", "Housekeeping Staff",
+]
+LEVELS = ["Day Care", "Pre-Primary", "PRT", "TGT", "PGT", "NA", "Other"]
+
+# Values as they come out of the candidate sheets: typos, case, abbreviations,
+# several subjects in one cell, punctuation, non-ASCII characters and noise
+NOISY_VALUES = [
+    "mathematic", "maths", "MATHS TEACHER", "math's", "englsh", "english literature", "Hindi/Sanskrit",
+    "hindi teacher", "sanskrit", "frnch", "sciense", "Gen. Science", "physic", "PGT Physics",
+    "pgt chemistry / biology", "chem", "bio", "biology (zoology)", "evs", "environment studies",
+    "social studies", "SST", "s.st", "histroy", "geograpy", "pol science", "political sc.",
+    "economic", "eco", "pyschology", "commerce & accounts", "accounts", "accountancy and business studies",
+    "B.Com", "home sci", "library", "computer", "computers", "computer sc.", "IT", "informatics practices",
+    "music (vocal)", "vocal music", "music teacher western", "tabla", "classical dance", "western dance",
+    "dance teacher (western)", "art and craft", "arts", "fine arts", "theater", "dramatics",
+    "robotic", "public speaking", "creative writting", "sports", "sport coach", "PE teacher",
+    "physical education teacher", "yog", "yoga trainer", "crickt", "basket ball", "foot ball",
+    "teacher", "teachers", "mother teacher (NTT)", "asst teacher", "assistant teacher",
+    "academic co-ordinator", "coordinator", "HOD", "head of the department", "vice-principal",
+    "head mistress", "principle", "director", "counsellor", "school counselor", "admission counsellor",
+    "coach", "librarian", "lab asst", "lab technician", "front office executive", "receptionist",
+    "clerk", "office asst.", "hr", "hr executive", "accountant", "finance", "admin officer",
+    "administrator", "it support", "system administrator", "software developer", "developer",
+    "bus driver", "driver", "housekeeping", "peon",
+    "day care", "daycare", "pre primary", "pre-primary teacher", "nursery", "prt", "PRT English",
+    "tgt", "TGT Science", "pgt", "Social Science TGT", "n/a", "NA", "others", "other",
+    "", "a", "ab", "   ", "xyz", "1234", "Matématiques", "ÉCONOMIE", "çomputer", "--", "teacher & coordinator",
+]
+
+
+def reference_match(text, targets, threshold=75):
+    """`DataNormalizer._fuzzy_match` as it was with fuzzywuzzy."""
+    if not text or len(text) < 3:
+        return None
+    best = process.extractOne(text, targets)
+    return best[0] if best and best[1] >= threshold else None
+
+
+@pytest.mark.parametrize("targets", [SKILLS, ROLES, LEVELS], ids=["skills", "roles", "levels"])
+@pytest.mark.parametrize("threshold", [60, 75, 90])
+def test_match_many_equals_fuzzywuzzy(targets, threshold):
+    inputs = [text for text in NOISY_VALUES if text and len(text) >= 3]
+    expected = [reference_match(text, targets, threshold) for text in inputs]
+
+    assert FuzzyMatcher(targets, threshold).match_many(inputs) == expected
+
+
+@pytest.mark.parametrize("targets", [SKILLS, ROLES, LEVELS], ids=["skills", "roles", "levels"])
+def test_wratio_equals_fuzzywuzzy(targets):
+    for text in NOISY_VALUES:
+        for target in targets:
+            assert wratio(full_process(text), full_process(target)) == fuzz.WRatio(text, target), (text, target)
+
+
+def test_shortlisted_matching_equals_fuzzywuzzy():
+    inputs = [text for text in NOISY_VALUES if text and len(text) >= 3]
+    # Only the target sharing the fewest trigrams with an input is left out of its shortlist
+    matcher = FuzzyMatcher(SKILLS, shortlist=len(SKILLS) - 1)
+
+    assert matcher.match_many(inputs) == [reference_match(text, SKILLS) for text in inputs]
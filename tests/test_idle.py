@@ -0,0 +1,114 @@
+import queue
+import threading
+import time
+
+import pytest
+
+import src.utils.idle as idle_module
+from src.utils.idle import IdleListener
+from src.utils.imap_sync import SyncStore
+from tests.imap_server import IMAPStandIn, make_message
+
+BACKOFF = 0.05
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def server():
+    with IMAPStandIn() as server:
+        for uid in (1, 2):
+            server.add(uid, make_message(uid))
+        yield server
+
+
+@pytest.fixture
+def listener(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(idle_module, "POLL_INTERVAL", 0.02)
+    listener = IdleListener(
+        server.credentials,
+        store=SyncStore(str(tmp_path / "imap_state.json")),
+        temp_dir=tmp_path / "sync",
+        backoff_initial=BACKOFF,
+    )
+    listener.sync.port, listener.sync.use_ssl = server.port, False
+    # Backoffs waited between reconnections
+    waits = []
+    wait = listener.stop_event.wait
+    listener.waits = waits
+    listener.stop_event.wait = lambda timeout: waits.append(timeout) or wait(timeout)
+    yield listener
+    listener.stop()
+
+
+@pytest.fixture
+def received(listener):
+    """UIDs yielded by the listener, which runs on its own thread."""
+    uids = queue.Queue()
+
+    def consume():
+        for email in listener.emails():
+            uids.put(int(email.id))
+        uids.put(None)
+
+    thread = threading.Thread(target=consume, daemon=True)
+    thread.start()
+    uids.thread = thread
+    return uids
+
+
+def take(uids, n):
+    return [uids.get(timeout=5) for _ in range(n)]
+
+
+def test_catches_up_then_yields_messages_added_while_idling(server, received):
+    assert take(received, 2) == [1, 2]
+    wait_for(lambda: server.idlers)
+
+    server.add(3, make_message(3, subject="Application for TGT Maths"))
+
+    assert take(received, 1) == [3]
+    assert server.logins == 1
+
+
+def test_stop_ends_the_iterator(server, listener, received):
+    take(received, 2)
+    wait_for(lambda: server.idlers)
+
+    listener.stop()
+
+    assert received.get(timeout=5) is None
+    received.thread.join(timeout=5)
+    assert not received.thread.is_alive()
+    assert listener.waits == []
+
+
+def test_reconnects_with_backoff_without_yielding_seen_uids_again(server, listener, received):
+    assert take(received, 2) == [1, 2]
+    wait_for(lambda: server.idlers)
+
+    # The first two reconnection attempts are refused
+    server.login_failures = 2
+    server.disconnect()
+    wait_for(lambda: not server.idlers)
+    server.add(3, make_message(3))
+
+    assert take(received, 1) == [3]
+    assert listener.waits == [BACKOFF, 2 * BACKOFF, 4 * BACKOFF]
+    assert server.logins == 2
+
+    # Reconnected, the listener is back in IDLE and the backoff starts over
+    wait_for(lambda: server.idlers)
+    server.login_failures = 0
+    server.disconnect()
+    wait_for(lambda: not server.idlers)
+    server.add(4, make_message(4))
+
+    assert take(received, 1) == [4]
+    assert listener.waits[3:] == [BACKOFF]
+    assert received.empty()
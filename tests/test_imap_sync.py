@@ -0,0 +1,161 @@
+import time
+import imaplib
+
+import pytest
+
+from src.utils.imap_sync import MAX_ATTEMPTS, ConcurrentFetcher, ConnectionPool, IMAPSync, SyncStore
+from tests.imap_server import IMAPStandIn, make_message
+
+
+def make_sync(server, tmp_path, chunk_size=100):
+    store = SyncStore(str(tmp_path / "imap_state.json"))
+    return IMAPSync(server.credentials, store=store, chunk_size=chunk_size, port=server.port, use_ssl=False)
+
+
+def test_sync_only_fetches_messages_above_the_watermark(imap_server, tmp_path):
+    sync = make_sync(imap_server, tmp_path)
+
+    assert [uid for uid, _ in sync.sync()] == list(range(1, 251))
+    assert sync.watermark() == 250
+    assert list(sync.sync()) == []
+
+    imap_server.add(251, make_message(251))
+    imap_server.add(252, make_message(252))
+    assert [uid for uid, _ in make_sync(imap_server, tmp_path).sync()] == [251, 252]
+
+
+def test_sync_leaves_messages_beyond_the_limit_for_the_next_run(imap_server, tmp_path):
+    sync = make_sync(imap_server, tmp_path)
+
+    assert len(list(sync.sync(limit=120))) == 120
+    assert sync.watermark() == 120
+    assert [uid for uid, _ in sync.sync()] == list(range(121, 251))
+
+
+def test_sync_previews_carry_headers_and_text(imap_server, tmp_path):
+    uid, preview = next(make_sync(imap_server, tmp_path).sync(preview=True))
+
+    assert uid == 1
+    assert b"Subject: Message 1" in preview["header"]
+    assert preview["text"].strip() == "Body of message 1"
+    assert preview["size"] == len(imap_server.messages[1])
+
+
+def test_concurrent_fetcher_streams_every_message_once(imap_server, tmp_path):
+    sync = make_sync(imap_server, tmp_path, chunk_size=10)
+
+    with ConcurrentFetcher(sync, max_connections=4) as fetcher:
+        uids = [uid for uid, _ in fetcher.sync_new()]
+
+    assert sorted(uids) == list(range(1, 251))
+    assert sync.watermark() == 250
+    assert imap_server.logins == 4
+
+
+def test_concurrent_fetcher_only_commits_past_complete_chunks(imap_server, tmp_path):
+    sync = make_sync(imap_server, tmp_path, chunk_size=10)
+
+    def build(uid, payload):
+        if uid == 35:
+            raise RuntimeError("unparseable message")
+        return uid
+
+    with ConcurrentFetcher(sync, max_connections=4) as fetcher:
+        with pytest.raises(RuntimeError):
+            list(fetcher.sync_new(build=build))
+
+    # Chunks after the failed one may have completed, the watermark stays before it
+    assert sync.watermark() <= 30
+
+
+def test_concurrent_fetcher_overlaps_the_fetch_round_trips(tmp_path):
+    with IMAPStandIn(latency=0.05) as server:
+        for uid in range(1, 161):
+            server.add(uid, make_message(uid))
+
+        elapsed = {}
+        for connections in (1, 4):
+            sync = make_sync(server, tmp_path / str(connections), chunk_size=10)
+            start = time.perf_counter()
+            with ConcurrentFetcher(sync, max_connections=connections) as fetcher:
+                assert len(list(fetcher.stream(list(range(1, 161))))) == 160
+            elapsed[connections] = time.perf_counter() - start
+
+    # 16 FETCH commands of 50 ms each, spread over 4 connections
+    assert elapsed[1] >= 16 * 0.05
+    assert elapsed[4] < elapsed[1] / 2
+
+
+def test_pool_closes_broken_connections_before_replacing_them(imap_server, tmp_path):
+    pool = ConnectionPool(make_sync(imap_server, tmp_path), size=1)
+
+    with pytest.raises(imaplib.IMAP4.abort):
+        with pool.connection() as broken:
+            raise imaplib.IMAP4.abort("connection reset")
+    assert broken.sock.fileno() == -1
+
+    with pool.connection() as mail:
+        assert mail is not broken
+        assert mail.noop()[0] == "OK"
+    pool.close()
+    assert imap_server.logins == 2
+
+
+def test_tracked_sync_fetches_unresolved_uids_again(imap_server, tmp_path):
+    sync = make_sync(imap_server, tmp_path, chunk_size=10)
+
+    with ConcurrentFetcher(sync, max_connections=2) as fetcher:
+        assert len(list(fetcher.sync_new(limit=30, track=True))) == 30
+    assert sync.watermark() == 30
+    assert sync.retry_uids() == list(range(1, 31))
+
+    # Done emails are settled, failed ones and those never resolved are fetched again
+    sync.resolve(done=range(1, 21), failed=[21, 22])
+    with ConcurrentFetcher(sync, max_connections=2) as fetcher:
+        uids = sorted(uid for uid, _ in fetcher.sync_new(limit=20, track=True))
+    assert uids == list(range(21, 31)) + list(range(31, 41))
+    assert sync.watermark() == 40
+
+
+def test_failed_uids_are_given_up_after_max_attempts(imap_server, tmp_path):
+    sync = make_sync(imap_server, tmp_path)
+    with ConcurrentFetcher(sync) as fetcher:
+        list(fetcher.sync_new(limit=5, track=True))
+
+    for attempt in range(MAX_ATTEMPTS):
+        assert 3 in sync.retry_uids()
+        sync.resolve(done=[1, 2, 4, 5], failed=[3])
+    assert sync.retry_uids() == []
+
+    state = sync.store.get(sync.key)
+    assert state["failed"] == {}
+    assert state["given_up"] == [3]
+
+
+def test_given_up_uids_are_only_reported_once(imap_server, tmp_path, caplog):
+    sync = make_sync(imap_server, tmp_path)
+    with ConcurrentFetcher(sync) as fetcher:
+        list(fetcher.sync_new(limit=1, track=True))
+
+    with caplog.at_level("WARNING", logger="src.utils.imap_sync"):
+        for attempt in range(MAX_ATTEMPTS):
+            sync.resolve(failed=[1])
+        # Later syncs neither fetch nor report it again
+        for _ in range(3):
+            assert sync.retry_uids() == []
+            sync.resolve(done=[])
+
+    assert [record.message for record in caplog.records if "Gave up" in record.message] == [
+        f"Gave up on UIDs 1 of {sync.key} after {MAX_ATTEMPTS} attempts"
+    ]
+
+
+def test_stores_over_the_same_file_never_move_the_watermark_back(imap_server, tmp_path):
+    scheduled, listener = make_sync(imap_server, tmp_path), make_sync(imap_server, tmp_path)
+    assert len(list(scheduled.sync(limit=100))) == 100
+
+    # The listener reads the watermark the scheduled sync left and commits behind it
+    assert [uid for uid, _ in listener.sync(limit=10)] == list(range(101, 111))
+    listener.commit(50, pending=[42])
+    assert scheduled.watermark() == 110
+    assert scheduled.retry_uids() == [42]
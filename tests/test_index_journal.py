@@ -0,0 +1,37 @@
+from src.search import CandidateIndex, IndexWriter
+from src.search.embeddings import HashingEmbedder
+from tests.candidates import teaching_candidate
+
+
+def make_index(tmp_path):
+    embedder = HashingEmbedder()
+    return CandidateIndex.load(str(tmp_path), embedder), IndexWriter(str(tmp_path), embedder)
+
+
+def test_serving_index_applies_changes_journaled_by_writers(tmp_path):
+    index, writer = make_index(tmp_path)
+    index.add("cand-1", teaching_candidate("Asha", "Physics", designations=["PGT Physics"]))
+    writer.add("cand-2", teaching_candidate("Ravi", "Mathematics", level="TGT", designations=["TGT Mathematics"]))
+    writer.remove("cand-1")
+
+    assert index.facet_counts()["total"] == 1
+    assert [hit["id"] for hit in index.search("TGT Mathematics")] == ["cand-2"]
+
+
+def test_journal_numbering_carries_on_after_compaction(tmp_path):
+    index, writer = make_index(tmp_path)
+    skills = ["Physics", "Chemistry", "Biology", "History", "Geography"]
+    writer.add_many({f"cand-{n}": teaching_candidate(f"Teacher{n}", skills[n]) for n in range(3)})
+    index.save()
+    writer.add("cand-3", teaching_candidate("Teacher3", skills[3]))
+    # A write cut short by a crash is dropped by the next one
+    with open(index.journal.path, "a") as f:
+        f.write('{"seq": 5, "op": "add"')
+    writer.add("cand-4", teaching_candidate("Teacher4", skills[4]))
+
+    reloaded = CandidateIndex.load(str(tmp_path), HashingEmbedder())
+    assert sorted(reloaded.records) == [f"cand-{n}" for n in range(5)]
+    assert reloaded.journal.seq == 5
+    assert reloaded.search("Geography")[0]["id"] == "cand-4"
+    index.refresh()
+    assert sorted(index.records) == sorted(reloaded.records)
@@ -0,0 +1,66 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from src.search.matching import FeatureColumns, career_start, month_ordinal
+from tests.candidates import teaching_candidate
+
+TODAY = date(2025, 1, 1)
+
+
+@pytest.fixture
+def columns():
+    columns = FeatureColumns(capacity=2)
+    columns.add(0, teaching_candidate("Asha", "Physics", level="PGT", city="Noida", career_start_date="01-2015"))
+    columns.add(1, teaching_candidate(
+        "Ravi", "Mathematics", level="TGT", city="Lucknow", career_start_date="01-2023", secondary_skill="Physics",
+    ))
+    columns.add(2, teaching_candidate("Meera", "English", level="PRT", city="Pune", state="Maharashtra"))
+    return columns
+
+
+def test_month_ordinal_and_career_start():
+    assert month_ordinal("03-2020") == 2020 * 12 + 2
+    assert month_ordinal("2020") is None
+    candidate = {"career_start_date": None, "experiences": [{"start_date": "06-2019"}, {"start_date": "01-2017"}]}
+    assert career_start(candidate) == month_ordinal("01-2017")
+
+
+def test_score_columns(columns):
+    scores = columns.score("Physics", level="PGT", city="Noida", state="Uttar Pradesh", min_experience=4, today=TODAY)
+
+    np.testing.assert_allclose(scores["skill"], [1.0, 0.6, 0.0])
+    np.testing.assert_allclose(scores["level"], [1.0, 0.5, 0.0])
+    np.testing.assert_allclose(scores["location"], [1.0, 0.5, 0.0])
+    np.testing.assert_allclose(scores["experience"], [1.0, 0.5, 1.0])
+    assert "role" not in scores
+    assert scores["total"].argmax() == 0
+    assert scores["total"][1] > scores["total"][2]
+
+
+def test_score_normalizes_weights_of_scored_criteria(columns):
+    scores = columns.score("Physics", weights={"skill": 2.0, "level": 5.0})
+
+    assert list(scores) == ["skill", "total"]
+    np.testing.assert_allclose(scores["total"], scores["skill"])
+
+
+@pytest.mark.parametrize(
+    "weights, message",
+    [
+        ({"skill": -0.1}, "must not be negative: skill"),
+        ({"skill": 0.0}, "must sum to more than 0"),
+        ({"skil": 0.5}, "Unknown weights: skil"),
+        ({"skill": 0.5, "salary": 1.0}, "Unknown weights: salary"),
+    ],
+)
+def test_score_rejects_invalid_weights(columns, weights, message):
+    with pytest.raises(ValueError, match=message):
+        columns.score("Physics", weights=weights)
+
+
+def test_unknown_values_score_zero(columns):
+    scores = columns.score("Chemistry", role="Principal", city="Agra")
+
+    np.testing.assert_allclose(scores["total"], [0.0, 0.0, 0.0])
@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+
+import src.utils.pipeline as pipeline_module
+from src.agents.cache import ClassificationCache
+from src.agents.classify import EmailType
+from src.search import CandidateIndex
+from src.search.embeddings import HashingEmbedder
+from src.utils.imap_sync import SyncStore
+from src.utils.pipeline import IngestionPipeline
+from tests.candidates import teaching_candidate
+from tests.emails import make_pdf
+from tests.imap_server import IMAPStandIn, make_message
+
+RESUME = make_pdf(["Education\nTeaching experience\nSkills\nasha@example.com"])
+# Two pages, which the stubbed extractor fails on
+UNREADABLE_RESUME = make_pdf(["Education", "Experience"])
+
+
+def application(uid, resume=RESUME):
+    return make_message(
+        uid, subject=f"Application for PGT Physics {uid}",
+        attachments={"Resume.pdf": resume, "logo.png": b"\x89PNG logo"},
+    )
+
+
+@pytest.fixture
+def server():
+    with IMAPStandIn() as server:
+        server.add(1, application(1))
+        server.add(2, make_message(2, subject="Newsletter"))
+        server.add(3, application(3, resume=UNREADABLE_RESUME))
+        server.add(4, make_message(4, subject="Unclassifiable"))
+        server.add(5, application(5))
+        server.add(6, application(6))
+        yield server
+
+
+class StubAgent:
+    """Extractor stand-in returning a candidate for one-page resumes, recording the pending UIDs it sees."""
+
+    def __init__(self):
+        self.pipeline = None
+        self.pending_during_extraction = []
+
+    async def ainvoke(self, state):
+        self.pending_during_extraction.append(set(self.pipeline.sync.retry_uids()))
+        await asyncio.sleep(0)
+        pages = [block for block in state["messages"][0].content if block["type"] == "image_url"]
+        if len(pages) > 1:
+            return {"candidate": [], "iteration": 3}
+        return {"candidate": [teaching_candidate("Asha", "Physics")]}
+
+
+def stub_classify(emails, cache=None, labels_path=None):
+    for email in emails:
+        subject = email._metadata["subject"]
+        if subject.startswith("Unclassifiable"):
+            email.type = None
+        else:
+            email.type = EmailType(type="candidate" if subject.startswith("Application") else "non candidate")
+    return [email.type for email in emails]
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    agent = StubAgent()
+    monkeypatch.setattr(pipeline_module, "CandidateAgent", agent)
+    return agent
+
+
+@pytest.fixture
+def pipeline(server, agent, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(pipeline_module, "RESULTS_HISTORY", 2)
+    monkeypatch.setattr(pipeline_module, "classify_emails", stub_classify)
+
+    pipeline = IngestionPipeline(
+        credentials=server.credentials,
+        store=SyncStore(str(tmp_path / "imap_state.json")),
+        # One worker per stage, so that resumes are extracted in UID order
+        concurrency={"pick": 1, "rasterize": 1, "extract": 1},
+        resume_dir=str(tmp_path / "resume"),
+        index=CandidateIndex(str(tmp_path / "index"), HashingEmbedder()),
+        cache=ClassificationCache(str(tmp_path / "cache.sqlite")),
+        labels_path=str(tmp_path / "labels.jsonl"),
+        picks_path=str(tmp_path / "picks.jsonl"),
+    )
+    pipeline.sync.port, pipeline.sync.use_ssl = server.port, False
+    agent.pipeline = pipeline
+    return pipeline
+
+
+def test_run_persists_resumes_and_resolves_uids_once_done(pipeline, agent, tmp_path):
+    stats = asyncio.run(pipeline.run())
+
+    assert stats["emails"] == 6
+    assert stats["candidates"] == 4
+    assert stats["outcomes"] == {"success": 3, "failed": 1}
+    assert len(pipeline.index) == 3
+    assert len(list((tmp_path / "resume").glob("cand-*.pdf"))) == 3
+    # Only the logo was skipped in every application
+    assert stats["attachments"]["picked"] == 4
+
+    # Every UID was still pending while its resume was being extracted
+    assert len(agent.pending_during_extraction) == 4
+    for uid, pending in zip([1, 3, 5, 6], agent.pending_during_extraction):
+        assert uid in pending
+    state = pipeline.store.get(pipeline.sync.key)
+    assert state["last_uid"] == 6
+    assert state["pending"] == []
+    assert state["failed"] == {"3": 1, "4": 1}
+
+
+def test_results_are_bounded_but_every_outcome_is_counted(pipeline):
+    stats = asyncio.run(pipeline.run())
+
+    assert len(stats["results"]) == 2
+    assert sum(stats["outcomes"].values()) == 4
+
+
+def test_failed_emails_are_fetched_again_by_the_next_run(pipeline):
+    first = asyncio.run(pipeline.run())["emails"]
+
+    # The counters of a pipeline add up over its runs
+    assert asyncio.run(pipeline.run())["emails"] - first == 2
+    assert pipeline.store.get(pipeline.sync.key)["failed"] == {"3": 2, "4": 2}
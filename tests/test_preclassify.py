@@ -0,0 +1,129 @@
+import pytest
+
+import src.agents.preclassify as preclassify
+from src.agents.cache import ClassificationCache
+from src.agents.classify import EmailType
+from src.agents.preclassify import PreClassifier, classify_emails, email_features, email_text, load_labels, rule_label
+from tests.emails import make_email
+
+
+def application(uid, directory, **fields):
+    return make_email(
+        uid, directory,
+        subject=f"Application for the post of PGT Physics {uid}",
+        attachments={"Resume.pdf": b"%%PDF-1.4 resume %d" % uid},
+        **fields,
+    )
+
+
+def newsletter(uid, directory):
+    return make_email(
+        uid, directory,
+        subject=f"This week in education {uid}",
+        sender="newsletter@example.com",
+        body="Read our latest articles. Unsubscribe or view in browser.",
+    )
+
+
+def ambiguous(uid, directory, body):
+    return make_email(uid, directory, subject=f"Hello {uid}", body=body)
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    """Stubbed LLM classifier labelling by a `labels` mapping of email id, recording its calls."""
+    calls, labels = [], {}
+
+    def classify_batch(emails, batch_size=20):
+        calls.append([email.id for email in emails])
+        return [EmailType(type=labels[email.id]) if email.id in labels else None for email in emails]
+
+    monkeypatch.setattr(preclassify, "classify_batch", classify_batch)
+    return calls, labels
+
+
+def test_rule_label(tmp_path):
+    assert rule_label(email_features(application(1, tmp_path))) == "candidate"
+    assert rule_label(email_features(newsletter(2, tmp_path))) == "non candidate"
+    assert rule_label(email_features(ambiguous(3, tmp_path, "Please find the details below"))) is None
+
+    # A resume-named document alone is not enough without a recruitment keyword
+    greeting = make_email(4, tmp_path, subject="Hello", body="Regards", attachments={"cv.pdf": b"%PDF"})
+    assert rule_label(email_features(greeting)) is None
+
+
+def trained(tmp_path, threshold):
+    emails = [ambiguous(uid, tmp_path, "Teaching experience in physics and chemistry") for uid in range(10)]
+    emails += [ambiguous(uid, tmp_path, "Invoice for the printer cartridges delivered") for uid in range(10, 20)]
+    labels = ["candidate"] * 10 + ["non candidate"] * 10
+    classifier = PreClassifier(threshold=threshold, model_path=str(tmp_path / "model.joblib"))
+    classifier.fit([email_text(e) for e in emails], [email_features(e) for e in emails], labels)
+    return classifier
+
+
+@pytest.mark.parametrize("threshold, decided", [(0.5, 2), (1.0, 0)])
+def test_decide_only_keeps_sure_model_predictions(tmp_path, threshold, decided):
+    classifier = trained(tmp_path, threshold)
+    emails = [
+        application(100, tmp_path),
+        ambiguous(101, tmp_path, "Teaching experience in physics and chemistry"),
+        ambiguous(102, tmp_path, "Invoice for the printer cartridges delivered"),
+    ]
+
+    decisions = classifier.decide(emails)
+
+    assert decisions[0] == EmailType(type="candidate")
+    assert sum(decision is not None for decision in decisions[1:]) == decided
+    if decided:
+        assert [decision.type for decision in decisions[1:]] == ["candidate", "non candidate"]
+    assert (classifier.stats.rules, classifier.stats.model, classifier.stats.total) == (1, decided, 3)
+
+
+def test_untrained_classifier_leaves_ambiguous_emails_to_the_llm(tmp_path):
+    classifier = PreClassifier(model_path=str(tmp_path / "missing.joblib"))
+
+    assert not classifier.is_trained
+    assert classifier.decide([ambiguous(1, tmp_path, "Please call me back")]) == [None]
+
+
+def test_classify_emails_counts_avoided_calls_and_agreement(tmp_path, llm):
+    calls, labels = llm
+    emails = [application(1, tmp_path), application(2, tmp_path), newsletter(3, tmp_path), ambiguous(4, tmp_path, "Hi")]
+    # The LLM disagrees with the rules on email 2 and can't classify email 4
+    labels.update({"1": "candidate", "2": "non candidate", "3": "non candidate"})
+    classifier = PreClassifier(model_path=str(tmp_path / "missing.joblib"))
+
+    results = classify_emails(
+        emails, classifier, audit_rate=1.0,
+        cache=ClassificationCache(str(tmp_path / "cache.sqlite")), labels_path=str(tmp_path / "labels.jsonl"),
+    )
+
+    assert [result and result.type for result in results] == ["candidate", "candidate", "non candidate", None]
+    assert [email.type for email in emails] == results
+    assert sorted(calls[0]) == ["1", "2", "3", "4"]
+    stats = classifier.stats
+    assert (stats.total, stats.rules, stats.model, stats.llm) == (4, 3, 0, 0)
+    assert stats.llm_calls_avoided == 0.75
+    assert (stats.compared, stats.agreed) == (3, 2)
+    assert stats.agreement == pytest.approx(2 / 3)
+    # Only the LLM labels are recorded for training
+    assert sorted((record["message_id"], record["label"]) for record in load_labels(str(tmp_path / "labels.jsonl"))) == [
+        ("<1@example.com>", "candidate"), ("<2@example.com>", "non candidate"), ("<3@example.com>", "non candidate"),
+    ]
+
+
+def test_classify_emails_sends_only_undecided_emails_without_audit(tmp_path, llm):
+    calls, labels = llm
+    labels["2"] = "non candidate"
+    classifier = PreClassifier(model_path=str(tmp_path / "missing.joblib"))
+
+    results = classify_emails(
+        [application(1, tmp_path), ambiguous(2, tmp_path, "Hi")], classifier, audit_rate=0.0,
+        cache=ClassificationCache(str(tmp_path / "cache.sqlite")), labels_path=str(tmp_path / "labels.jsonl"),
+    )
+
+    assert [result.type for result in results] == ["candidate", "non candidate"]
+    assert calls == [["2"]]
+    assert classifier.stats.llm == 1
+    assert classifier.stats.llm_calls_avoided == 0.5
+    assert classifier.stats.agreement is None
@@ -0,0 +1,79 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import src.routes.resume as resume_routes
+from src.outputs.candidates import levelEnum, skillEnum
+from src.search import CandidateIndex
+from src.search.embeddings import HashingEmbedder
+from tests.candidates import teaching_candidate
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    index = CandidateIndex(str(tmp_path), HashingEmbedder())
+    monkeypatch.setattr(resume_routes, "get_candidate_index", lambda: index)
+    return index
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(resume_routes.router, prefix="/v1")
+    return TestClient(app)
+
+
+def test_search_returns_ranked_candidates(client, index):
+    index.add_many({
+        "cand-physics": teaching_candidate("Asha", "Physics", designations=["PGT Physics"]),
+        "cand-maths": teaching_candidate("Ravi", "Mathematics", level="TGT", designations=["TGT Mathematics"]),
+    })
+
+    response = client.post("/v1/resume/search", params={"query": "PGT Physics"})
+
+    assert response.status_code == 200
+    hits = response.json()
+    assert hits[0]["id"] == "cand-physics"
+    assert hits[0]["candidate"]["first_name"] == "Asha"
+    assert hits[0]["resume_url"] == "/static/resume/cand-physics.pdf"
+
+
+def test_search_rejects_invalid_filters(client, index):
+    response = client.post("/v1/resume/search", params={"query": "Physics"}, json={"colour": "blue"})
+
+    assert response.status_code == 422
+
+
+def test_facets_report_every_master_value(client, index):
+    index.add("cand-physics", teaching_candidate("Asha", "Physics", level="PGT"))
+
+    response = client.post("/v1/resume/facets", params={"fields": ["level", "primary_skill"]})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total"] == 1
+    assert body["facets"]["level"] == {member.value: int(member.value == "PGT") for member in levelEnum}
+    assert body["facets"]["primary_skill"]["Physics"] == 1
+    assert set(body["facets"]["primary_skill"]) == {member.value for member in skillEnum}
+
+
+def test_facets_count_within_filters(client, index):
+    index.add_many({
+        "cand-physics": teaching_candidate("Asha", "Physics", level="PGT"),
+        "cand-english": teaching_candidate("Meera", "English", level="PRT", city="Pune", state="Maharashtra"),
+    })
+
+    response = client.post("/v1/resume/facets", params={"fields": ["level"]}, json={"state": "Maharashtra"})
+
+    assert response.json()["total"] == 1
+    assert response.json()["facets"]["level"]["PRT"] == 1
+    assert response.json()["facets"]["level"]["PGT"] == 0
+
+
+@pytest.mark.parametrize("weights", [{"skill": -1.0}, {"skill": 0.0}, {"salary": 1.0}])
+def test_match_rejects_invalid_weights(client, index, weights):
+    index.add("cand-physics", teaching_candidate("Asha", "Physics"))
+
+    response = client.post("/v1/resume/match", json={"job": {"skill": "Physics", "weights": weights}})
+
+    assert response.status_code == 422
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.utils.etl.normalizer import (
+    DataNormalizer, is_valid_email, is_valid_mobile, valid_email_mask, valid_mobile_mask,
+)
+
+NUMBERS = [
+    "9876543210", 9876543210, 9876543210.0, 98765.4321, np.int64(9876543210), np.float64("nan"), None,
+    True, "+91", "+91 98765 43210", "+91-9876543210", "(+91) 98765-43210", "919876543210", "09876543210",
+    "0 98765 43210", "  9876543210  ", "\t9876543210\n", "", "   ", "5876543210", "+1-555-0100",
+    "98765432101", "98765 4321O", "९८७६५४३२१०", "+91-98765-43210", "+44-1234567890", "+91-9876543210\n",
+    "nan", "None", 0, -9876543210, 1e10,
+]
+EMAILS = [
+    "asha@example.com", "Asha.Sharma@Gmail.com", "a.s.h.a+jobs@gmail.com", "ravi+jobs@yahoo.comm",
+    "  meena@hotmial.com ", "meena@hotmial.com", "user@gmial.com", "user@mygmial.in", "x@yahho.co.in",
+    "priya@outlok.com", "bad@@example.com", "a..b@example.com", "a@b..com", ".a@example.com",
+    "a@example.c", "a@example." + "c" * 63, "a@example." + "c" * 64, "a@example.com\n", "a@example.com\n\n",
+    "a@example.com ", "UPPER@EXAMPLE.COM", "user@sub.example.co.in", "user@localhost", "@example.com",
+    "user@", "no-at-sign", "", "   ", "user name@example.com", "üser@example.com", "user@exämple.com",
+    "user@example.comm", "user@gmail.co", np.float64("nan"), None, 12345, 1.5, "nan",
+]
+
+
+@pytest.fixture(scope="module")
+def normalizer():
+    return DataNormalizer(
+        roles=["Teacher", "Librarian"],
+        levels=["PRT", "TGT", "PGT"],
+        skills=["English", "Physics"],
+        cities=pd.DataFrame({"name": ["Noida"], "state": ["Uttar Pradesh"]}),
+    )
+
+
+def column(values):
+    return pd.Series(values, dtype=object, index=range(10, 10 + len(values)))
+
+
+@pytest.mark.parametrize("number", NUMBERS, ids=repr)
+def test_sanitize_numbers_equals_sanitize_number(normalizer, number):
+    # A value on its own also gets the dtype pandas infers for it, and is read back as
+    # `normalize_row` gets it from the rows (a numpy integer as an int)
+    for numbers in (column([number]), pd.Series([number])):
+        expected = [normalizer.sanitize_number(value) for value in numbers.tolist()]
+        assert normalizer.sanitize_numbers(numbers).tolist() == expected
+
+
+@pytest.mark.parametrize("email", EMAILS, ids=repr)
+def test_sanitize_emails_equals_sanitize_email(normalizer, email):
+    for emails in (column([email]), pd.Series([email])):
+        expected = [normalizer.sanitize_email(value) for value in emails.tolist()]
+        assert normalizer.sanitize_emails(emails).tolist() == expected
+
+
+def test_sanitize_columns_of_mixed_values(normalizer):
+    numbers, emails = column(NUMBERS), column(EMAILS)
+
+    sanitized_numbers = normalizer.sanitize_numbers(numbers)
+    sanitized_emails = normalizer.sanitize_emails(emails)
+
+    assert sanitized_numbers.index.equals(numbers.index)
+    assert sanitized_numbers.tolist() == [normalizer.sanitize_number(number) for number in NUMBERS]
+    assert sanitized_emails.index.equals(emails.index)
+    assert sanitized_emails.tolist() == [normalizer.sanitize_email(email) for email in EMAILS]
+
+
+@pytest.mark.parametrize("values, mask, check", [
+    (NUMBERS, valid_mobile_mask, is_valid_mobile),
+    (EMAILS, valid_email_mask, is_valid_email),
+    # Sanitized values, as `apply_status_labels` checks them
+    (["+91-9876543210", "+91-987654321", "+1-5550100123", "+91-9876543210\n", " +91-9876543210"], valid_mobile_mask, is_valid_mobile),
+    (NUMBERS + EMAILS, valid_email_mask, is_valid_email),
+], ids=["mobiles", "emails", "sanitized mobiles", "anything as emails"])
+def test_valid_masks_equal_the_scalar_checks(values, mask, check):
+    result = mask(column(values))
+
+    assert result.dtype == bool
+    assert result.tolist() == [check(value) for value in values]
@@ -0,0 +1,158 @@
+import time
+import asyncio
+import threading
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import src.routes.resume as resume_routes
+import src.utils.pipeline as pipeline_module
+import src.utils.scheduler as scheduler_module
+from src.utils.scheduler import EmailScheduler, RunInProgress, summarize
+
+STATS = {
+    "emails": 12,
+    "candidates": 4,
+    "resumes": 3,
+    "stages": {
+        "fetch": {"received": 12, "busy_seconds": 0.0},
+        "classify": {"received": 12, "busy_seconds": 1.5},
+        "extract": {"received": 4, "busy_seconds": 20.0},
+    },
+    "outcomes": {"success": 3, "failed": 1},
+    "results": [],
+}
+
+
+class StubPipeline:
+    """IngestionPipeline stand-in whose runs last until `release` is set, or fail with `error`."""
+
+    release = threading.Event()
+    error = None
+    runs = 0
+
+    def __init__(self, max_emails=None, since=None, **kwargs):
+        self.max_emails = max_emails
+
+    async def run(self):
+        type(self).runs += 1
+        while not self.release.is_set():
+            await asyncio.sleep(0.01)
+        if self.error is not None:
+            raise self.error
+        return STATS
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    monkeypatch.setattr(StubPipeline, "release", threading.Event())
+    monkeypatch.setattr(StubPipeline, "error", None)
+    monkeypatch.setattr(StubPipeline, "runs", 0)
+    monkeypatch.setattr(pipeline_module, "IngestionPipeline", StubPipeline)
+    return StubPipeline
+
+
+@pytest.fixture
+def scheduler(tmp_path):
+    return EmailScheduler(interval=3600, state_path=str(tmp_path / "email_cron.json"))
+
+
+def test_summarize():
+    summary = summarize(STATS)
+
+    assert summary["emails_scanned"] == 12
+    assert summary["emails_classified"] == 12
+    assert summary["candidate_emails"] == 4
+    assert summary["resumes_extracted"] == 3
+    assert summary["resumes_failed"] == 1
+    assert summary["stage_seconds"] == {"fetch": 0.0, "classify": 1.5, "extract": 20.0}
+
+
+def test_trigger_refuses_overlapping_runs(scheduler, pipeline):
+    async def scenario():
+        run = await scheduler.trigger()
+        assert scheduler.running is run
+        with pytest.raises(RunInProgress) as overlap:
+            await scheduler.trigger(trigger="scheduled")
+        assert overlap.value.run is run
+
+        pipeline.release.set()
+        await scheduler.wait()
+        assert scheduler.running is None
+        next_run = await scheduler.trigger()
+        await scheduler.wait()
+        return run, next_run
+
+    run, next_run = asyncio.run(scenario())
+
+    assert run["status"] == "success"
+    assert run["stats"] == summarize(STATS)
+    assert run["finished_at"] is not None
+    assert next_run["run_id"] != run["run_id"]
+    assert pipeline.runs == 2
+
+
+def test_failed_runs_are_recorded_and_release_the_lock(scheduler, pipeline):
+    pipeline.release.set()
+    pipeline.error = RuntimeError("IMAP login failed")
+
+    async def scenario():
+        run = await scheduler.trigger()
+        await scheduler.wait()
+        return run, scheduler._lock.locked()
+
+    run, locked = asyncio.run(scenario())
+
+    assert run["status"] == "failure"
+    assert run["error"] == "IMAP login failed"
+    assert not locked
+
+
+def test_runs_persist_across_restarts(scheduler, pipeline, tmp_path, monkeypatch):
+    monkeypatch.setattr(scheduler_module, "HISTORY", 2)
+    pipeline.release.set()
+
+    async def scenario():
+        runs = []
+        for trigger in ("manual", "scheduled", "manual"):
+            runs.append(await scheduler.trigger(trigger))
+            await scheduler.wait()
+        return runs
+
+    runs = asyncio.run(scenario())
+
+    restarted = EmailScheduler(state_path=str(tmp_path / "email_cron.json"))
+    # Only the latest HISTORY runs are kept
+    assert restarted.get(runs[0]["run_id"]) is None
+    assert restarted.get(runs[1]["run_id"]) == {**runs[1], "trigger": "scheduled"}
+    assert restarted.get(runs[2]["run_id"])["stats"] == summarize(STATS)
+
+
+def test_cron_route_returns_409_while_a_run_is_in_progress(scheduler, pipeline, monkeypatch):
+    monkeypatch.setattr(resume_routes, "get_email_scheduler", lambda: scheduler)
+    app = FastAPI()
+    app.include_router(resume_routes.router, prefix="/v1")
+
+    with TestClient(app) as client:
+        started = client.post("/v1/resume/cron/email")
+        assert started.status_code == 200
+        assert started.json()["status"] == "running"
+        run_id = started.json()["run_id"]
+
+        overlap = client.post("/v1/resume/cron/email")
+        assert overlap.status_code == 409
+        assert run_id in overlap.json()["detail"]
+
+        pipeline.release.set()
+        deadline = time.monotonic() + 5
+        while client.get(f"/v1/resume/cron/email/{run_id}").json()["status"] == "running":
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        assert client.get(f"/v1/resume/cron/email/{run_id}").json()["status"] == "success"
+
+        finished = client.post("/v1/resume/cron/email", params={"wait": True})
+        assert finished.status_code == 200
+        assert finished.json()["status"] == "success"
+        assert finished.json()["stats"] == summarize(STATS)
+        assert client.get("/v1/resume/cron/email/unknown").status_code == 404
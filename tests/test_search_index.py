@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+import src.search.index as index_module
+from src.search import CandidateIndex
+from src.search.embeddings import HashingEmbedder
+from tests.candidates import teaching_candidate
+
+
+@pytest.fixture
+def candidates():
+    return {
+        "cand-physics": teaching_candidate("Asha", "Physics", level="PGT", designations=["PGT Physics"]),
+        "cand-maths": teaching_candidate("Ravi", "Mathematics", level="TGT", city="Lucknow", designations=["TGT Mathematics"]),
+        "cand-english": teaching_candidate("Meera", "English", level="PRT", city="Pune", state="Maharashtra", designations=["PRT English"]),
+    }
+
+
+@pytest.fixture
+def index(tmp_path, candidates):
+    index = CandidateIndex.load(str(tmp_path), HashingEmbedder())
+    index.add_many(candidates)
+    return index
+
+
+def test_search_ranks_the_best_matching_candidate_first(index):
+    hits = index.search("PGT Physics")
+
+    assert hits[0]["id"] == "cand-physics"
+    assert hits[0]["candidate"]["primary_skill"] == "Physics"
+    assert [hit["confidence"] for hit in hits] == sorted((hit["confidence"] for hit in hits), reverse=True)
+    assert "cand-english" not in [hit["id"] for hit in hits]
+
+
+def test_search_applies_filters_before_ranking(index):
+    hits = index.search("teacher", confidence=0.0, filters={"state": "Maharashtra"})
+
+    assert [hit["id"] for hit in hits] == ["cand-english"]
+
+
+def test_removed_candidates_are_not_found(index):
+    assert index.remove("cand-physics")
+    assert not index.remove("cand-physics")
+
+    assert "cand-physics" not in index
+    assert all(hit["id"] != "cand-physics" for hit in index.search("PGT Physics"))
+
+
+def test_replacing_a_candidate_keeps_one_record(index):
+    index.add("cand-physics", teaching_candidate("Asha", "Chemistry", designations=["PGT Chemistry"]))
+
+    assert len(index) == 3
+    assert index.search("Chemistry")[0]["id"] == "cand-physics"
+    assert all(hit["id"] != "cand-physics" for hit in index.search("Physics"))
+
+
+def test_saved_index_loads_with_the_same_results(tmp_path, index):
+    index.remove("cand-maths")
+    index.save()
+    expected = index.search("PGT Physics", confidence=0.0)
+
+    loaded = CandidateIndex.load(str(tmp_path), HashingEmbedder())
+    assert len(loaded) == 2
+    assert loaded.search("PGT Physics", confidence=0.0) == expected
+    assert loaded.facet_counts() == index.facet_counts()
+    assert loaded.facet_counts(["level"])["facets"]["level"]["TGT"] == 0
+
+
+def test_unsaved_changes_are_replayed_from_the_journal(tmp_path, index, candidates):
+    index.save()
+    index.remove("cand-english")
+    index.add("cand-chemistry", teaching_candidate("Kiran", "Chemistry", designations=["PGT Chemistry"]))
+
+    loaded = CandidateIndex.load(str(tmp_path), HashingEmbedder())
+    assert sorted(loaded.records) == ["cand-chemistry", "cand-maths", "cand-physics"]
+    assert loaded.search("Chemistry")[0]["id"] == "cand-chemistry"
+
+
+def test_keyword_shortlist_keeps_the_best_hits():
+    scores = np.array([0.0, 0.2, 0.9, 0.5, 0.0], dtype=np.float32)
+
+    assert sorted(index_module._keyword_shortlist(scores, 2)) == [2, 3]
+    assert sorted(index_module._keyword_shortlist(scores, 10)) == [1, 2, 3]
+
+
+def test_ivf_search_only_scores_the_shortlisted_keyword_hits(index, monkeypatch):
+    monkeypatch.setattr(index_module, "KEYWORD_SHORTLIST", 1)
+    index.ann.train(index.vectors, n_lists=3)
+    query = "Public School"
+    query_vector = index.embedder.embed([query])[0]
+
+    hits = index.search(query, top_k=3, confidence=-1.0, nprobe=1)
+
+    keyword = index.keywords.scores(query, index.vectors.size)
+    keyword /= keyword.max()
+    similarity = index.vectors.scores(query_vector)
+    shortlist = set(index.ann.candidates(query_vector, 1)) | set(index_module._keyword_shortlist(keyword, 1))
+    assert len(shortlist) < 3
+    expected = {
+        id: 0.5 * (similarity[slot] if slot in shortlist else 0.0) + 0.5 * keyword[slot]
+        for id, slot in index._slots.items()
+    }
+    assert {hit["id"]: hit["confidence"] for hit in hits} == pytest.approx(expected)
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.utils.etl.transform as transform_module
+from src.utils.etl.normalizer import DataNormalizer
+from src.utils.etl.transform import process_dataframe
+
+RESULT_COLUMNS = ["skill", "role", "level", "city", "mobile", "whatsapp", "email"]
+
+CITIES = pd.DataFrame({
+    "name": ["Noida", "Greater Noida", "Ghaziabad", "Lucknow", "New Delhi", "Gurugram", "Faridabad", "Pune", "Mumbai"],
+    "state": ["Uttar Pradesh"] * 4 + ["Delhi", "Haryana", "Haryana", "Maharashtra", "Maharashtra"],
+})
+
+# Rows as the extract phase leaves them, with repeated values and the usual holes
+ROWS = {
+    "skill": [
+        "PGT Physics", "maths teacher", "PGT Physics", np.nan, "", "   ", "TGT Science", "englsh",
+        "Mother teacher (NTT)", "maths teacher", "Librarian", "xyz", "nan", "PRT English",
+    ],
+    "old_city": [
+        "noida", "Gr. Noida", "noida", "Lucknow", "delhi", np.nan, "Gurgaon", "pune", "Mumbai", "noida",
+        "", "faridabad", "Noida", "ghaziabad",
+    ],
+    "state": [
+        "Uttar Pradesh", "Uttar Pradesh", "Uttar Pradesh", "Uttar Pradesh", "Delhi", "Delhi", "Haryana",
+        np.nan, "Maharashtra", "Haryana", "Delhi", "Haryana", "Uttar Pradesh", None,
+    ],
+    "old_mobile": [
+        "9876543210", 9876543210, "+91 98765 43210", "098765-43210", np.nan, "12345", None, "(+91) 8765432109",
+        "919876543210", 8765432109.0, "  7654321098 ", "+1-555-0100", "9876543210", "",
+    ],
+    "old_whatsapp": [
+        np.nan, "9876543210", None, "+91-9876543210", 7654321098, "abc", "9876543210", np.nan,
+        "6543210987", "55555", "9876543210", np.nan, "0 98765 43210", "+91 9876543210",
+    ],
+    "old_email": [
+        "Asha.Sharma@Gmail.com", "ravi+jobs@yahoo.comm", "  meena@hotmial.com ", "bad@@example.com", np.nan,
+        "user@gmial.com", None, "a..b@example.com", "priya@outlok.com", "x@y.c", "rahul@example.co.in",
+        "UPPER@EXAMPLE.COM", "neha.verma@gmail.com", 12345,
+    ],
+}
+
+
+@pytest.fixture(scope="module")
+def normalizer():
+    return DataNormalizer(
+        roles=["Teacher", "Mother Teacher", "Assistant Teacher", "Librarian", "Lab Assistant", "Principal"],
+        levels=["Day Care", "Pre-Primary", "PRT", "TGT", "PGT", "NA", "Other"],
+        skills=["English", "Hindi", "Mathematics", "Science", "Physics", "Chemistry", "Biology", "Library Science"],
+        cities=CITIES,
+    )
+
+
+def normalize_rows(df, normalizer):
+    """What `process_dataframe` used to do: `normalize_row` on every row."""
+    return pd.DataFrame(
+        [normalizer.normalize_row(row) for _, row in df.iterrows()], columns=RESULT_COLUMNS,
+    )
+
+
+def result_columns(df, result):
+    """Result columns of `process_dataframe`, which follow the input columns."""
+    columns = result.iloc[:, len(df.columns):len(df.columns) + len(RESULT_COLUMNS)]
+    assert list(columns.columns) == RESULT_COLUMNS
+    return columns
+
+
+def assert_same_as_normalize_row(df, normalizer, num_workers=1):
+    result = process_dataframe(df, normalizer, num_workers=num_workers)
+
+    assert result is not None
+    pd.testing.assert_frame_equal(result_columns(df, result), normalize_rows(df, normalizer))
+    return result
+
+
+@pytest.mark.parametrize("num_workers", [1, 2])
+def test_matches_normalize_row_on_every_row(normalizer, num_workers, monkeypatch):
+    # Also through the process pool
+    monkeypatch.setattr(transform_module, "PARALLEL_MIN_VALUES", 0)
+    df = pd.DataFrame(ROWS)
+
+    assert_same_as_normalize_row(df, normalizer, num_workers)
+
+
+@pytest.mark.parametrize("missing", [
+    ["skill"], ["old_city"], ["state"], ["old_city", "state"], ["old_mobile", "old_whatsapp"], ["old_email"],
+])
+def test_matches_normalize_row_with_missing_columns(normalizer, missing):
+    df = pd.DataFrame(ROWS).drop(columns=missing)
+
+    assert_same_as_normalize_row(df, normalizer)
+
+
+def test_missing_values_are_normalized_as_the_text_nan(normalizer):
+    # normalize_row reads the NaN of a missing skill or city as "nan", not as an empty value
+    df = pd.DataFrame({"skill": [np.nan, "nan", "PGT Physics"], "old_city": [np.nan, "noida", np.nan], "state": [np.nan] * 3})
+
+    result = assert_same_as_normalize_row(df, normalizer)
+
+    skills = result_columns(df, result)[["skill", "role", "level"]]
+    assert skills.iloc[0].equals(skills.iloc[1])
+
+
+def test_index_is_ignored(normalizer):
+    df = pd.DataFrame(ROWS, index=range(100, 100 + len(ROWS["skill"])))
+
+    assert_same_as_normalize_row(df, normalizer)
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from src.search.benchmark import synthetic_embeddings
+from src.search.vector_index import VectorIndex
+
+
+@pytest.mark.parametrize("dtype", ["float32", "int8"])
+@pytest.mark.parametrize("density", [0.01, 0.5, 1.0])
+def test_masked_scores_match_the_unmasked_ones_on_the_mask(dtype, density):
+    index = VectorIndex(32, dtype=dtype)
+    index.add(synthetic_embeddings(2000, 32, n_clusters=20))
+    query = synthetic_embeddings(1, 32, seed=1)[0]
+    mask = np.random.default_rng(0).random(2000) < density
+
+    scores = index.scores(query, mask)
+
+    np.testing.assert_allclose(scores[mask], index.scores(query)[mask], rtol=1e-5)
+    assert not scores[~mask].any()
+
+
+def test_masks_shorter_than_the_index_leave_the_other_slots_out():
+    index = VectorIndex(8)
+    index.add(synthetic_embeddings(10, 8, n_clusters=2))
+
+    scores = index.scores(synthetic_embeddings(1, 8, seed=1)[0], np.ones(6, dtype=bool))
+
+    assert scores.shape == (10,)
+    assert scores[:6].all() and not scores[6:].any()